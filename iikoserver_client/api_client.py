@@ -12,6 +12,8 @@
 """  # noqa: E501
 
 
+import asyncio
+import contextlib
 import datetime
 from dateutil.parser import parse
 from enum import Enum
@@ -26,7 +28,7 @@ from pathlib import Path
 import lxml
 
 from urllib.parse import quote
-from typing import Tuple, Optional, List, Dict, Union
+from typing import AsyncIterator, Tuple, Optional, List, Dict, Union
 from pydantic import SecretStr
 from lxml import etree
 
@@ -103,6 +105,30 @@ class ApiClient:
         self._examples_enabled = os.environ.get("IIKO_SAVE_EXAMPLES", "false").lower() == "true"
         self._examples_base_path = Path(os.environ.get("IIKO_EXAMPLES_PATH", "examples"))
 
+        # Created lazily so that it binds to the running event loop
+        self._request_semaphore: Optional[asyncio.Semaphore] = None
+        self._request_semaphore_key: Optional[Tuple[object, int]] = None
+
+    @property
+    def request_semaphore(self) -> Optional[asyncio.Semaphore]:
+        """Semaphore enforcing `Configuration.max_concurrent_requests`.
+
+        It is rebuilt when the limit changes or the client is used from
+        another event loop; requests already waiting keep the old one.
+        """
+        limit = self.configuration.max_concurrent_requests
+        if limit is None:
+            return None
+        try:
+            loop: object = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        key = (loop, limit)
+        if self._request_semaphore is None or self._request_semaphore_key != key:
+            self._request_semaphore = asyncio.Semaphore(limit)
+            self._request_semaphore_key = key
+        return self._request_semaphore
+
     async def __aenter__(self):
         return self
 
@@ -130,6 +156,8 @@ class ApiClient:
             return None
         elif isinstance(body, (dict, list)):
             return body
+        elif isinstance(body, rest.XmlModelPayload):
+            return body.decode()
         elif isinstance(body, str):
             try:
                 # Try to parse as JSON
@@ -402,7 +430,10 @@ class ApiClient:
             content_type = header_params.get('Content-Type', '')
             is_xml = re.match(r'^application/(xml|[\w!#$&.+-^_]+\+xml)\s*(;|$)', content_type, re.IGNORECASE)
             if is_xml and hasattr(body, 'to_xml') and callable(getattr(body, 'to_xml')):
-                body = body.to_xml()
+                if self.configuration.stream_xml_body:
+                    body = rest.XmlModelPayload(body, content_type=content_type)
+                else:
+                    body = body.to_xml()
             else:
                 body = self.sanitize_for_serialization(body)
 
@@ -446,21 +477,124 @@ class ApiClient:
         :return: RESTResponse
         """
 
-        # Capture request details for examples
-        request_data = {
-            "method": method,
-            "url": url,
-            "headers": dict(header_params) if header_params else {},
-            "body": self._serialize_body_for_examples(body),
-            "post_params": dict(post_params) if post_params else None
-        }
+        self._log_request(method, url, header_params, body)
 
-        # Log the outgoing request (decoded, raw)
+        semaphore = self.request_semaphore
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            # perform request and return response
+            response_data = await self.rest_client.request(
+                method, url,
+                headers=header_params,
+                body=body, post_params=post_params,
+                _request_timeout=_request_timeout
+            )
+            resp_body = await response_data.read()
+
+        except ApiException as e:
+            raise e
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+        self._log_response(response_data, resp_body)
+
+        # Save examples if enabled
+        if self._examples_enabled:
+            # Capture request and response details with proper data handling
+            request_data = {
+                "method": method,
+                "url": url,
+                "headers": dict(header_params) if header_params else {},
+                "body": self._serialize_body_for_examples(body),
+                "post_params": dict(post_params) if post_params else None
+            }
+            response_example_data = {
+                "status": response_data.status if hasattr(response_data, 'status') else 200,
+                "headers": dict(response_data.getheaders()) if hasattr(response_data, 'getheaders') else {},
+                "data": self._get_parsed_response_data(resp_body)
+            }
+            await self._save_example(method, url, request_data, response_example_data)
+
+        return response_data
+
+    @contextlib.asynccontextmanager
+    async def stream_api(
+        self,
+        method,
+        url,
+        header_params=None,
+        body=None,
+        post_params=None,
+        _request_timeout=None
+    ) -> AsyncIterator[rest.RESTResponse]:
+        """Makes the HTTP request without reading the response body.
+
+        Use as ``async with api_client.stream_api(*params) as response:``
+        and consume ``response.response.content`` inside the block. The
+        connection and the concurrency slot are released on exit.
+        Responses with a non-2XX status are read and raised as ApiException.
+        :param method: Method to call.
+        :param url: Path to method endpoint.
+        :param header_params: Header parameters to be
+            placed in the request header.
+        :param body: Request body.
+        :param post_params dict: Request post form parameters,
+            for `application/x-www-form-urlencoded`, `multipart/form-data`.
+        :param _request_timeout: timeout setting for this request.
+        :return: RESTResponse
+        """
+        self._log_request(method, url, header_params, body)
+
+        semaphore = self.request_semaphore
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            response_data = await self.rest_client.request(
+                method, url,
+                headers=header_params,
+                body=body, post_params=post_params,
+                _request_timeout=_request_timeout
+            )
+            try:
+                if not 200 <= response_data.status <= 299:
+                    resp_body = await response_data.read()
+                    self._log_response(response_data, resp_body)
+                    raise ApiException.from_response(
+                        http_resp=response_data,
+                        body=resp_body.decode("utf-8", errors="replace"),
+                        data=None,
+                    )
+                logger.info(
+                    "HTTP RESPONSE: %s\nHeaders: %s\nBody: <streamed>",
+                    response_data.status,
+                    dict(response_data.getheaders())
+                )
+                yield response_data
+            finally:
+                response_data.response.release()
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def _log_request(self, method, url, header_params, body):
+        """Log the outgoing request (decoded, raw)"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
         if isinstance(body, bytes):
             try:
                 body_str = body.decode("utf-8")
             except Exception:
                 body_str = repr(body)
+        elif isinstance(body, rest.XmlModelPayload):
+            # Serializing the model again just for the log would hold the
+            # whole body in memory, which streaming is meant to avoid
+            logger.info(
+                "HTTP REQUEST: %s %s\nHeaders: %s\nBody: <streamed %s>",
+                method, url, header_params, type(body._value).__name__
+            )
+            return
         else:
             body_str = str(body)
         try:
@@ -473,20 +607,10 @@ class ApiClient:
             method, url, header_params, pretty_body
         )
 
-        try:
-            # perform request and return response
-            response_data = await self.rest_client.request(
-                method, url,
-                headers=header_params,
-                body=body, post_params=post_params,
-                _request_timeout=_request_timeout
-            )
-
-        except ApiException as e:
-            raise e
-
-        # Log the incoming response (decoded, raw)
-        resp_body = await response_data.read()
+    def _log_response(self, response_data, resp_body):
+        """Log the incoming response (decoded, raw)"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
         if isinstance(resp_body, bytes):
             try:
                 resp_body_str = resp_body.decode("utf-8")
@@ -507,7 +631,7 @@ class ApiClient:
             else:    
                 resp_json = json.loads(resp_body_str)
                 pretty_resp = json.dumps(resp_json, indent=4, ensure_ascii=False)
-        except (json.JSONDecodeError, UnicodeDecodeError):
+        except (json.JSONDecodeError, UnicodeDecodeError, etree.XMLSyntaxError):
             pretty_resp = resp_body_str
         logger.info(
             "HTTP RESPONSE: %s\nHeaders: %s\nBody: %s",
@@ -516,18 +640,6 @@ class ApiClient:
             pretty_resp
         )
 
-        # Capture response details for examples with proper data handling
-        response_example_data = {
-            "status": response_data.status if hasattr(response_data, 'status') else 200,
-            "headers": dict(response_data.getheaders()) if hasattr(response_data, 'getheaders') else {},
-            "data": self._get_parsed_response_data(resp_body)
-        }
-
-        # Save examples if enabled
-        await self._save_example(method, url, request_data, response_example_data)
-
-        return response_data
-
     def response_deserialize(
         self,
         response_data: rest.RESTResponse,
@@ -303,6 +303,24 @@ conf = iikoserver_client.Configuration(
            Default values is 100, None means no-limit.
         """
 
+        self.max_concurrent_requests: Optional[int] = None
+        """Maximum number of API requests the client sends in parallel.
+           iikoServer recommends sequential requests, set this to 1 for
+           production servers. None means the client does not limit
+           requests; the batch helpers then run
+           `helpers.concurrency.DEFAULT_CONCURRENCY` calls at a time.
+        """
+
+        self.stream_xml_body: bool = False
+        """Serialize XML request bodies while they are sent, in chunks and
+           without pretty-printing. By default the pretty-printed
+           ``to_xml()`` text is sent with a Content-Length; enable this for
+           large document imports on servers that accept chunked bodies.
+           Serialization runs on the event loop between chunk writes, so it
+           saves memory rather than CPU time on the loop; the streamed body
+           is not written to the request log.
+        """
+
         self.proxy: Optional[str] = None
         """Proxy URL
         """
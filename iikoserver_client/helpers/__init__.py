@@ -0,0 +1,33 @@
+# flake8: noqa
+
+# import hand-written helpers into helpers package
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.helpers.batching import (
+    chunk_ids, fetch_by_ids, products_by_ids, store_balances_by_products
+)
+from iikoserver_client.helpers.price_book import PriceBook
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.balance_snapshots import BalanceChange, StoreBalanceSnapshots
+from iikoserver_client.helpers.employee_directory import EmployeeDirectory
+from iikoserver_client.helpers.corporation_topology import CorporationTopology
+from iikoserver_client.helpers.xml_stream import aiter_xml_records, iter_xml_records, stream_xml_records
+from iikoserver_client.helpers.olap import fetch_olap_v1, olap_v2_table, parse_olap_v1
+from iikoserver_client.helpers.olap_planner import fetch_olap_wide, plan_olap_request, validate_olap_request
+from iikoserver_client.helpers.olap_cache import OlapCache, olap_request_key
+from iikoserver_client.helpers.olap_rollup import filter_table, rollup, rollup_levels, rollup_request, with_period
+from iikoserver_client.helpers.olap_presets import OlapPresetCatalog, preset_request
+from iikoserver_client.helpers.delivery_reports import fetch_delivery_report, parse_delivery_report
+from iikoserver_client.helpers.sales_report import fetch_sales, parse_sales_report
+from iikoserver_client.helpers.export import CsvTableWriter, ParquetTableWriter, open_table_writer
+from iikoserver_client.helpers.store_operations import export_store_operations, write_store_operations
+from iikoserver_client.helpers.food_cost import FoodCostBatch, plan_food_cost
+from iikoserver_client.helpers.income_plan import fetch_income_plan, plan_vs_actual
+from iikoserver_client.helpers.document_import import DocumentImporter, validate_document
+from iikoserver_client.helpers.inventory_import import InventoryWorkflow
+from iikoserver_client.helpers.invoice_mirror import InvoiceMirror
+from iikoserver_client.helpers.document_feed import DocumentChangeFeed
+from iikoserver_client.helpers.product_upsert import ProductCatalog, ProductUpserter
+from iikoserver_client.helpers.group_tree import GroupTreeSync, sync_categories
+from iikoserver_client.helpers.chart_publisher import ChartPublisher
+from iikoserver_client.helpers.image_store import ImageStore
+from iikoserver_client.helpers.cash_shift_closing import CashShiftCloser
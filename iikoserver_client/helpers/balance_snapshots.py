@@ -0,0 +1,211 @@
+"""Store balance snapshots with change detection (`v2_reports_balance_stores_get`)."""
+
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.models.store_balance import StoreBalance
+
+BALANCE_CHANGE_SCHEMA = {
+    "store": "",
+    "product": "",
+    "amount": "d",
+    "sum": "d",
+    "amount_delta": "d",
+    "sum_delta": "d",
+}
+
+_HISTORY_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class BalanceChange(NamedTuple):
+    """Balance of one product on one store that differs from the previous snapshot"""
+
+    store: str
+    product: str
+    amount: float
+    sum: float
+    amount_delta: float
+    sum_delta: float
+
+
+class StoreBalanceSnapshots:
+    """Last known balance per (store, product) and a feed of its changes.
+
+    Balances live in two `array('d')` columns indexed by a dict, so a table
+    of a few hundred thousand positions stays compact. Each `update()`
+    compares a fresh report with the table and returns only the changed
+    positions; positions missing from the report inside its scope are
+    reported as dropped to zero and removed.
+
+    :param history_path: directory where every non-empty change set is
+        written as a columnar file named after its timestamp; change sets
+        of the same second get a sequence suffix.
+    :param tolerance: absolute difference below which values are equal.
+    """
+
+    def __init__(
+        self,
+        history_path: Optional[Union[str, Path]] = None,
+        tolerance: float = 1e-9,
+    ) -> None:
+        self.history_path = Path(history_path) if history_path else None
+        self.tolerance = tolerance
+        self.timestamp: Optional[datetime] = None
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._stores: List[str] = []
+        self._products: List[str] = []
+        self._amounts = array("d")
+        self._sums = array("d")
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+    def get(self, store: str, product: str) -> Optional[Tuple[float, float]]:
+        """Return the last (amount, sum) of a product on a store."""
+        row = self._index.get((store, product))
+        if row is None:
+            return None
+        return self._amounts[row], self._sums[row]
+
+    async def poll(
+        self,
+        api,
+        timestamp: Optional[datetime] = None,
+        department: Optional[List[str]] = None,
+        store: Optional[List[str]] = None,
+        product: Optional[List[str]] = None,
+    ) -> List[BalanceChange]:
+        """Load balances through `ReportsV2Api` and apply them.
+
+        Filters limit the report and the scope in which missing positions
+        count as removed.
+
+        :raises ApiValueError: for a `department` filter without `store`:
+            the stores of the department are not known here, so every
+            position outside it would be reported as removed.
+        """
+        if department and not store:
+            raise ApiValueError("A department filter needs the stores of the department")
+        timestamp = timestamp or datetime.now().replace(microsecond=0)
+        balances = await api.v2_reports_balance_stores_get(
+            timestamp=timestamp, department=department, store=store, product=product
+        )
+        return self.update(balances or [], timestamp, stores=store, products=product)
+
+    def update(
+        self,
+        balances: Iterable[StoreBalance],
+        timestamp: Optional[datetime] = None,
+        stores: Optional[Iterable[str]] = None,
+        products: Optional[Iterable[str]] = None,
+    ) -> List[BalanceChange]:
+        """Apply a balance report and return the changes it introduces.
+
+        :param balances: full report for the scope.
+        :param timestamp: accounting time of the report.
+        :param stores: stores the report covers, all stores when None.
+        :param products: products the report covers, all products when None.
+        """
+        tolerance = self.tolerance
+        changes: List[BalanceChange] = []
+        seen = set()
+        for balance in balances:
+            key = (balance.store, balance.product)
+            seen.add(key)
+            amount = float(balance.amount)
+            total = float(balance.sum)
+            row = self._index.get(key)
+            if row is None:
+                self._index[key] = len(self._stores)
+                self._stores.append(balance.store)
+                self._products.append(balance.product)
+                self._amounts.append(amount)
+                self._sums.append(total)
+                if abs(amount) > tolerance or abs(total) > tolerance:
+                    changes.append(
+                        BalanceChange(balance.store, balance.product, amount, total, amount, total)
+                    )
+                continue
+            amount_delta = amount - self._amounts[row]
+            sum_delta = total - self._sums[row]
+            if abs(amount_delta) > tolerance or abs(sum_delta) > tolerance:
+                self._amounts[row] = amount
+                self._sums[row] = total
+                changes.append(
+                    BalanceChange(
+                        balance.store, balance.product, amount, total, amount_delta, sum_delta
+                    )
+                )
+
+        store_scope = set(stores) if stores is not None else None
+        product_scope = set(products) if products is not None else None
+        removed = [
+            key for key in self._index
+            if key not in seen
+            and (store_scope is None or key[0] in store_scope)
+            and (product_scope is None or key[1] in product_scope)
+        ]
+        for key in removed:
+            row = self._index[key]
+            amount, total = self._amounts[row], self._sums[row]
+            if abs(amount) > tolerance or abs(total) > tolerance:
+                changes.append(BalanceChange(key[0], key[1], 0.0, 0.0, -amount, -total))
+            self._remove(key)
+
+        if timestamp is not None:
+            self.timestamp = timestamp
+        if changes and self.history_path is not None:
+            self._write_history(self.history_path, changes, timestamp or datetime.now())
+        return changes
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Drop a row by moving the last row into its slot."""
+        row = self._index.pop(key)
+        last = len(self._stores) - 1
+        if row != last:
+            self._stores[row] = self._stores[last]
+            self._products[row] = self._products[last]
+            self._amounts[row] = self._amounts[last]
+            self._sums[row] = self._sums[last]
+            self._index[(self._stores[row], self._products[row])] = row
+        del self._stores[last]
+        del self._products[last]
+        del self._amounts[last]
+        del self._sums[last]
+
+    def to_table(self) -> ColumnTable:
+        """Return a copy of the current balances."""
+        return ColumnTable({
+            "store": list(self._stores),
+            "product": list(self._products),
+            "amount": array("d", self._amounts),
+            "sum": array("d", self._sums),
+        })
+
+    def _write_history(
+        self, directory: Path, changes: List[BalanceChange], timestamp: datetime
+    ) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        table = ColumnTable.from_rows(
+            list(BALANCE_CHANGE_SCHEMA), changes, BALANCE_CHANGE_SCHEMA
+        )
+        stem = timestamp.strftime(_HISTORY_TIMESTAMP_FORMAT)
+        path = directory / "{0}.cols.gz".format(stem)
+        sequence = 0
+        while path.exists():
+            sequence += 1
+            path = directory / "{0}_{1:06d}.cols.gz".format(stem, sequence)
+        table.write(path)
+
+    def history(self) -> Iterator[Tuple[datetime, ColumnTable]]:
+        """Iterate over stored change sets in chronological order."""
+        if self.history_path is None or not self.history_path.exists():
+            return
+        for path in sorted(self.history_path.glob("*.cols.gz")):
+            stem = path.name.split(".")[0].split("_")[0]
+            timestamp = datetime.strptime(stem, _HISTORY_TIMESTAMP_FORMAT)
+            yield timestamp, ColumnTable.read(path)
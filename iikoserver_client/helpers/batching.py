@@ -0,0 +1,190 @@
+"""Chunked lookups for endpoints that filter by a list of ids.
+
+GET endpoints send every id as a separate query parameter
+(`?ids=a&ids=b...`), so long lists exceed the URL limits of the server
+or proxies in front of it. The helpers below split id lists into chunks
+that fit the URL, run the chunks in parallel and merge the results.
+"""
+
+import functools
+from datetime import datetime
+from typing import (
+    Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+)
+from urllib.parse import quote
+
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.models.product_dto import ProductDto
+from iikoserver_client.models.store_balance import StoreBalance
+
+T = TypeVar("T")
+
+DEFAULT_MAX_QUERY_LENGTH = 4000
+"""Budget in characters for the id part of a query string"""
+
+DEFAULT_MAX_POST_CHUNK_SIZE = 1000
+"""Ids per form-encoded POST request, to keep server response times sane"""
+
+
+def unique_ids(ids: Iterable[str]) -> List[str]:
+    """Drop duplicate ids, keeping the first occurrence order."""
+    return list(dict.fromkeys(ids))
+
+
+def chunk_ids(
+    ids: Iterable[str],
+    param_name: str = "ids",
+    max_query_length: Optional[int] = DEFAULT_MAX_QUERY_LENGTH,
+    max_chunk_size: Optional[int] = None,
+) -> List[List[str]]:
+    """Split ids into chunks whose encoded `param_name=id&...` query part
+    stays within `max_query_length` characters and `max_chunk_size` items.
+
+    Either bound may be None to disable it. An id that does not fit into
+    an empty chunk on its own still gets a chunk of its own.
+    """
+    chunks: List[List[str]] = []
+    chunk: List[str] = []
+    length = 0
+    for value in ids:
+        # "&" + "name=" + encoded value
+        item_length = len(param_name) + len(quote(str(value))) + 2
+        too_long = (
+            max_query_length is not None
+            and length + item_length > max_query_length
+        )
+        too_many = max_chunk_size is not None and len(chunk) >= max_chunk_size
+        if chunk and (too_long or too_many):
+            chunks.append(chunk)
+            chunk = []
+            length = 0
+        chunk.append(value)
+        length += item_length
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+async def fetch_by_ids(
+    fetch: Callable[[List[str]], Awaitable[Optional[List[T]]]],
+    ids: Iterable[str],
+    *,
+    id_of: Callable[[T], str] = lambda item: item.id,  # type: ignore[attr-defined]
+    key: Optional[Callable[[T], Hashable]] = None,
+    post_fetch: Optional[Callable[[List[str]], Awaitable[Optional[List[T]]]]] = None,
+    param_name: str = "ids",
+    max_query_length: Optional[int] = DEFAULT_MAX_QUERY_LENGTH,
+    max_chunk_size: Optional[int] = None,
+    max_post_chunk_size: Optional[int] = DEFAULT_MAX_POST_CHUNK_SIZE,
+    api_client=None,
+    limit: Optional[int] = None,
+) -> List[T]:
+    """Call `fetch` for URL-sized chunks of `ids` and merge the results.
+
+    :param fetch: coroutine function taking a chunk of ids (usually a
+        `functools.partial` of a GET API method).
+    :param ids: ids to look up, duplicates are requested only once.
+    :param id_of: returns the input id an item was matched by; results are
+        ordered like `ids`, unmatched items go last in arrival order.
+    :param key: identity used to drop duplicated items, `id_of` by default.
+    :param post_fetch: POST variant of the same lookup. It is used instead
+        of `fetch` when the ids do not fit into a single URL; ids then travel
+        in the request body and chunks are bounded by `max_post_chunk_size`.
+    :param param_name: query parameter name used to estimate URL length.
+    :param api_client: client whose concurrency policy bounds parallelism.
+    :param limit: explicit parallelism, overrides the client policy.
+    :return: merged list of items.
+    """
+    ids = unique_ids(ids)
+    if not ids:
+        return []
+
+    call = fetch
+    chunks = chunk_ids(ids, param_name, max_query_length, max_chunk_size)
+    if post_fetch is not None and len(chunks) > 1:
+        call = post_fetch
+        chunks = chunk_ids(ids, param_name, None, max_post_chunk_size)
+
+    results = await gather_limited(
+        [functools.partial(call, chunk) for chunk in chunks],
+        concurrency_limit(api_client, limit),
+    )
+
+    key = key or id_of
+    position: Dict[str, int] = {value: index for index, value in enumerate(ids)}
+    unmatched = len(position)
+    seen = set()
+    ranked: List[Tuple[int, int, T]] = []
+    for items in results:
+        for item in items or ():
+            item_key = key(item)
+            if item_key in seen:
+                continue
+            seen.add(item_key)
+            rank = position.get(id_of(item))
+            if rank is None:
+                rank = unmatched
+                unmatched += 1
+            ranked.append((rank, len(ranked), item))
+    ranked.sort(key=lambda entry: entry[:2])
+    return [item for _, _, item in ranked]
+
+
+async def products_by_ids(
+    api,
+    ids: Iterable[str],
+    include_deleted: Optional[bool] = None,
+    limit: Optional[int] = None,
+) -> List[ProductDto]:
+    """Load products by id through `NomenclatureManagementApi`.
+
+    Short lists go through the GET endpoint, longer ones through the
+    form-encoded POST variant, so the id count is not bound by URL length.
+    """
+    async def post_fetch(chunk: List[str]):
+        return await api.v2_entities_products_list_post(
+            include_deleted=include_deleted, ids=chunk
+        )
+
+    async def fetch(chunk: List[str]):
+        return await api.v2_entities_products_list_get(
+            include_deleted=include_deleted, ids=chunk
+        )
+
+    return await fetch_by_ids(
+        fetch, ids, post_fetch=post_fetch, api_client=api.api_client, limit=limit
+    )
+
+
+async def store_balances_by_products(
+    api,
+    timestamp: datetime,
+    products: Iterable[str],
+    store: Optional[List[str]] = None,
+    department: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+) -> List[StoreBalance]:
+    """Load store balances for many products through `ReportsV2Api`.
+
+    The endpoint has no POST variant, so the query-string budget left by the
+    `store` and `department` filters is shared with the product ids.
+    """
+    budget = DEFAULT_MAX_QUERY_LENGTH
+    for name, values in (("store", store), ("department", department)):
+        budget -= sum(len(name) + len(quote(value)) + 2 for value in values or ())
+
+    async def fetch(chunk: List[str]):
+        return await api.v2_reports_balance_stores_get(
+            timestamp=timestamp, department=department, store=store, product=chunk
+        )
+
+    return await fetch_by_ids(
+        fetch,
+        products,
+        id_of=lambda balance: balance.product,
+        key=lambda balance: (balance.store, balance.product),
+        param_name="product",
+        max_query_length=max(budget, 1),
+        api_client=api.api_client,
+        limit=limit,
+    )
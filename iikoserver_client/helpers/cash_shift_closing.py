@@ -0,0 +1,262 @@
+"""End-of-day acceptance of cash shifts.
+
+Accepting a shift takes the shift list, the payments and the closed
+session document of every shift and a save of the edited document.
+`CashShiftCloser` prefetches payments and documents of all listed shifts
+in parallel, `accept_document` turns them into a document ready to
+accept, and the accepts run under the client concurrency limit with their
+`CashShiftValidationErrorsDto` collected into one `ShiftCloseReport`.
+"""
+
+import functools
+from datetime import date
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.models.cash_shift_dto import CashShiftDto
+from iikoserver_client.models.cash_shift_payments_dto import CashShiftPaymentsDto
+from iikoserver_client.models.cash_shift_save_response_dto import CashShiftSaveResponseDto
+from iikoserver_client.models.cash_shift_status_enum import CashShiftStatusEnum
+from iikoserver_client.models.cash_shift_validation_errors_dto import CashShiftValidationErrorsDto
+from iikoserver_client.models.closed_session_document_dto import ClosedSessionDocumentDto
+from iikoserver_client.models.closed_session_document_item_dto import ClosedSessionDocumentItemDto
+
+SHIFT_ERRORS_SCHEMA = {
+    "shift_id": "",
+    "session_number": "q",
+    "item": "q",
+    "code": "",
+    "value": "",
+}
+
+
+class ShiftClosing(NamedTuple):
+    """A shift with its prefetched payments and closed session document.
+
+    `error` is set instead of the document when the prefetch failed.
+    """
+
+    shift: CashShiftDto
+    payments: Optional[CashShiftPaymentsDto] = None
+    document: Optional[ClosedSessionDocumentDto] = None
+    error: Optional[BaseException] = None
+
+
+def _accepted_status(status: Optional[str], accept_warnings: bool) -> str:
+    if status == CashShiftStatusEnum.HASWARNINGS and not accept_warnings:
+        return CashShiftStatusEnum.HASWARNINGS.value
+    return CashShiftStatusEnum.ACCEPTED.value
+
+
+def accept_document(
+    document: ClosedSessionDocumentDto,
+    payments: Optional[CashShiftPaymentsDto] = None,
+    accept_warnings: bool = False,
+) -> ClosedSessionDocumentDto:
+    """Copy of `document` with its items accepted.
+
+    Payment records of the shift that have no item yet are added as
+    accepted items carrying the sum, account and counteragent of the
+    record. Items and records with warnings keep the ``HASWARNINGS``
+    status for a manual review unless `accept_warnings` is set.
+    """
+    items = [
+        item.model_copy(update={"status": _accepted_status(item.status, accept_warnings)})
+        for item in document.items
+    ]
+    known = {item.transaction_id for item in items}
+    number = max((item.num for item in items), default=0)
+    records = []
+    if payments is not None:
+        records = payments.cashless_records + payments.pay_in_records + payments.pay_outs_records
+    for record in records:
+        if record.info.id in known:
+            continue
+        number += 1
+        known.add(record.info.id)
+        items.append(ClosedSessionDocumentItemDto(
+            num=number,
+            transactionId=record.info.id,
+            sumReal=record.actual_sum,
+            accountOverrideId=record.edited_pay_account_id,
+            counteragentOverrideId=record.pay_agent_id,
+            status=_accepted_status(record.status, accept_warnings),
+            comment=record.editable_comment,
+        ))
+    return document.model_copy(update={"items": items})
+
+
+def _has_errors(errors: Optional[CashShiftValidationErrorsDto]) -> bool:
+    return errors is not None and bool(errors.document_error or errors.item_error)
+
+
+class ShiftAcceptResult(NamedTuple):
+    """Outcome of accepting one shift.
+
+    The shift counts as accepted only when the save reported no errors,
+    the saved shift has the ``ACCEPTED`` status and no item was left with
+    warnings.
+    """
+
+    shift: CashShiftDto
+    document: Optional[ClosedSessionDocumentDto]
+    response: Optional[CashShiftSaveResponseDto] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def accepted(self) -> bool:
+        response = self.response
+        if response is None or _has_errors(response.errors):
+            return False
+        if response.status != CashShiftStatusEnum.ACCEPTED:
+            return False
+        return not any(
+            item.status == CashShiftStatusEnum.HASWARNINGS for item in response.document.items
+        )
+
+
+class ShiftCloseReport:
+    """Accept results in shift order."""
+
+    def __init__(self, results: List[ShiftAcceptResult]) -> None:
+        self.results = results
+
+    @property
+    def ok(self) -> bool:
+        return all(result.accepted for result in self.results)
+
+    def accepted(self) -> List[ShiftAcceptResult]:
+        return [result for result in self.results if result.accepted]
+
+    def rejected(self) -> List[ShiftAcceptResult]:
+        return [result for result in self.results if not result.accepted]
+
+    def table(self) -> ColumnTable:
+        """One row per validation error or failure, e.g. for
+        `CsvTableWriter.write_table`; ``item`` is 0 for document errors."""
+        table = ColumnTable.empty(SHIFT_ERRORS_SCHEMA)
+        for result in self.results:
+            shift = result.shift
+            if result.error is not None:
+                table.append((shift.id, shift.session_number, 0, "FAILED", str(result.error)))
+                continue
+            errors = result.response.errors if result.response is not None else None
+            if errors is None:
+                continue
+            for error in errors.document_error or []:
+                table.append((shift.id, shift.session_number, 0, error.code, error.value))
+            for item in errors.item_error or []:
+                for error in item.error:
+                    table.append(
+                        (shift.id, shift.session_number, item.identifier, error.code, error.value)
+                    )
+        return table
+
+
+class CashShiftCloser:
+    """Prefetches and accepts cash shifts through `CashShiftsManagementApi`.
+
+    Accepting saves a document with a fixed id, so a repeated save does
+    not create anything new and transient failures are retried.
+
+    :param attempts: tries per request for transient failures.
+    :param accept_warnings: accept items with warnings too, see
+        `accept_document`.
+    """
+
+    def __init__(
+        self,
+        api,
+        attempts: int = 3,
+        retry_delay: float = 0.5,
+        accept_warnings: bool = False,
+    ) -> None:
+        self.api = api
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.accept_warnings = accept_warnings
+
+    def _retry(self, factory):
+        return retry_call(factory, self.attempts, self.retry_delay)
+
+    async def _closing(self, shift: CashShiftDto) -> ShiftClosing:
+        try:
+            payments = await self._retry(
+                functools.partial(
+                    self.api.v2_cashshifts_payments_list_session_id_get,
+                    session_id=shift.id, hide_accepted=True,
+                )
+            )
+            document = await self._retry(
+                functools.partial(
+                    self.api.v2_cashshifts_closed_session_document_id_get, id=shift.id
+                )
+            )
+        except Exception as error:
+            return ShiftClosing(shift, error=error)
+        return ShiftClosing(shift, payments, document)
+
+    async def prefetch(
+        self,
+        open_date_from: date,
+        open_date_to: date,
+        department_ids: Optional[Sequence[str]] = None,
+        status: CashShiftStatusEnum = CashShiftStatusEnum.UNACCEPTED,
+        limit: Optional[int] = None,
+    ) -> List[ShiftClosing]:
+        """List the shifts of a period and load what accepting them needs.
+
+        A shift whose payments or document cannot be loaded is returned
+        with `ShiftClosing.error` and reported as failed by `accept`.
+
+        :param limit: parallel requests, the client policy by default.
+        """
+        shifts = await self._retry(functools.partial(
+            self.api.v2_cashshifts_list_get,
+            open_date_from=open_date_from,
+            open_date_to=open_date_to,
+            status=status,
+            department_id=list(department_ids) if department_ids else None,
+        )) or []
+        return await gather_limited(
+            [functools.partial(self._closing, shift) for shift in shifts],
+            concurrency_limit(self.api.api_client, limit),
+        )
+
+    async def _accept(self, closing: ShiftClosing) -> ShiftAcceptResult:
+        if closing.document is None:
+            return ShiftAcceptResult(closing.shift, None, error=closing.error)
+        document = accept_document(closing.document, closing.payments, self.accept_warnings)
+        try:
+            response = await self._retry(
+                functools.partial(
+                    self.api.v2_cashshifts_save_post, closed_session_document_dto=document
+                )
+            )
+        except Exception as error:
+            return ShiftAcceptResult(closing.shift, document, error=error)
+        return ShiftAcceptResult(closing.shift, document, response)
+
+    async def accept(
+        self, closings: Iterable[ShiftClosing], limit: Optional[int] = None
+    ) -> ShiftCloseReport:
+        """Accept prefetched shifts; a rejected shift does not stop the others."""
+        results = await gather_limited(
+            [functools.partial(self._accept, closing) for closing in closings],
+            concurrency_limit(self.api.api_client, limit),
+        )
+        return ShiftCloseReport(results)
+
+    async def close_day(
+        self,
+        open_date_from: date,
+        open_date_to: Optional[date] = None,
+        department_ids: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> ShiftCloseReport:
+        """Accept every unaccepted shift opened in a period, one day by default."""
+        closings = await self.prefetch(
+            open_date_from, open_date_to or open_date_from, department_ids, limit=limit
+        )
+        return await self.accept(closings, limit)
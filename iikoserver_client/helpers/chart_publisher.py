@@ -0,0 +1,257 @@
+"""Bulk publishing of assembly charts in dependency order.
+
+A chart writes off ingredients, and semi-finished ingredients have their
+own charts. `chart_levels` orders a batch of charts so that the charts of
+the ingredients come before the charts that use them. `ChartPublisher`
+saves every level in parallel through `v2_assembly_charts_save_post` and
+skips charts whose content matches the version saved or loaded last.
+"""
+
+import functools
+import hashlib
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.models.assembly_chart_dto import AssemblyChartDto
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.id_codet_dto import IdCodetDto
+from iikoserver_client.models.request_result_dto_enum import RequestResultDtoEnum
+from iikoserver_client.models.save_assembly_chart_dto import SaveAssemblyChartDto
+
+
+def chart_key(chart: Any) -> str:
+    """Key of a chart: the assembled product and the first day."""
+    value = chart.date_from
+    if isinstance(value, date):
+        value = value.isoformat()
+    return "{0}|{1}".format(chart.assembled_product_id, value)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def chart_fingerprint(chart: Union[SaveAssemblyChartDto, AssemblyChartDto]) -> str:
+    """Hash of the saved content of a chart.
+
+    Ids of a live chart and of its lines are not part of the content, and
+    neither the order of lines nor integer vs float amounts matter, so a
+    live chart and the `SaveAssemblyChartDto` it was saved from have the
+    same fingerprint.
+    """
+    saved = SaveAssemblyChartDto.from_dict(chart.to_dict())
+    if saved is None:
+        raise ApiValueError("Assembly chart has no content")
+    data = _normalize(saved.to_dict())
+    data["items"] = sorted(
+        json.dumps(item, sort_keys=True, default=str) for item in data.get("items") or []
+    )
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def chart_levels(charts: Iterable[SaveAssemblyChartDto]) -> List[List[SaveAssemblyChartDto]]:
+    """Group charts so that every chart follows the charts of its ingredients.
+
+    Only dependencies inside the batch are considered: an ingredient
+    whose chart is not in `charts` does not hold anything back.
+
+    :raises ApiValueError: when charts depend on each other in a cycle.
+    """
+    charts = list(charts)
+    producers: Dict[str, Set[int]] = {}
+    for index, chart in enumerate(charts):
+        producers.setdefault(chart.assembled_product_id, set()).add(index)
+    depends: List[Set[int]] = []
+    for index, chart in enumerate(charts):
+        needed: Set[int] = set()
+        for item in chart.items:
+            needed.update(producers.get(item.product_id, ()))
+        needed.discard(index)
+        depends.append(needed)
+
+    levels: List[List[SaveAssemblyChartDto]] = []
+    placed: Set[int] = set()
+    while len(placed) < len(charts):
+        ready = [
+            index for index in range(len(charts))
+            if index not in placed and depends[index] <= placed
+        ]
+        if not ready:
+            raise ApiValueError("Assembly charts depend on each other: {0}".format(", ".join(
+                sorted({charts[index].assembled_product_id
+                        for index in range(len(charts)) if index not in placed})
+            )))
+        levels.append([charts[index] for index in ready])
+        placed.update(ready)
+    return levels
+
+
+class ChartPublishReport(NamedTuple):
+    """Outcome of a publish, keyed by `chart_key`"""
+
+    saved: List[AssemblyChartDto]
+    unchanged: List[str]
+    skipped: List[str]
+    errors: Dict[str, List[ErrorDto]]
+    failures: Dict[str, BaseException]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.failures and not self.skipped
+
+
+class ChartDeleteReport(NamedTuple):
+    """Outcome of a delete, keyed by chart id"""
+
+    deleted: List[str]
+    errors: Dict[str, List[ErrorDto]]
+    failures: Dict[str, BaseException]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.failures
+
+
+class ChartPublisher:
+    """Saves assembly charts through `NomenclatureManagementApi`.
+
+    The cache maps `chart_key` to the id and fingerprint of the last known
+    version; it is filled by `load` and by successful saves and kept in
+    `cache_path` between runs. A chart whose ingredient chart failed is
+    skipped, so no chart is published on top of an outdated ingredient.
+
+    :param cache_path: JSON file keeping the cache between runs.
+    """
+
+    def __init__(self, api, cache_path: Optional[Union[str, Path]] = None) -> None:
+        self.api = api
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.cache: Dict[str, Dict[str, str]] = {}
+        if self.cache_path is not None and self.cache_path.exists():
+            with open(self.cache_path, encoding="utf-8") as stream:
+                self.cache = json.load(stream)
+
+    def save(self) -> None:
+        """Write the cache to `cache_path`."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as stream:
+            json.dump(self.cache, stream)
+        os.replace(temporary, self.cache_path)
+
+    def remember(self, chart: AssemblyChartDto) -> None:
+        self.cache[chart_key(chart)] = {"id": chart.id, "hash": chart_fingerprint(chart)}
+
+    async def load(self, date_from: date, date_to: Optional[date] = None) -> int:
+        """Fill the cache with the live charts of a period.
+
+        :return: number of charts loaded.
+        """
+        result = await self.api.v2_assembly_charts_get_all_get(
+            date_from=date_from, date_to=date_to
+        )
+        charts = [chart for chart in result.assembly_charts or [] if chart is not None]
+        for chart in charts:
+            self.remember(chart)
+        self.save()
+        return len(charts)
+
+    async def _save_chart(
+        self, chart: SaveAssemblyChartDto, report: ChartPublishReport
+    ) -> None:
+        key = chart_key(chart)
+        try:
+            response = await self.api.v2_assembly_charts_save_post(save_assembly_chart_dto=chart)
+        except Exception as error:
+            report.failures[key] = error
+            return
+        if response.result != RequestResultDtoEnum.SUCCESS or response.response is None:
+            report.errors[key] = response.errors or []
+            return
+        self.remember(response.response)
+        report.saved.append(response.response)
+
+    async def publish(
+        self, charts: Iterable[SaveAssemblyChartDto], limit: Optional[int] = None
+    ) -> ChartPublishReport:
+        """Save the charts that differ from the cache, level by level.
+
+        :param limit: parallel requests, the client policy by default.
+        """
+        limit = concurrency_limit(self.api.api_client, limit)
+        report = ChartPublishReport([], [], [], {}, {})
+        broken: Set[str] = set()
+        try:
+            for level in chart_levels(charts):
+                pending = []
+                for chart in level:
+                    key = chart_key(chart)
+                    if any(item.product_id in broken for item in chart.items):
+                        report.skipped.append(key)
+                        broken.add(chart.assembled_product_id)
+                    elif self.cache.get(key, {}).get("hash") == chart_fingerprint(chart):
+                        report.unchanged.append(key)
+                    else:
+                        pending.append(chart)
+                await gather_limited(
+                    [functools.partial(self._save_chart, chart, report) for chart in pending],
+                    limit,
+                )
+                broken.update(
+                    chart.assembled_product_id for chart in pending
+                    if chart_key(chart) in report.errors or chart_key(chart) in report.failures
+                )
+        finally:
+            self.save()
+        return report
+
+    async def delete(
+        self, chart_ids: Iterable[str], limit: Optional[int] = None
+    ) -> ChartDeleteReport:
+        """Delete charts by id and drop them from the cache.
+
+        A chart that fails does not stop the others; server errors and
+        exceptions are reported per chart id.
+        """
+        report = ChartDeleteReport([], {}, {})
+
+        async def delete_chart(chart_id: str) -> None:
+            try:
+                response = await retry_call(
+                    functools.partial(
+                        self.api.v2_assembly_charts_delete_post,
+                        id_codet_dto=IdCodetDto(id=chart_id),
+                    )
+                )
+            except Exception as error:
+                report.failures[chart_id] = error
+                return
+            if response.result != RequestResultDtoEnum.SUCCESS:
+                report.errors[chart_id] = response.errors or []
+                return
+            report.deleted.append(chart_id)
+            for key in [key for key, value in self.cache.items() if value["id"] == chart_id]:
+                del self.cache[key]
+
+        try:
+            await gather_limited(
+                [functools.partial(delete_chart, chart_id) for chart_id in chart_ids],
+                concurrency_limit(self.api.api_client, limit),
+            )
+        finally:
+            self.save()
+        return report
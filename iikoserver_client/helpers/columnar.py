@@ -0,0 +1,223 @@
+"""Minimal column-oriented table shared by the reporting helpers.
+
+Numeric columns are kept in `array.array` buffers and everything else in
+plain lists. pandas and pyarrow are optional: they are imported only by
+the matching conversion methods.
+"""
+
+import gzip
+import json
+from array import array
+from datetime import date, datetime
+from pathlib import Path
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Mapping, MutableSequence, Optional,
+    Sequence, Tuple, Union
+)
+
+Column = MutableSequence[Any]
+
+
+def new_column(typecode: str = "") -> Column:
+    """Create an empty column; `typecode` is an `array` type code or "" for a list."""
+    return array(typecode) if typecode else []
+
+
+def column_typecode(column: Sequence[Any]) -> str:
+    return column.typecode if isinstance(column, array) else ""
+
+
+def _as_column(values: Iterable[Any]) -> Column:
+    if isinstance(values, (array, list)):
+        return values
+    return list(values)
+
+
+class ColumnTable:
+    """Equally long named columns.
+
+    :param columns: mapping of column name to values. `array.array` and
+        list columns are used as is, other iterables are copied to a list.
+    """
+
+    def __init__(self, columns: Mapping[str, Iterable[Any]]) -> None:
+        self.columns: Dict[str, Column] = {
+            name: _as_column(values) for name, values in columns.items()
+        }
+        lengths = {len(column) for column in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+
+    @classmethod
+    def empty(cls, schema: Mapping[str, str]) -> "ColumnTable":
+        """Create an empty table from a name -> typecode mapping."""
+        return cls({name: new_column(typecode) for name, typecode in schema.items()})
+
+    @classmethod
+    def from_rows(
+        cls,
+        names: Sequence[str],
+        rows: Iterable[Sequence[Any]],
+        schema: Optional[Mapping[str, str]] = None,
+    ) -> "ColumnTable":
+        schema = schema or {}
+        table = cls.empty({name: schema.get(name, "") for name in names})
+        for row in rows:
+            table.append(row)
+        return table
+
+    @classmethod
+    def concat(cls, tables: Iterable["ColumnTable"]) -> "ColumnTable":
+        """Stack tables with the same columns.
+
+        A column whose type code differs between the tables becomes a list.
+        """
+        tables = list(tables)
+        if not tables:
+            return cls({})
+        result = cls.empty(tables[0].schema)
+        for table in tables:
+            if table.column_names != result.column_names:
+                raise ValueError("Cannot concatenate tables with different columns")
+            for name, column in table.columns.items():
+                target = result.columns[name]
+                if column_typecode(target) != column_typecode(column):
+                    target = result.columns[name] = list(target)
+                target.extend(column)
+        return result
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self.columns)
+
+    @property
+    def schema(self) -> Dict[str, str]:
+        return {name: column_typecode(column) for name, column in self.columns.items()}
+
+    @property
+    def num_rows(self) -> int:
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __getitem__(self, name: str) -> Column:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def append(self, row: Sequence[Any]) -> None:
+        """Append one row given in `column_names` order."""
+        for column, value in zip(self.columns.values(), row):
+            column.append(value)
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        return zip(*self.columns.values())
+
+    def select(self, names: Sequence[str]) -> "ColumnTable":
+        return ColumnTable({name: self.columns[name] for name in names})
+
+    def take(self, indices: Sequence[int]) -> "ColumnTable":
+        """Return the rows at `indices` as a new table."""
+        return ColumnTable({
+            name: (
+                array(column.typecode, [column[i] for i in indices])
+                if isinstance(column, array) else [column[i] for i in indices]
+            )
+            for name, column in self.columns.items()
+        })
+
+    def to_pydict(self) -> Dict[str, List[Any]]:
+        return {name: list(column) for name, column in self.columns.items()}
+
+    def to_pandas(self):
+        """Convert to a `pandas.DataFrame` (requires pandas)."""
+        import pandas
+
+        return pandas.DataFrame(
+            {name: list(column) for name, column in self.columns.items()},
+            columns=self.column_names,
+        )
+
+    def to_arrow(self):
+        """Convert to a `pyarrow.Table` (requires pyarrow)."""
+        import pyarrow
+
+        return pyarrow.table(
+            {name: list(column) for name, column in self.columns.items()}
+        )
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Save the table as a gzip-compressed columnar file.
+
+        The file holds a JSON header line with the schema followed by one
+        JSON line per column. Date and datetime list columns are stored as
+        ISO strings and restored by `read()`.
+        """
+        temporal = {}
+        for name, column in self.columns.items():
+            kind = _temporal_kind(column)
+            if kind:
+                temporal[name] = kind
+        header = {"schema": self.schema, "temporal": temporal}
+        with gzip.open(path, "wt", encoding="utf-8") as stream:
+            stream.write(json.dumps(header, ensure_ascii=False))
+            stream.write("\n")
+            for column in self.columns.values():
+                stream.write(json.dumps(_column_to_json(column), ensure_ascii=False))
+                stream.write("\n")
+
+    @classmethod
+    def read(cls, path: Union[str, Path]) -> "ColumnTable":
+        """Load a table saved with `write()`."""
+        with gzip.open(path, "rt", encoding="utf-8") as stream:
+            header = json.loads(stream.readline())
+            temporal = header.get("temporal", {})
+            columns = {}
+            for name, typecode in header["schema"].items():
+                values = json.loads(stream.readline())
+                if name in temporal:
+                    parse = _TEMPORAL_PARSERS[temporal[name]]
+                    values = [None if value is None else parse(value) for value in values]
+                columns[name] = array(typecode, values) if typecode else values
+        return cls(columns)
+
+    def __repr__(self) -> str:
+        return "ColumnTable(columns={0}, num_rows={1})".format(
+            self.column_names, self.num_rows
+        )
+
+
+_TEMPORAL_PARSERS = {"date": date.fromisoformat, "datetime": datetime.fromisoformat}
+
+
+def _temporal_kind(column: Column) -> str:
+    """Return "date" or "datetime" when every value of the column is one."""
+    if isinstance(column, array):
+        return ""
+    kind = ""
+    for value in column:
+        if value is None:
+            continue
+        value_kind = (
+            "datetime" if isinstance(value, datetime)
+            else "date" if isinstance(value, date) else ""
+        )
+        if not value_kind or kind and kind != value_kind:
+            return ""
+        kind = value_kind
+    return kind
+
+
+def _column_to_json(column: Column) -> List[Any]:
+    if isinstance(column, array):
+        return column.tolist()
+    return [
+        value if value is None or isinstance(value, (str, int, float, bool))
+        else value.isoformat() if isinstance(value, (date, datetime))
+        else str(value)
+        for value in column
+    ]
@@ -0,0 +1,95 @@
+"""Bounded parallel execution of API calls."""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+import aiohttp
+
+from iikoserver_client.exceptions import ApiException
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY = 4
+"""Parallelism used when neither the caller nor the configuration set one"""
+
+TRANSIENT_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+"""HTTP statuses of failures that may pass when the call is repeated"""
+
+
+def concurrency_limit(api_client, limit: Optional[int] = None) -> int:
+    """Resolve the parallelism for a batch of calls made through `api_client`.
+
+    An explicit `limit` wins, then `Configuration.max_concurrent_requests`,
+    then `DEFAULT_CONCURRENCY`.
+    """
+    if limit is None and api_client is not None:
+        limit = api_client.configuration.max_concurrent_requests
+    if limit is None:
+        limit = DEFAULT_CONCURRENCY
+    if limit < 1:
+        raise ValueError("Concurrency limit must be a positive integer")
+    return limit
+
+
+async def gather_limited(
+    factories: Iterable[Callable[[], Awaitable[T]]],
+    limit: int = DEFAULT_CONCURRENCY,
+) -> List[T]:
+    """Await the coroutines produced by `factories`, at most `limit` at a time.
+
+    Coroutines are created only when a worker is free, so long plans do not
+    allocate all of them upfront. Results are returned in the order of
+    `factories`. The first failure cancels the remaining work and is raised.
+    """
+    factories = list(factories)
+    results: List[T] = [None] * len(factories)  # type: ignore[list-item]
+    pending = iter(enumerate(factories))
+
+    async def worker() -> None:
+        for index, factory in pending:
+            results[index] = await factory()
+
+    workers = [
+        asyncio.ensure_future(worker())
+        for _ in range(min(limit, len(factories)))
+    ]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+    return results
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed call may succeed when it is repeated."""
+    if isinstance(error, ApiException):
+        return error.status in TRANSIENT_STATUSES
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+async def retry_call(
+    factory: Callable[[], Awaitable[T]],
+    attempts: int = 3,
+    delay: float = 0.5,
+    max_delay: float = 30.0,
+    retry_on: Callable[[BaseException], bool] = is_transient,
+) -> T:
+    """Await `factory()`, repeating failures accepted by `retry_on`.
+
+    The pause doubles after every attempt, starting at `delay` seconds and
+    capped at `max_delay`. The last failure is raised.
+    """
+    if attempts < 1:
+        raise ValueError("attempts must be at least 1")
+    attempt = 1
+    while True:
+        try:
+            return await factory()
+        except Exception as error:
+            if attempt >= attempts or not retry_on(error):
+                raise
+        await asyncio.sleep(min(delay * 2 ** (attempt - 1), max_delay))
+        attempt += 1
@@ -0,0 +1,59 @@
+"""Conversions of report texts to plain Python values shared by the helpers.
+
+Reports mix ISO timestamps with ``dd.mm.yyyy`` dates, so both parsers
+try ISO 8601 first and fall back to day-first parsing.
+"""
+
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Dict, Optional, Type
+
+from dateutil.parser import isoparse, parse as parse_datetime
+
+
+def to_date(value: Any) -> Optional[date]:
+    """Date of a report value; None for empty values."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, date):
+        return value if not isinstance(value, datetime) else value.date()
+    try:
+        return isoparse(value).date()
+    except ValueError:
+        return parse_datetime(value, dayfirst=True).date()
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """Timestamp of a report value; None for empty values."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    try:
+        return isoparse(value)
+    except (TypeError, ValueError):
+        return parse_datetime(value, dayfirst=True)
+
+
+class EnumConverter:
+    """Maps enum texts to interned values, checking each distinct text once.
+
+    Values unknown to the enum are passed through, so new server values do
+    not break an export.
+    """
+
+    def __init__(self, enum: Type[Enum]) -> None:
+        self.enum = enum
+        self.cache: Dict[str, str] = {}
+
+    def __call__(self, text: str) -> str:
+        value = self.cache.get(text)
+        if value is None:
+            try:
+                value = self.enum(text).value
+            except ValueError:
+                value = text
+            self.cache[text] = value
+        return value
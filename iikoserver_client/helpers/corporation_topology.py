@@ -0,0 +1,179 @@
+"""Corporation hierarchy (departments, stores, groups, terminals) as a local graph."""
+
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional, Set, Union
+
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.models.corporate_item_dto_xml import CorporateItemDtoXml
+from iikoserver_client.models.department_type_enum import DepartmentTypeEnum
+from iikoserver_client.models.group_dto_xml import GroupDtoXml
+from iikoserver_client.models.terminal_dto_xml import TerminalDtoXml
+
+Node = Union[CorporateItemDtoXml, GroupDtoXml, TerminalDtoXml]
+
+
+class CorporationTopology:
+    """Indexed graph of the corporation structure.
+
+    Corporate items (corporation, legal entities, departments, stores, ...)
+    are linked by `parentId`, sales groups by `departmentId` and terminals
+    by their group. The graph is loaded in one parallel round and reloaded
+    by `refresh()` once it is older than `ttl` seconds.
+
+    :param ttl: maximum age in seconds before `refresh()` reloads the graph,
+        None keeps it until `load()` is called again.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600) -> None:
+        self.ttl = ttl
+        self.loaded_at: Optional[float] = None
+        self.nodes: Dict[str, Node] = {}
+        self.parents: Dict[str, str] = {}
+        self.children: Dict[str, List[str]] = defaultdict(list)
+
+    @classmethod
+    async def create(cls, api, ttl: Optional[float] = 3600) -> "CorporationTopology":
+        """Load a topology through `CorporationManagementApi`."""
+        topology = cls(ttl)
+        await topology.load(api)
+        return topology
+
+    @property
+    def expired(self) -> bool:
+        if self.loaded_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self.loaded_at >= self.ttl
+
+    async def refresh(self, api) -> bool:
+        """Reload the graph if it expired.
+
+        :return: True when the graph was reloaded.
+        """
+        if not self.expired:
+            return False
+        await self.load(api)
+        return True
+
+    async def load(self, api, limit: Optional[int] = None) -> None:
+        """Unconditionally reload departments, stores, groups and terminals."""
+        departments, stores, groups, terminals = await gather_limited(
+            [
+                api.corporation_departments_get,
+                api.corporation_stores_get,
+                api.corporation_groups_get,
+                api.corporation_terminals_get,
+            ],
+            concurrency_limit(api.api_client, limit),
+        )
+        self.build(
+            (departments.corporate_item_dtoes or []) + (stores.corporate_item_dtoes or []),
+            groups.group_dtoes or [],
+            terminals.terminal_dtoes or [],
+        )
+
+    def build(
+        self,
+        items: List[CorporateItemDtoXml],
+        groups: List[GroupDtoXml],
+        terminals: List[TerminalDtoXml],
+    ) -> None:
+        """Replace the graph with the given nodes."""
+        nodes: Dict[str, Node] = {}
+        parents: Dict[str, str] = {}
+        for item in items:
+            nodes[item.id] = item
+            if item.parent_id:
+                parents[item.id] = item.parent_id
+        for group in groups:
+            nodes[group.id] = group
+            if group.department_id:
+                parents[group.id] = group.department_id
+        for terminal in terminals:
+            nodes[terminal.id] = terminal
+            if terminal.group_info is not None:
+                parents[terminal.id] = terminal.group_info.id
+
+        children: Dict[str, List[str]] = defaultdict(list)
+        for child, parent in parents.items():
+            children[parent].append(child)
+        self.nodes = nodes
+        self.parents = parents
+        self.children = children
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.nodes
+
+    def get(self, node_id: str) -> Optional[Node]:
+        return self.nodes.get(node_id)
+
+    def parent(self, node_id: str) -> Optional[Node]:
+        parent_id = self.parents.get(node_id)
+        return self.nodes.get(parent_id) if parent_id else None
+
+    def ancestors(self, node_id: str) -> Iterator[Node]:
+        """Yield parents from the closest to the root."""
+        seen: Set[str] = {node_id}
+        parent_id = self.parents.get(node_id)
+        while parent_id and parent_id not in seen:
+            seen.add(parent_id)
+            node = self.nodes.get(parent_id)
+            if node is None:
+                return
+            yield node
+            parent_id = self.parents.get(parent_id)
+
+    def descendants(self, node_id: str) -> Iterator[Node]:
+        """Yield every node below `node_id`, breadth first."""
+        seen: Set[str] = {node_id}
+        queue = deque(self.children.get(node_id, ()))
+        while queue:
+            child_id = queue.popleft()
+            if child_id in seen:
+                continue
+            seen.add(child_id)
+            node = self.nodes.get(child_id)
+            if node is not None:
+                yield node
+            queue.extend(self.children.get(child_id, ()))
+
+    def items_under(
+        self, node_id: str, *types: DepartmentTypeEnum
+    ) -> List[CorporateItemDtoXml]:
+        """Corporate items below `node_id`, optionally of the given types."""
+        return [
+            node for node in self.descendants(node_id)
+            if isinstance(node, CorporateItemDtoXml) and (not types or node.type in types)
+        ]
+
+    def stores_under(self, node_id: str) -> List[CorporateItemDtoXml]:
+        return self.items_under(node_id, DepartmentTypeEnum.STORE)
+
+    def departments_under(self, node_id: str) -> List[CorporateItemDtoXml]:
+        return self.items_under(node_id, DepartmentTypeEnum.DEPARTMENT)
+
+    def groups_under(self, node_id: str) -> List[GroupDtoXml]:
+        return [node for node in self.descendants(node_id) if isinstance(node, GroupDtoXml)]
+
+    def terminals_under(self, node_id: str) -> List[TerminalDtoXml]:
+        return [node for node in self.descendants(node_id) if isinstance(node, TerminalDtoXml)]
+
+    def department_of(self, node_id: str) -> Optional[CorporateItemDtoXml]:
+        """Closest department above a store, group or terminal."""
+        for node in self.ancestors(node_id):
+            if (
+                isinstance(node, CorporateItemDtoXml)
+                and node.type == DepartmentTypeEnum.DEPARTMENT
+            ):
+                return node
+        return None
+
+    def roots(self) -> List[Node]:
+        return [
+            node for node_id, node in self.nodes.items()
+            if self.parents.get(node_id) not in self.nodes
+        ]
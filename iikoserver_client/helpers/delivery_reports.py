@@ -0,0 +1,153 @@
+"""Delivery reports of `ReportsV1Api` as one long-format table.
+
+All six delivery reports share the layout ``<report><rows><row>...``;
+a row holds key fields (date, courier, region, ...), numeric metrics and
+optionally a nested list of sub-rows (``metrics/metric``,
+``regions/region``) with keys and metrics of their own. The extractor
+walks the rows straight from the response stream and emits one
+(keys, metric, value) record per number, without building the models.
+"""
+
+import functools
+import sys
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from lxml import etree
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.helpers.xml_stream import iter_xml_records, stream_xml_records
+
+DELIVERY_REPORTS: Dict[str, Tuple[str, ...]] = {
+    "consolidated": ("date",),
+    "couriers": ("courier", "metricType"),
+    "half_hour_detailed": ("halfHourDate", "deliveryType"),
+    "loyalty": ("date", "metricType", "region"),
+    "order_cycle": ("metricType",),
+    "regions": ("region",),
+}
+"""Report name (``reports_delivery_<name>_get``) -> key fields of its rows"""
+
+_ROW_DEPTH = 2
+
+
+def delivery_report_schema(report: str) -> Dict[str, str]:
+    """Columns of the long table: department, the report keys, metric and value."""
+    keys = _report_keys(report)
+    schema = {"department": ""}
+    schema.update((key, "") for key in keys)
+    schema.update(metric="", value="d")
+    return schema
+
+
+def _report_keys(report: str) -> Tuple[str, ...]:
+    keys = DELIVERY_REPORTS.get(report)
+    if keys is None:
+        raise ApiValueError("Unknown delivery report '{0}', expected one of: {1}".format(
+            report, ", ".join(DELIVERY_REPORTS)
+        ))
+    return keys
+
+
+def flatten_delivery_row(
+    element: etree._Element,
+    key_fields: Iterable[str],
+    keys: Optional[Dict[str, Optional[str]]] = None,
+) -> Iterator[Tuple[Dict[str, Optional[str]], str, float]]:
+    """Yield (keys, metric, value) for every number in a row element.
+
+    Children named in `key_fields` become keys of the row and of its
+    sub-rows; empty and non-numeric values are skipped.
+    """
+    key_fields = frozenset(key_fields)
+    own = dict(keys or {})
+    metrics: List[Tuple[str, str]] = []
+    nested: List[etree._Element] = []
+    for child in element:
+        if not isinstance(child.tag, str):
+            continue
+        if len(child):
+            nested.append(child)
+        elif child.tag in key_fields:
+            own[child.tag] = child.text
+        elif child.text and child.text.strip():
+            metrics.append((child.tag, child.text))
+    for name, text in metrics:
+        try:
+            value = float(text)
+        except ValueError:
+            continue
+        yield own, sys.intern(name), value
+    for container in nested:
+        for item in container:
+            if isinstance(item.tag, str):
+                yield from flatten_delivery_row(item, key_fields, own)
+
+
+class _LongTableBuilder:
+
+    def __init__(self, report: str) -> None:
+        self.keys = _report_keys(report)
+        self.table = ColumnTable.empty(delivery_report_schema(report))
+
+    def add(self, element: etree._Element, department: Optional[str]) -> None:
+        for keys, metric, value in flatten_delivery_row(element, self.keys):
+            self.table.append(
+                (department,) + tuple(keys.get(key) for key in self.keys) + (metric, value)
+            )
+
+
+def parse_delivery_report(
+    source: Union[bytes, str, Iterable[bytes]],
+    report: str,
+    department: Optional[str] = None,
+) -> ColumnTable:
+    """Flatten a delivery report XML document (or its chunks)."""
+    builder = _LongTableBuilder(report)
+    for element in iter_xml_records(source, depth=_ROW_DEPTH):
+        builder.add(element, department)
+    return builder.table
+
+
+def _format_date(value: Union[str, date]) -> str:
+    return value.isoformat() if isinstance(value, date) else value
+
+
+async def fetch_delivery_report(
+    api,
+    report: str,
+    date_from: Union[str, date],
+    date_to: Union[str, date],
+    departments: Optional[Sequence[str]] = None,
+    limit: Optional[int] = None,
+    **params: Any,
+) -> ColumnTable:
+    """Run a delivery report and stream it into a long-format table.
+
+    :param api: `ReportsV1Api` instance.
+    :param report: one of `DELIVERY_REPORTS`, e.g. ``couriers``.
+    :param departments: departments (code or id) to build the report for,
+        one request each, run concurrently; by default one request for all
+        departments with an empty ``department`` column.
+    :param params: further parameters of the report method, e.g.
+        ``metric_type`` for ``loyalty``.
+    """
+    builder = _LongTableBuilder(report)
+    operation = "reports_delivery_{0}_get".format(report)
+
+    async def run(department: Optional[str]) -> None:
+        async for element in stream_xml_records(
+            api, operation, depth=_ROW_DEPTH,
+            date_from=_format_date(date_from), date_to=_format_date(date_to),
+            department=department, **params,
+        ):
+            builder.add(element, department)
+
+    targets: List[Optional[str]] = list(departments) if departments else [None]
+    await gather_limited(
+        [functools.partial(run, department) for department in targets],
+        concurrency_limit(api.api_client, limit),
+    )
+    return builder.table
@@ -0,0 +1,153 @@
+"""Change feed of write-off and internal transfer documents.
+
+`v2_documents_writeoff_get` and `v2_documents_internal_transfer_get`
+report the maximum revision available at request time. `DocumentChangeFeed`
+polls both endpoints with `revision_from`, keeps the revision per document
+kind and turns the returned documents into typed created, updated and
+deleted events. Polling slows down exponentially while nothing changes and
+returns to the base interval on the first change.
+"""
+
+import asyncio
+import functools
+from datetime import date
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Set, Union
+
+from iikoserver_client.exceptions import ApiException, ApiValueError
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.models.document_status_enum import DocumentStatusEnum
+from iikoserver_client.models.internal_transfer_dto import InternalTransferDto
+from iikoserver_client.models.request_result_dto_enum import RequestResultDtoEnum
+from iikoserver_client.models.writeoff_document_dto import WriteoffDocumentDto
+
+WRITEOFF = "writeoff"
+INTERNAL_TRANSFER = "internal_transfer"
+
+FEED_OPERATIONS: Dict[str, str] = {
+    WRITEOFF: "v2_documents_writeoff_get",
+    INTERNAL_TRANSFER: "v2_documents_internal_transfer_get",
+}
+"""Document kind -> `DocumentsManagementApi` method"""
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+FeedDocument = Union[WriteoffDocumentDto, InternalTransferDto]
+
+
+class DocumentEvent(NamedTuple):
+    """One document change"""
+
+    kind: str
+    change: str
+    document: FeedDocument
+    revision: Optional[int]
+
+
+class DocumentChangeFeed:
+    """Polls write-off and internal transfer changes of a date window.
+
+    The first poll of a kind without a known revision returns the whole
+    window; its documents are reported as created unless `emit_initial`
+    is False, in which case they only seed the feed.
+
+    :param date_to: last day of the window; today at every poll by default.
+    :param revisions: kind -> revision to resume from, e.g. the
+        `revisions` of an earlier feed.
+    :param poll_interval: pause after a poll with changes, in seconds.
+    :param max_interval: longest pause while the feed is idle.
+    """
+
+    def __init__(
+        self,
+        api,
+        date_from: date,
+        date_to: Optional[date] = None,
+        kinds: Sequence[str] = (WRITEOFF, INTERNAL_TRANSFER),
+        revisions: Optional[Dict[str, int]] = None,
+        emit_initial: bool = True,
+        poll_interval: float = 1.0,
+        max_interval: float = 60.0,
+        backoff: float = 2.0,
+    ) -> None:
+        unknown = set(kinds) - set(FEED_OPERATIONS)
+        if unknown:
+            raise ApiValueError("Unknown document kinds: {0}".format(", ".join(sorted(unknown))))
+        self.api = api
+        self.date_from = date_from
+        self.date_to = date_to
+        self.kinds = list(kinds)
+        self.revisions: Dict[str, int] = dict(revisions or {})
+        self.emit_initial = emit_initial
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = poll_interval
+        self.known: Dict[str, Set[str]] = {kind: set() for kind in self.kinds}
+        self._closed = False
+
+    async def _poll_kind(self, kind: str) -> List[DocumentEvent]:
+        revision = self.revisions.get(kind)
+        response = await retry_call(
+            functools.partial(
+                getattr(self.api, FEED_OPERATIONS[kind]),
+                date_from=self.date_from,
+                date_to=self.date_to or date.today(),
+                revision_from=revision,
+            )
+        )
+        if response.result != RequestResultDtoEnum.SUCCESS:
+            raise ApiException(reason="; ".join(
+                "{0}: {1}".format(error.code, error.value) for error in response.errors or []
+            ) or "{0} feed request failed".format(kind))
+
+        known = self.known[kind]
+        emit = revision is not None or self.emit_initial
+        events = []
+        for document in response.response or []:
+            if document.status == DocumentStatusEnum.DELETED:
+                change = DELETED
+                known.discard(document.id)
+            else:
+                change = UPDATED if document.id in known else CREATED
+                known.add(document.id)
+            if emit:
+                events.append(DocumentEvent(kind, change, document, response.revision))
+        if response.revision is not None:
+            self.revisions[kind] = response.revision
+        return events
+
+    async def poll(self, limit: Optional[int] = None) -> List[DocumentEvent]:
+        """Request changes of every kind once.
+
+        A document whose id the feed has not seen yet is reported as
+        created. A feed resumed from `revisions` has not seen any, so ids
+        known from elsewhere should be added to `known` first.
+        """
+        results = await gather_limited(
+            [functools.partial(self._poll_kind, kind) for kind in self.kinds],
+            concurrency_limit(self.api.api_client, limit),
+        )
+        return [event for events in results for event in events]
+
+    def close(self) -> None:
+        """Stop `events()` after the current poll."""
+        self._closed = True
+
+    async def events(self) -> AsyncIterator[DocumentEvent]:
+        """Poll until `close()` and yield every change."""
+        while not self._closed:
+            events = await self.poll()
+            if events:
+                self.interval = self.poll_interval
+            for event in events:
+                yield event
+            if self._closed:
+                break
+            await asyncio.sleep(self.interval)
+            if not events:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def __aiter__(self) -> AsyncIterator[DocumentEvent]:
+        return self.events()
@@ -0,0 +1,272 @@
+"""Bulk import of invoices with local validation and a resumable journal.
+
+`DocumentImporter` checks every document locally, drops repeated ones by
+their idempotency key (document type, number and date), submits the rest
+under the client concurrency limit, repeats transient failures and
+collects the server validation results into an `ImportReport`. With a
+journal file, keys of imported documents are remembered, so a rerun of
+the same nightly batch only sends what has not been imported yet.
+"""
+
+import functools
+from datetime import date, time
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+)
+
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.helpers.conversions import to_datetime
+from iikoserver_client.models.document_validation_result_xml import DocumentValidationResultXml
+from iikoserver_client.models.incoming_invoice_xml import IncomingInvoiceXml
+from iikoserver_client.models.outgoing_invoice_xml import OutgoingInvoiceXml
+from iikoserver_client.models.returned_invoice_xml import ReturnedInvoiceXml
+
+DOCUMENT_IMPORT_OPERATIONS: Dict[type, str] = {
+    IncomingInvoiceXml: "documents_import_incoming_invoice_post",
+    OutgoingInvoiceXml: "documents_import_outgoing_invoice_post",
+    ReturnedInvoiceXml: "documents_import_returned_invoice_post",
+}
+"""Document model -> `InvoicesManagementApi` import method"""
+
+IMPORTED = "imported"
+REJECTED = "rejected"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+IMPORT_REPORT_SCHEMA = {
+    "key": "",
+    "document_number": "",
+    "status": "",
+    "warning": "",
+    "message": "",
+    "attempts": "q",
+}
+
+_PRODUCT_FIELDS = (
+    "product", "product_id", "product_article", "supplier_product", "supplier_product_article"
+)
+
+
+def document_key(document: Any) -> str:
+    """Idempotency key of a document: its type, number and date.
+
+    Dates are normalized to ISO form, with the time left out at midnight,
+    so ``"2024-01-02"`` and ``"2024-01-02T00:00:00"`` give the same key.
+    Missing fields are left empty, so even an unsupported document has a
+    key to be reported under.
+    """
+    value = getattr(document, "date_incoming", None)
+    if isinstance(value, (str, date)):
+        try:
+            moment = to_datetime(value)
+        except (TypeError, ValueError, OverflowError):
+            moment = None
+        if moment is not None:
+            if moment.time() == time.min and moment.tzinfo is None:
+                value = moment.date().isoformat()
+            else:
+                value = moment.isoformat()
+    number = getattr(document, "document_number", None)
+    return "|".join([type(document).__name__, number or "", value or ""])
+
+
+def validate_document(document: Any) -> List[str]:
+    """Local checks done before a document is sent.
+
+    :return: error messages, empty for a valid document.
+    """
+    if type(document) not in DOCUMENT_IMPORT_OPERATIONS:
+        return ["{0} cannot be imported".format(type(document).__name__)]
+    errors = []
+    if not document.document_number:
+        errors.append("documentNumber is required")
+    if not document.date_incoming:
+        errors.append("dateIncoming is required")
+    items = document.items.item if document.items is not None else None
+    if not items:
+        errors.append("document has no items")
+        return errors
+    numbers: Set[int] = set()
+    for position, item in enumerate(items, 1):
+        if not any(getattr(item, name, None) for name in _PRODUCT_FIELDS):
+            errors.append("item {0}: product is not set".format(position))
+        for name in ("amount", "sum"):
+            value = getattr(item, name, None)
+            if value is not None and value < 0:
+                errors.append("item {0}: {1} is negative".format(position, name))
+        number = getattr(item, "num", None)
+        if number is not None:
+            if number in numbers:
+                errors.append("item {0}: num {1} is used twice".format(position, number))
+            numbers.add(number)
+    return errors
+
+
+class ImportJournal:
+    """Keys of imported documents, one per line of a text file."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.keys: Set[str] = set()
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as stream:
+                self.keys.update(line.rstrip("\n") for line in stream if line.strip())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys
+
+    def add(self, key: str) -> None:
+        if key in self.keys:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as stream:
+            stream.write(key + "\n")
+        self.keys.add(key)
+
+
+class ImportResult(NamedTuple):
+    """Outcome of one document"""
+
+    key: str
+    document: Any
+    status: str
+    result: Optional[DocumentValidationResultXml] = None
+    errors: Optional[List[str]] = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+
+    @property
+    def message(self) -> Optional[str]:
+        if self.errors:
+            return "; ".join(self.errors)
+        if self.error is not None:
+            return str(self.error)
+        if self.result is not None:
+            return " ".join(
+                text for text in (self.result.error_message, self.result.additional_info) if text
+            ) or None
+        return None
+
+
+class ImportReport:
+    """Results of a bulk import in input order."""
+
+    def __init__(self, results: List[ImportResult]) -> None:
+        self.results = results
+
+    def with_status(self, status: str) -> List[ImportResult]:
+        return [result for result in self.results if result.status == status]
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for result in self.results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+    @property
+    def ok(self) -> bool:
+        """No document was rejected, invalid or failed."""
+        return all(result.status in (IMPORTED, SKIPPED) for result in self.results)
+
+    def table(self) -> ColumnTable:
+        """One row per document, e.g. for `CsvTableWriter.write_table`."""
+        table = ColumnTable.empty(IMPORT_REPORT_SCHEMA)
+        for result in self.results:
+            table.append((
+                result.key,
+                getattr(result.document, "document_number", None),
+                result.status,
+                result.result.warning if result.result is not None else None,
+                result.message,
+                result.attempts,
+            ))
+        return table
+
+
+class DocumentImporter:
+    """Submits invoices in bulk through `InvoicesManagementApi`.
+
+    The server matches imported documents by number, so a repeated import
+    updates the document instead of creating a copy; the journal and the
+    in-batch duplicate check rely on the same key and also cover the date.
+
+    :param journal_path: file remembering imported keys between runs.
+    :param attempts: tries per document for transient failures.
+    :param retry_delay: first pause between tries in seconds.
+    :param validate: local validation, `validate_document` by default.
+    """
+
+    def __init__(
+        self,
+        api,
+        journal_path: Optional[Union[str, Path]] = None,
+        attempts: int = 3,
+        retry_delay: float = 0.5,
+        validate: Callable[[Any], List[str]] = validate_document,
+    ) -> None:
+        self.api = api
+        self.journal = ImportJournal(journal_path) if journal_path is not None else None
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.validate = validate
+
+    async def submit(self, document: Any) -> ImportResult:
+        """Import one document, repeating transient failures."""
+        key = document_key(document)
+        call = getattr(self.api, DOCUMENT_IMPORT_OPERATIONS[type(document)])
+        tries = 0
+
+        async def attempt() -> DocumentValidationResultXml:
+            nonlocal tries
+            tries += 1
+            return await call(document)
+
+        try:
+            result = await retry_call(attempt, self.attempts, self.retry_delay)
+        except Exception as error:
+            return ImportResult(key, document, FAILED, error=error, attempts=tries)
+        if not result.valid:
+            return ImportResult(key, document, REJECTED, result, attempts=tries)
+        if self.journal is not None:
+            self.journal.add(key)
+        return ImportResult(key, document, IMPORTED, result, attempts=tries)
+
+    async def run(self, documents: Iterable[Any], limit: Optional[int] = None) -> ImportReport:
+        """Validate and import `documents`.
+
+        Invalid documents, repeated keys and keys found in the journal are
+        reported without a request. A key counts as repeated only after a
+        valid document with it was queued, so a corrected copy of an
+        invalid document is still imported. A failure of one document does
+        not stop the others.
+
+        :param limit: parallel requests, the client policy by default.
+        """
+        results: List[Optional[ImportResult]] = []
+        queued: List[Tuple[int, Any]] = []
+        seen: Set[str] = set()
+        for document in documents:
+            errors = self.validate(document)
+            key = document_key(document)
+            if errors:
+                results.append(ImportResult(key, document, INVALID, errors=errors))
+            elif key in seen:
+                results.append(ImportResult(key, document, DUPLICATE))
+            elif self.journal is not None and key in self.journal:
+                results.append(ImportResult(key, document, SKIPPED))
+            else:
+                queued.append((len(results), document))
+                results.append(None)
+                seen.add(key)
+
+        submitted = await gather_limited(
+            [functools.partial(self.submit, document) for _, document in queued],
+            concurrency_limit(self.api.api_client, limit),
+        )
+        for (index, _), result in zip(queued, submitted):
+            results[index] = result
+        return ImportReport([result for result in results if result is not None])
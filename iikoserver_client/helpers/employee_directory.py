@@ -0,0 +1,338 @@
+"""Cached employees, attendances and schedules with indexed joins."""
+
+import functools
+import io
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import (
+    Any, Callable, Dict, Generic, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, TypeVar
+)
+
+from dateutil.parser import isoparse
+from lxml import etree
+
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.models.attendance_type_xml import AttendanceTypeXml
+from iikoserver_client.models.attendance_xml import AttendanceXml
+from iikoserver_client.models.employee_role_xml import EmployeeRoleXml
+from iikoserver_client.models.employee_xml import EmployeeXml
+from iikoserver_client.models.schedule_type_xml import ScheduleTypeXml
+from iikoserver_client.models.schedule_xml import ScheduleXml
+
+R = TypeVar("R", AttendanceXml, ScheduleXml)
+
+
+def response_revision(raw_data: Optional[bytes]) -> Optional[int]:
+    """Read the `revision` attribute of an XML response root, if present.
+
+    Only the start of the document is parsed.
+    """
+    if not raw_data:
+        return None
+    try:
+        for _, element in etree.iterparse(
+            io.BytesIO(raw_data), events=("start",), recover=True
+        ):
+            value = element.get("revision")
+            return int(value) if value is not None else None
+    except (etree.XMLSyntaxError, ValueError):
+        return None
+    return None
+
+
+def _record_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return isoparse(value)
+    except ValueError:
+        return None
+
+
+def _record_days(record: Any) -> List[date]:
+    """Days from the start to the end of a record, both included.
+
+    A record ending exactly at midnight does not cover the day it ends
+    on; one without a readable end covers its start day only.
+    """
+    start = _record_time(record.date_from)
+    if start is None:
+        return []
+    first = last = start.date()
+    end = _record_time(record.date_to)
+    if end is not None:
+        last = end.date()
+        if end.time() == time.min:
+            last -= timedelta(days=1)
+        last = max(last, first)
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+class RecordIndex(Generic[R]):
+    """Attendances or schedules by id with employee, department and day indexes.
+
+    A record is indexed under every day it covers, so a night shift is
+    found on both days.
+    """
+
+    def __init__(self) -> None:
+        self.records: Dict[Any, R] = {}
+        self.by_employee: Dict[str, Set[Any]] = defaultdict(set)
+        self.by_department: Dict[str, Set[Any]] = defaultdict(set)
+        self.by_date: Dict[date, Set[Any]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _key(record: R) -> Any:
+        return record.id or (record.employee_id, record.department_id, record.date_from)
+
+    def upsert(self, record: R) -> None:
+        key = self._key(record)
+        self.discard(key)
+        self.records[key] = record
+        self.by_employee[record.employee_id].add(key)
+        self.by_department[record.department_id].add(key)
+        for day in _record_days(record):
+            self.by_date[day].add(key)
+
+    def discard(self, key: Any) -> None:
+        record = self.records.pop(key, None)
+        if record is None:
+            return
+        self.by_employee[record.employee_id].discard(key)
+        self.by_department[record.department_id].discard(key)
+        for day in _record_days(record):
+            self.by_date[day].discard(key)
+
+    def clear(self) -> None:
+        self.records.clear()
+        self.by_employee.clear()
+        self.by_department.clear()
+        self.by_date.clear()
+
+    def select(
+        self,
+        employee_id: Optional[str] = None,
+        department_id: Optional[str] = None,
+        day: Optional[date] = None,
+    ) -> List[R]:
+        """Return records matching every given filter, ordered by start time."""
+        candidates: Optional[Set[Any]] = None
+        filters: Sequence[Tuple[Mapping[Any, Set[Any]], Any]] = (
+            (self.by_employee, employee_id),
+            (self.by_department, department_id),
+            (self.by_date, day),
+        )
+        for index, value in filters:
+            if value is None:
+                continue
+            keys = index.get(value, set())
+            candidates = set(keys) if candidates is None else candidates & keys
+        if candidates is None:
+            records: Iterable[R] = self.records.values()
+        else:
+            records = (self.records[key] for key in candidates)
+        return sorted(records, key=lambda record: record.date_from or "")
+
+
+class EmployeeDirectory:
+    """Employees, roles, attendance and schedule types loaded once, plus
+    attendances and schedules of a date window kept up to date.
+
+    `refresh()` requests attendances and schedules with `revision_from`
+    when the server reports a revision on the response root. Otherwise it
+    reloads the window and replaces the cached records. An incremental
+    refresh only adds and updates records: one deleted on the server stays
+    cached until the next full reload.
+
+    :param full_refresh_every: reload the whole window after this many
+        incremental refreshes, so deleted records are dropped.
+    """
+
+    def __init__(
+        self,
+        date_from: date,
+        date_to: date,
+        with_payment_details: bool = False,
+        full_refresh_every: Optional[int] = None,
+    ) -> None:
+        self.date_from = date_from
+        self.date_to = date_to
+        self.with_payment_details = with_payment_details
+        self.employees: Dict[str, EmployeeXml] = {}
+        self.roles: Dict[str, EmployeeRoleXml] = {}
+        self.attendance_types: Dict[str, AttendanceTypeXml] = {}
+        self.schedule_types: Dict[str, ScheduleTypeXml] = {}
+        self.attendances: RecordIndex[AttendanceXml] = RecordIndex()
+        self.schedules: RecordIndex[ScheduleXml] = RecordIndex()
+        self.attendance_revision: Optional[int] = None
+        self.schedule_revision: Optional[int] = None
+        self.full_refresh_every = full_refresh_every
+        self.incremental_refreshes = 0
+
+    @classmethod
+    async def load(
+        cls,
+        api,
+        date_from: date,
+        date_to: date,
+        with_payment_details: bool = False,
+        include_deleted: bool = False,
+        limit: Optional[int] = None,
+        full_refresh_every: Optional[int] = None,
+    ) -> "EmployeeDirectory":
+        """Bulk-load a directory through `EmployeesManagementApi`."""
+        directory = cls(date_from, date_to, with_payment_details, full_refresh_every)
+        await directory.load_reference(api, include_deleted, limit)
+        await directory.refresh(api, limit)
+        return directory
+
+    async def load_reference(
+        self, api, include_deleted: bool = False, limit: Optional[int] = None
+    ) -> None:
+        """(Re)load employees, roles, attendance types and schedule types."""
+        employees, roles, attendance_types, schedule_types = await gather_limited(
+            [
+                functools.partial(api.employees_get, include_deleted=include_deleted),
+                api.employees_roles_get,
+                functools.partial(
+                    api.employees_attendance_types_get, include_deleted=include_deleted
+                ),
+                api.employees_schedule_types_get,
+            ],
+            concurrency_limit(api.api_client, limit),
+        )
+        self.employees = {
+            employee.id: employee for employee in employees.employees or [] if employee.id
+        }
+        self.roles = {role.id: role for role in roles.role or []}
+        self.attendance_types = {
+            item.id: item for item in attendance_types.attendance_type or []
+        }
+        self.schedule_types = {
+            item.id: item for item in schedule_types.employee_schedule_types or []
+        }
+
+    async def refresh(self, api, limit: Optional[int] = None, full: bool = False) -> int:
+        """Pull attendance and schedule changes.
+
+        :param full: reload the whole window and drop records the server
+            no longer returns.
+        :return: number of received records.
+        """
+        if full or (
+            self.full_refresh_every is not None
+            and self.incremental_refreshes >= self.full_refresh_every
+        ):
+            self.attendance_revision = None
+            self.schedule_revision = None
+        if self.attendance_revision is None and self.schedule_revision is None:
+            self.incremental_refreshes = 0
+        else:
+            self.incremental_refreshes += 1
+        attendances, schedules = await gather_limited(
+            [
+                functools.partial(
+                    api.employees_attendance_get_with_http_info,
+                    var_from=self.date_from,
+                    to=self.date_to,
+                    with_payment_details=self.with_payment_details,
+                    revision_from=self.attendance_revision,
+                ),
+                functools.partial(
+                    api.employees_schedule_get_with_http_info,
+                    var_from=self.date_from,
+                    to=self.date_to,
+                    with_payment_details=self.with_payment_details,
+                    revision_from=self.schedule_revision,
+                ),
+            ],
+            concurrency_limit(api.api_client, limit),
+        )
+        self.attendance_revision = self._apply(
+            self.attendances,
+            attendances.data.attendances if attendances.data else None,
+            self.attendance_revision,
+            response_revision(attendances.raw_data),
+        )
+        self.schedule_revision = self._apply(
+            self.schedules,
+            schedules.data.schedule if schedules.data else None,
+            self.schedule_revision,
+            response_revision(schedules.raw_data),
+        )
+        received = 0
+        if attendances.data:
+            received += len(attendances.data.attendances or [])
+        if schedules.data:
+            received += len(schedules.data.schedule or [])
+        return received
+
+    @staticmethod
+    def _apply(
+        index: RecordIndex[R],
+        records: Optional[List[R]],
+        revision: Optional[int],
+        new_revision: Optional[int],
+    ) -> Optional[int]:
+        if revision is None:
+            index.clear()
+        for record in records or []:
+            index.upsert(record)
+        return new_revision
+
+    def employee(self, employee_id: str) -> Optional[EmployeeXml]:
+        return self.employees.get(employee_id)
+
+    def employees_in_department(self, department_code: str) -> List[EmployeeXml]:
+        """Employees assigned to a department; no assignment means all departments."""
+        return [
+            employee for employee in self.employees.values()
+            if employee.department_codes is None
+            or department_code in employee.department_codes
+        ]
+
+    def attendances_for(
+        self,
+        employee_id: Optional[str] = None,
+        department_id: Optional[str] = None,
+        day: Optional[date] = None,
+    ) -> List[AttendanceXml]:
+        return self.attendances.select(employee_id, department_id, day)
+
+    def schedules_for(
+        self,
+        employee_id: Optional[str] = None,
+        department_id: Optional[str] = None,
+        day: Optional[date] = None,
+    ) -> List[ScheduleXml]:
+        return self.schedules.select(employee_id, department_id, day)
+
+    def role_of(self, record: Any) -> Optional[EmployeeRoleXml]:
+        """Role of an attendance or schedule, falling back to the employee main role."""
+        role_id = getattr(record, "role_id", None)
+        if role_id is None:
+            employee = self.employees.get(record.employee_id)
+            role_id = employee.main_role_id if employee else None
+        return self.roles.get(role_id) if role_id else None
+
+    def join(
+        self,
+        department_id: Optional[str] = None,
+        day: Optional[date] = None,
+        key: Callable[[Any], Any] = lambda record: record.employee_id,
+    ) -> Dict[Any, Dict[str, List[Any]]]:
+        """Group attendances and schedules of a department/day by employee.
+
+        :return: ``{employee_id: {"attendances": [...], "schedules": [...]}}``
+        """
+        joined: Dict[Any, Dict[str, List[Any]]] = defaultdict(
+            lambda: {"attendances": [], "schedules": []}
+        )
+        for attendance in self.attendances_for(department_id=department_id, day=day):
+            joined[key(attendance)]["attendances"].append(attendance)
+        for schedule in self.schedules_for(department_id=department_id, day=day):
+            joined[key(schedule)]["schedules"].append(schedule)
+        return dict(joined)
@@ -0,0 +1,205 @@
+"""Batched table writers for CSV and Parquet files.
+
+Rows are collected into a bounded column buffer and flushed to the file
+whenever it fills up, so exporting a report of any size keeps a constant
+memory footprint. Parquet output requires pyarrow, imported on first use.
+
+Files are written under a temporary name and moved into place on
+`close`; a writer left through an exception is aborted instead, so a
+failed export never leaves a truncated file behind.
+"""
+
+import abc
+import csv
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, TextIO, Union
+
+from iikoserver_client.helpers.columnar import ColumnTable
+
+COLUMN_KINDS = ("string", "float", "int", "bool", "date", "datetime")
+"""Column kinds a writer schema may use"""
+
+DEFAULT_BUFFER_ROWS = 10000
+
+
+def _temporary_path(path: Union[str, Path]) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".tmp")
+
+
+class TableWriter(abc.ABC):
+    """Base of the batched writers.
+
+    :param schema: column name -> kind from `COLUMN_KINDS`, in output order.
+    :param buffer_rows: number of rows kept in memory before a flush.
+    """
+
+    def __init__(self, schema: Mapping[str, str], buffer_rows: int = DEFAULT_BUFFER_ROWS) -> None:
+        unknown = set(schema.values()) - set(COLUMN_KINDS)
+        if unknown:
+            raise ValueError("Unknown column kinds: {0}".format(", ".join(sorted(unknown))))
+        if buffer_rows < 1:
+            raise ValueError("buffer_rows must be at least 1")
+        self.schema = dict(schema)
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self._buffer: List[Sequence[Any]] = []
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """Add one row given in schema order."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    def write_table(self, table: ColumnTable) -> None:
+        for row in table.select(list(self.schema)).rows():
+            self.write_row(row)
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+    @abc.abstractmethod
+    def _write_batch(self, rows: List[Sequence[Any]]) -> None:
+        """Write one flushed batch of rows to the target."""
+
+    def close(self) -> None:
+        self.flush()
+
+    def abort(self) -> None:
+        """Drop buffered rows and discard the output written so far."""
+        self._buffer = []
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CsvTableWriter(TableWriter):
+    """Writes rows to a CSV file with a header line.
+
+    :param target: file path or an open text stream, which is not closed;
+        rows already written to a stream stay there on `abort`.
+    """
+
+    def __init__(
+        self,
+        target: Union[str, Path, TextIO],
+        schema: Mapping[str, str],
+        buffer_rows: int = DEFAULT_BUFFER_ROWS,
+        **fmtparams: Any,
+    ) -> None:
+        super().__init__(schema, buffer_rows)
+        self._path: Optional[Path] = None
+        if isinstance(target, (str, Path)):
+            self._path = Path(target)
+            self._stream: TextIO = open(
+                _temporary_path(target), "w", encoding="utf-8", newline=""
+            )
+        else:
+            self._stream = target
+        self._writer = csv.writer(self._stream, **fmtparams)
+        self._writer.writerow(list(self.schema))
+
+    def _write_batch(self, rows: List[Sequence[Any]]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        super().close()
+        if self._path is None:
+            self._stream.flush()
+            return
+        self._stream.close()
+        os.replace(_temporary_path(self._path), self._path)
+
+    def abort(self) -> None:
+        super().abort()
+        if self._path is not None:
+            self._stream.close()
+            _temporary_path(self._path).unlink()
+
+
+def _arrow_type(pyarrow, kind: str):
+    return {
+        "string": pyarrow.string(),
+        "float": pyarrow.float64(),
+        "int": pyarrow.int64(),
+        "bool": pyarrow.bool_(),
+        "date": pyarrow.date32(),
+        "datetime": pyarrow.timestamp("us"),
+    }[kind]
+
+
+class ParquetTableWriter(TableWriter):
+    """Writes every flushed batch as a Parquet row group (requires pyarrow).
+
+    :param compression: Parquet compression codec.
+    """
+
+    def __init__(
+        self,
+        target: Union[str, Path],
+        schema: Mapping[str, str],
+        buffer_rows: int = DEFAULT_BUFFER_ROWS,
+        compression: str = "zstd",
+    ) -> None:
+        super().__init__(schema, buffer_rows)
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pyarrow = pyarrow
+        self._path = Path(target)
+        self._arrow_schema = pyarrow.schema(
+            [(name, _arrow_type(pyarrow, kind)) for name, kind in self.schema.items()]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(
+            str(_temporary_path(target)), self._arrow_schema, compression=compression
+        )
+
+    def _write_batch(self, rows: List[Sequence[Any]]) -> None:
+        columns = list(zip(*rows))
+        batch = self._pyarrow.RecordBatch.from_arrays(
+            [
+                self._pyarrow.array(column, type=field.type)
+                for column, field in zip(columns, self._arrow_schema)
+            ],
+            schema=self._arrow_schema,
+        )
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        super().close()
+        self._writer.close()
+        os.replace(_temporary_path(self._path), self._path)
+
+    def abort(self) -> None:
+        super().abort()
+        self._writer.close()
+        _temporary_path(self._path).unlink()
+
+
+def open_table_writer(
+    path: Union[str, Path],
+    schema: Mapping[str, str],
+    format: Optional[str] = None,
+    buffer_rows: int = DEFAULT_BUFFER_ROWS,
+) -> TableWriter:
+    """Open a CSV or Parquet writer.
+
+    :param format: ``csv`` or ``parquet``; by default taken from the file
+        suffix.
+    """
+    format = (format or Path(path).suffix.lstrip(".")).lower()
+    writers: Dict[str, type] = {"csv": CsvTableWriter, "parquet": ParquetTableWriter}
+    writer = writers.get(format)
+    if writer is None:
+        raise ValueError("Unsupported export format '{0}'".format(format))
+    return writer(path, schema, buffer_rows)
@@ -0,0 +1,234 @@
+"""Resumable batch runs of the ingredient entry and product expense reports.
+
+Food cost analysis needs `reports_ingredient_entry_get` per department,
+dish and date and `reports_product_expense_get` per department and
+period. `FoodCostBatch` turns a departments x products x periods plan into
+the smallest set of requests, runs them under the client concurrency
+limit and checkpoints every finished request to disk, so a failed run
+resumes with the requests that are still missing.
+"""
+
+import functools
+import hashlib
+import math
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import (
+    Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple,
+    Union,
+)
+
+from lxml import etree
+
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.helpers.sales_report import SALES_SCHEMA, SalesAggregator
+from iikoserver_client.helpers.xml_stream import element_values, stream_xml_records
+
+INGREDIENT_ENTRY = "ingredient_entry"
+PRODUCT_EXPENSE = "product_expense"
+
+_INGREDIENT_FLOAT_FIELDS = (
+    "amountInMainUnit", "amountInMeasureUnit", "amountMiddleMainUnit",
+    "amountMiddleMeasureUnit", "amountOutMainUnit", "amountOutMeasureUnit",
+    "coldLoss", "hotLoss", "costNorm", "dishCostNorm", "dishSalePrice",
+    "productInDishCost", "sourceProductCostNorm",
+)
+_INGREDIENT_STRING_FIELDS = ("itemId", "itemParentId", "product", "num", "name", "unit")
+
+INGREDIENT_ENTRY_SCHEMA: Dict[str, str] = dict(
+    [("department", ""), ("date", ""), ("dish", ""), ("treeLevel", "q")]
+    + [(name, "") for name in _INGREDIENT_STRING_FIELDS]
+    + [(name, "d") for name in _INGREDIENT_FLOAT_FIELDS]
+)
+
+Period = Tuple[date, date]
+
+
+class FoodCostPiece(NamedTuple):
+    """One report request of a batch"""
+
+    report: str
+    department: str
+    date_from: date
+    date_to: date
+    product: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Stable file name of the piece checkpoint."""
+        text = "|".join(
+            [self.report, self.department, self.date_from.isoformat(),
+             self.date_to.isoformat(), self.product or ""]
+        )
+        return "{0}-{1}".format(self.report, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+class FoodCostDataset(NamedTuple):
+    """Result of a batch run"""
+
+    ingredient_entries: ColumnTable
+    product_expenses: ColumnTable
+    failed: Dict[FoodCostPiece, BaseException]
+
+
+def _windows(days: Iterable[date], max_days: int) -> List[Period]:
+    """Group days into runs of consecutive days of at most `max_days`."""
+    windows: List[Period] = []
+    for day in sorted(set(days)):
+        if windows:
+            start, end = windows[-1]
+            if day == end + timedelta(days=1) and (day - start).days < max_days:
+                windows[-1] = (start, day)
+                continue
+        windows.append((day, day))
+    return windows
+
+
+def plan_food_cost(
+    departments: Sequence[str],
+    products: Sequence[str],
+    periods: Sequence[Period],
+    max_days: int = 31,
+) -> List[FoodCostPiece]:
+    """Requests needed for a departments x products x periods plan.
+
+    Ingredient entries are requested per department and dish on the first
+    day of every period. The product expense report does not depend on the
+    product, so it is requested per department only, with overlapping and
+    adjacent periods merged into windows of at most `max_days` days.
+
+    :param periods: inclusive (date_from, date_to) pairs.
+    """
+    pieces: Dict[FoodCostPiece, None] = {}
+    starts = sorted({start for start, _ in periods})
+    days = [
+        start + timedelta(days=offset)
+        for start, end in periods
+        for offset in range((end - start).days + 1)
+    ]
+    for department in departments:
+        for product in products:
+            for start in starts:
+                pieces[FoodCostPiece(INGREDIENT_ENTRY, department, start, start, product)] = None
+        for start, end in _windows(days, max_days):
+            pieces[FoodCostPiece(PRODUCT_EXPENSE, department, start, end)] = None
+    return list(pieces)
+
+
+def _float(text: Optional[str]) -> float:
+    return float(text) if text else math.nan
+
+
+def _ingredient_row(piece: FoodCostPiece, element: etree._Element) -> Tuple[Any, ...]:
+    record = element_values(element)
+    tree_level = record.get("treeLevel")
+    row: List[Any] = [
+        piece.department, piece.date_from, piece.product, int(tree_level) if tree_level else 0
+    ]
+    row.extend(record.get(name) for name in _INGREDIENT_STRING_FIELDS)
+    row.extend(_float(record.get(name)) for name in _INGREDIENT_FLOAT_FIELDS)
+    return tuple(row)
+
+
+class FoodCostBatch:
+    """Checkpointed runner of a food cost plan.
+
+    :param checkpoint_path: directory for the finished pieces, one
+        ``<piece key>.cols.gz`` file each.
+    :param include_subtree: `include_subtree` of the ingredient entry report.
+    """
+
+    def __init__(
+        self, checkpoint_path: Union[str, Path], include_subtree: Optional[bool] = None
+    ) -> None:
+        self.checkpoint_path = Path(checkpoint_path)
+        self.include_subtree = include_subtree
+
+    def checkpoint(self, piece: FoodCostPiece) -> Path:
+        return self.checkpoint_path / (piece.key + ".cols.gz")
+
+    def done(self, piece: FoodCostPiece) -> bool:
+        return self.checkpoint(piece).exists()
+
+    def _save(self, piece: FoodCostPiece, table: ColumnTable) -> None:
+        self.checkpoint_path.mkdir(parents=True, exist_ok=True)
+        path = self.checkpoint(piece)
+        temporary = path.with_name(path.name + ".tmp")
+        table.write(temporary)
+        os.replace(temporary, path)
+
+    async def fetch(self, api, piece: FoodCostPiece) -> ColumnTable:
+        """Run one piece without checkpointing it."""
+        if piece.report == INGREDIENT_ENTRY:
+            table = ColumnTable.empty(INGREDIENT_ENTRY_SCHEMA)
+            async for element in stream_xml_records(
+                api, "reports_ingredient_entry_get",
+                department=piece.department,
+                var_date=piece.date_from.strftime("%d.%m.%Y"),
+                product=piece.product,
+                include_subtree=self.include_subtree,
+            ):
+                table.append(_ingredient_row(piece, element))
+            return table
+
+        aggregator = SalesAggregator()
+        async for element in stream_xml_records(
+            api, "reports_product_expense_get",
+            department=piece.department,
+            date_from=piece.date_from.strftime("%d.%m.%Y"),
+            date_to=piece.date_to.strftime("%d.%m.%Y"),
+        ):
+            aggregator.add(piece.department, element)
+        return aggregator.table()
+
+    async def run(
+        self, api, pieces: Sequence[FoodCostPiece], limit: Optional[int] = None
+    ) -> FoodCostDataset:
+        """Run the pieces that have no checkpoint yet and collect the dataset.
+
+        Every finished piece is checkpointed as soon as it arrives. A
+        failing piece does not stop the others; it is reported in
+        `FoodCostDataset.failed` and retried by the next run.
+
+        :param api: `ReportsV1Api` instance.
+        """
+        failed: Dict[FoodCostPiece, BaseException] = {}
+
+        async def run_piece(piece: FoodCostPiece) -> None:
+            try:
+                table = await self.fetch(api, piece)
+            except Exception as error:
+                failed[piece] = error
+                return
+            self._save(piece, table)
+
+        factories: List[Callable[[], Awaitable[None]]] = [
+            functools.partial(run_piece, piece) for piece in pieces if not self.done(piece)
+        ]
+        await gather_limited(
+            factories,
+            concurrency_limit(api.api_client, limit),
+        )
+        return self.dataset(pieces, failed)
+
+    def dataset(
+        self,
+        pieces: Sequence[FoodCostPiece],
+        failed: Optional[Dict[FoodCostPiece, BaseException]] = None,
+    ) -> FoodCostDataset:
+        """Concatenate the checkpoints of the finished pieces."""
+        tables: Dict[str, List[ColumnTable]] = {INGREDIENT_ENTRY: [], PRODUCT_EXPENSE: []}
+        for piece in pieces:
+            if self.done(piece):
+                tables[piece.report].append(ColumnTable.read(self.checkpoint(piece)))
+        return FoodCostDataset(
+            ingredient_entries=ColumnTable.concat(
+                [ColumnTable.empty(INGREDIENT_ENTRY_SCHEMA)] + tables[INGREDIENT_ENTRY]
+            ),
+            product_expenses=ColumnTable.concat(
+                [ColumnTable.empty(SALES_SCHEMA)] + tables[PRODUCT_EXPENSE]
+            ),
+            failed=failed or {},
+        )
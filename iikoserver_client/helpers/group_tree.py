@@ -0,0 +1,403 @@
+"""Synchronization of the product group tree and the user categories.
+
+Groups and categories have separate save, update, delete and restore
+endpoints, so reorganizing a menu takes many calls in the right order.
+`plan_group_sync` compares a desired hierarchy with the live groups and
+keeps only the creates, restores and updates (moves, renames) that are
+needed, grouped by depth. `GroupTreeSync` runs every depth level in
+parallel, parents before children, and deletes the left-over groups in
+one call at the end, after their children have been moved out.
+`sync_categories` does the same for the flat list of categories.
+"""
+
+import functools
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.models.base_entity_dto import BaseEntityDto
+from iikoserver_client.models.entity_dto import EntityDto
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.id_codet_dto import IdCodetDto
+from iikoserver_client.models.id_list_dto import IdListDto
+from iikoserver_client.models.product_group_delete_restore_request_scheme import (
+    ProductGroupDeleteRestoreRequestScheme
+)
+from iikoserver_client.models.product_group_dto import ProductGroupDto
+from iikoserver_client.models.product_group_save_dto import ProductGroupSaveDto
+from iikoserver_client.models.product_group_update_dto import ProductGroupUpdateDto
+from iikoserver_client.models.request_result_dto_enum import RequestResultDtoEnum
+
+
+class DesiredGroup(NamedTuple):
+    """A group of the desired tree.
+
+    :param key: id of an existing group, or any key unique in the tree
+        for a group that may have to be created.
+    :param parent: key of the parent group, None for a root group.
+    :param num: article; when set, it is also used to find the group and
+        compared with the live one. The same applies to `position`.
+    """
+
+    key: str
+    name: str
+    parent: Optional[str] = None
+    num: Optional[str] = None
+    position: Optional[int] = None
+
+
+class GroupOperation(NamedTuple):
+    """Calls needed for one group.
+
+    `group_id` is None for a group to create. `changes` maps fields to
+    their new values; a ``parent`` value is the key of the parent group.
+    """
+
+    key: str
+    group_id: Optional[str]
+    restore: bool
+    changes: Dict[str, Any]
+
+
+class GroupSyncPlan(NamedTuple):
+    """Operations by depth of the desired tree, and the ids to delete"""
+
+    levels: List[List[GroupOperation]]
+    deletes: List[str]
+    ids: Dict[str, str]
+    unchanged: int
+
+
+class TreeSyncReport(NamedTuple):
+    """Outcome of a tree or category sync, keyed by group key or name"""
+
+    created: Dict[str, str]
+    updated: List[str]
+    restored: List[str]
+    deleted: List[str]
+    skipped: List[str]
+    errors: Dict[str, List[ErrorDto]]
+    failures: Dict[str, BaseException]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.failures and not self.skipped
+
+
+def _new_report() -> TreeSyncReport:
+    return TreeSyncReport({}, [], [], [], [], {}, {})
+
+
+def _tree_levels(desired: Iterable[DesiredGroup]) -> List[List[DesiredGroup]]:
+    groups: Dict[str, DesiredGroup] = {}
+    for group in desired:
+        if group.key in groups:
+            raise ApiValueError("Group key '{0}' is used twice".format(group.key))
+        groups[group.key] = group
+    depths: Dict[str, int] = {}
+    for key in groups:
+        chain: List[str] = []
+        current: Optional[str] = key
+        while current is not None and current not in depths:
+            if current in chain:
+                raise ApiValueError("Group '{0}' is its own ancestor".format(current))
+            if current not in groups:
+                raise ApiValueError("Parent group '{0}' is not in the tree".format(current))
+            chain.append(current)
+            current = groups[current].parent
+        depth = depths[current] if current is not None else -1
+        for item in reversed(chain):
+            depth += 1
+            depths[item] = depth
+    levels: List[List[DesiredGroup]] = [[] for _ in range(max(depths.values(), default=-1) + 1)]
+    for key, group in groups.items():
+        levels[depths[key]].append(group)
+    return levels
+
+
+def plan_group_sync(
+    current: Iterable[ProductGroupDto],
+    desired: Iterable[DesiredGroup],
+    delete_missing: bool = False,
+) -> GroupSyncPlan:
+    """Compare the live groups (including deleted ones) with a desired tree.
+
+    A desired group is matched with the live group whose id equals its
+    key, then by article, then by name under the same parent and last by
+    a name no other live group has, which finds groups moved elsewhere.
+    Live groups left unmatched are deleted when `delete_missing` is set.
+
+    :raises ApiValueError: for repeated keys, cycles or unknown parents.
+    """
+    current = list(current)
+    by_id = {group.id: group for group in current}
+    by_num: Dict[str, ProductGroupDto] = {}
+    by_name: Dict[Any, ProductGroupDto] = {}
+    named: Dict[str, List[ProductGroupDto]] = {}
+    for group in sorted(current, key=lambda item: item.deleted, reverse=True):
+        if group.num:
+            by_num[group.num] = group
+        by_name[(group.parent, group.name)] = group
+        named.setdefault(group.name, []).append(group)
+
+    ids: Dict[str, str] = {}
+    used: Set[str] = set()
+    plan = GroupSyncPlan([], [], ids, 0)
+    unchanged = 0
+    for level in _tree_levels(desired):
+        operations = []
+        for wanted in level:
+            parent_id = ids.get(wanted.parent) if wanted.parent is not None else None
+            match = by_id.get(wanted.key)
+            if match is None and wanted.num:
+                match = by_num.get(wanted.num)
+            if match is None and (wanted.parent is None or parent_id is not None):
+                match = by_name.get((parent_id, wanted.name))
+            if match is None and len(named.get(wanted.name, ())) == 1:
+                match = named[wanted.name][0]
+            if match is not None and match.id in used:
+                match = None
+
+            changes: Dict[str, Any] = {}
+            if match is None:
+                operations.append(GroupOperation(wanted.key, None, False, {
+                    "name": wanted.name, "parent": wanted.parent, "num": wanted.num,
+                    "position": wanted.position,
+                }))
+                continue
+            used.add(match.id)
+            ids[wanted.key] = match.id
+            if match.name != wanted.name:
+                changes["name"] = wanted.name
+            if match.parent != parent_id:
+                changes["parent"] = wanted.parent
+            for name in ("num", "position"):
+                value = getattr(wanted, name)
+                if value is not None and value != getattr(match, name):
+                    changes[name] = value
+            if changes or match.deleted:
+                operations.append(GroupOperation(wanted.key, match.id, match.deleted, changes))
+            else:
+                unchanged += 1
+        plan.levels.append(operations)
+
+    if delete_missing:
+        plan.deletes.extend(
+            group.id for group in current if not group.deleted and group.id not in used
+        )
+    return plan._replace(unchanged=unchanged)
+
+
+def _group_ids(ids: List[str]) -> ProductGroupDeleteRestoreRequestScheme:
+    return ProductGroupDeleteRestoreRequestScheme(
+        products=IdListDto(items=[]),
+        productGroups=IdListDto(items=[IdCodetDto(id=group_id) for group_id in ids]),
+    )
+
+
+def _failed(response) -> bool:
+    return response.result != RequestResultDtoEnum.SUCCESS
+
+
+class GroupTreeSync:
+    """Brings the product group tree to a desired shape through
+    `NomenclatureManagementApi`.
+
+    A level runs only after the previous one, so a parent exists and is
+    in place before its children are created or moved under it; groups
+    of one level are independent and run in parallel. Children of a
+    group that could not be created or restored are skipped, and so are
+    the deletes when anything failed. Updates are repeated on transient
+    failures, creates are not.
+    """
+
+    def __init__(self, api, attempts: int = 3, retry_delay: float = 0.5) -> None:
+        self.api = api
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.groups: Dict[str, ProductGroupDto] = {}
+
+    async def load(self) -> List[ProductGroupDto]:
+        """Fetch the live groups, including deleted ones."""
+        groups = await self.api.v2_entities_products_group_list_get(include_deleted=True) or []
+        self.groups = {group.id: group for group in groups}
+        return groups
+
+    async def _restore(self, operations: List[GroupOperation], report: TreeSyncReport) -> None:
+        keys = [operation.key for operation in operations]
+        try:
+            response = await retry_call(
+                functools.partial(
+                    self.api.v2_entities_products_group_restore_post,
+                    product_group_delete_restore_request_scheme=_group_ids(
+                        [operation.group_id for operation in operations if operation.group_id]
+                    ),
+                ),
+                self.attempts,
+                self.retry_delay,
+            )
+        except Exception as error:
+            for key in keys:
+                report.failures[key] = error
+            return
+        if _failed(response):
+            for key in keys:
+                report.errors[key] = response.errors or []
+            return
+        report.restored.extend(keys)
+
+    async def _apply(
+        self, operation: GroupOperation, plan: GroupSyncPlan, report: TreeSyncReport
+    ) -> None:
+        changes = dict(operation.changes)
+        if "parent" in changes:
+            changes["parent"] = plan.ids[changes["parent"]] if changes["parent"] else None
+        try:
+            if operation.group_id is None:
+                response = await self.api.v2_entities_products_group_save_post(
+                    product_group_save_dto=ProductGroupSaveDto(**changes)
+                )
+            else:
+                live = ProductGroupUpdateDto.from_dict(self.groups[operation.group_id].to_dict())
+                if live is None:
+                    raise ApiValueError("Group '{0}' is not loaded".format(operation.group_id))
+                update = live.model_copy(update=changes)
+                response = await retry_call(
+                    functools.partial(
+                        self.api.v2_entities_products_group_update_post,
+                        product_group_update_dto=update,
+                    ),
+                    self.attempts,
+                    self.retry_delay,
+                )
+        except Exception as error:
+            report.failures[operation.key] = error
+            return
+        if _failed(response) or response.response is None:
+            report.errors[operation.key] = response.errors or []
+            return
+        self.groups[response.response.id] = response.response
+        plan.ids[operation.key] = response.response.id
+        if operation.group_id is None:
+            report.created[operation.key] = response.response.id
+        else:
+            report.updated.append(operation.key)
+
+    async def apply(self, plan: GroupSyncPlan, limit: Optional[int] = None) -> TreeSyncReport:
+        """Run a plan made from the groups of the last `load()`.
+
+        :param limit: parallel requests, the client policy by default.
+        """
+        limit = concurrency_limit(self.api.api_client, limit)
+        report = _new_report()
+        for operations in plan.levels:
+            broken = set(report.errors) | set(report.failures) | set(report.skipped)
+            runnable = []
+            for operation in operations:
+                parent = operation.changes.get("parent")
+                if parent is not None and (parent in broken or parent not in plan.ids):
+                    report.skipped.append(operation.key)
+                else:
+                    runnable.append(operation)
+            restores = [operation for operation in runnable if operation.restore]
+            if restores:
+                await self._restore(restores, report)
+            failed = set(report.errors) | set(report.failures)
+            await gather_limited(
+                [
+                    functools.partial(self._apply, operation, plan, report)
+                    for operation in runnable
+                    if operation.key not in failed
+                    and (operation.changes or operation.group_id is None)
+                ],
+                limit,
+            )
+
+        if plan.deletes and not report.ok:
+            # a group that failed to move out could still be in a group to delete
+            report.skipped.extend(plan.deletes)
+        elif plan.deletes:
+            try:
+                response = await self.api.v2_entities_products_group_delete_post(
+                    product_group_delete_restore_request_scheme=_group_ids(plan.deletes)
+                )
+            except Exception as error:
+                for group_id in plan.deletes:
+                    report.failures[group_id] = error
+            else:
+                if _failed(response):
+                    for group_id in plan.deletes:
+                        report.errors[group_id] = response.errors or []
+                else:
+                    report.deleted.extend(plan.deletes)
+        return report
+
+    async def sync(
+        self,
+        desired: Iterable[DesiredGroup],
+        delete_missing: bool = False,
+        limit: Optional[int] = None,
+    ) -> TreeSyncReport:
+        """Load the live tree, plan the changes and apply them."""
+        current = await self.load()
+        return await self.apply(plan_group_sync(current, desired, delete_missing), limit)
+
+
+async def sync_categories(
+    api,
+    names: Iterable[str],
+    delete_missing: bool = False,
+    limit: Optional[int] = None,
+) -> TreeSyncReport:
+    """Make the user categories match `names`.
+
+    A missing category is restored when a deleted one has the same name
+    and created otherwise; the report is keyed by category name.
+    """
+    current: List[EntityDto] = await api.v2_entities_products_category_list_get(
+        include_deleted=True
+    ) or []
+    by_name: Dict[str, EntityDto] = {}
+    for live in sorted(current, key=lambda item: item.deleted, reverse=True):
+        by_name[live.name] = live
+    names = list(dict.fromkeys(names))
+    report = _new_report()
+
+    async def run(
+        name: str, done: Optional[List[str]], call: Callable[[], Awaitable[Any]]
+    ) -> None:
+        try:
+            response = await call()
+        except Exception as error:
+            report.failures[name] = error
+            return
+        if _failed(response) or done is None and response.response is None:
+            report.errors[name] = response.errors or []
+        elif done is None:
+            report.created[name] = response.response.id
+        else:
+            done.append(name)
+
+    calls: List[Callable[[], Awaitable[None]]] = []
+    for name in names:
+        category = by_name.get(name)
+        if category is None:
+            calls.append(functools.partial(run, name, None, functools.partial(
+                api.v2_entities_products_category_save_post,
+                base_entity_dto=BaseEntityDto(name=name),
+            )))
+        elif category.deleted:
+            calls.append(functools.partial(run, name, report.restored, functools.partial(
+                api.v2_entities_products_category_restore_post,
+                id_codet_dto=IdCodetDto(id=category.id),
+            )))
+    if delete_missing:
+        wanted = set(names)
+        for live in current:
+            if not live.deleted and live.name not in wanted:
+                calls.append(functools.partial(run, live.name, report.deleted, functools.partial(
+                    api.v2_entities_products_category_delete_post,
+                    id_codet_dto=IdCodetDto(id=live.id),
+                )))
+    await gather_limited(calls, concurrency_limit(api.api_client, limit))
+    return report
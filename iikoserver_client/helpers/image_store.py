@@ -0,0 +1,326 @@
+"""Image upload and download with a content-addressed disk cache.
+
+`ImageDto.data` carries a whole image as base64 text. `ImageStore` reads
+and hashes files in chunks, encodes them chunk by chunk and keeps an index
+of content hashes, so an image uploaded or loaded before is not uploaded
+again. Loaded images are decoded in chunks straight into a cache file
+named after the image id, and later loads are answered from disk.
+
+Hashing, encoding and decoding read or write whole files, so the store
+runs them in the default executor of the event loop.
+"""
+
+import asyncio
+import base64
+import functools
+import hashlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from iikoserver_client.exceptions import ApiException, ApiValueError
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.models.base_image_dto import BaseImageDto
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.id_codet_dto import IdCodetDto
+from iikoserver_client.models.id_list_dto import IdListDto
+from iikoserver_client.models.request_result_dto_enum import RequestResultDtoEnum
+
+IMAGE_CHUNK_SIZE = 3 * 64 * 1024
+"""Raw bytes read per step; a multiple of 3, so chunks encode without padding"""
+
+ImageSource = Union[str, Path, bytes]
+
+_IMAGE_ID = re.compile(r"[0-9A-Za-z_-]+")
+
+
+def _open_source(source: ImageSource) -> BinaryIO:
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return open(source, "rb")
+
+
+def image_digest(source: ImageSource, chunk_size: int = IMAGE_CHUNK_SIZE) -> str:
+    """SHA-256 of the image content, read in chunks."""
+    digest = hashlib.sha256()
+    with _open_source(source) as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_image(source: ImageSource, chunk_size: int = IMAGE_CHUNK_SIZE) -> str:
+    """Base64 text of an image, encoded chunk by chunk.
+
+    The source is read `chunk_size` bytes at a time, but the returned text
+    holds the whole image, about 4/3 of its size, as `ImageDto.data`
+    needs one string.
+    """
+    if chunk_size % 3:
+        raise ValueError("chunk_size must be a multiple of 3")
+    parts: List[str] = []
+    with _open_source(source) as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            parts.append(base64.b64encode(chunk).decode("ascii"))
+    return "".join(parts)
+
+
+def decode_image(
+    data: Union[str, bytes], target: BinaryIO, chunk_size: int = 4 * 64 * 1024
+) -> str:
+    """Decode base64 `data` into `target` chunk by chunk.
+
+    :return: SHA-256 of the decoded content.
+    """
+    if chunk_size % 4:
+        raise ValueError("chunk_size must be a multiple of 4")
+    if isinstance(data, bytes):
+        data = data.decode("ascii")
+    if any(character in data for character in "\r\n "):
+        data = "".join(data.split())
+    digest = hashlib.sha256()
+    for start in range(0, len(data), chunk_size):
+        chunk = base64.b64decode(data[start:start + chunk_size])
+        digest.update(chunk)
+        target.write(chunk)
+    return digest.hexdigest()
+
+
+def _write_image(data: Union[str, bytes], path: Path) -> str:
+    """Decode `data` into `path` through a temporary file; returns the digest."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + ".tmp")
+    try:
+        with open(temporary, "wb") as stream:
+            digest = decode_image(data, stream)
+        os.replace(temporary, path)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+    return digest
+
+
+class ImageUploadResult(NamedTuple):
+    """Outcome of one upload; `uploaded` is False for a known image"""
+
+    source: ImageSource
+    digest: str
+    image_id: Optional[str]
+    uploaded: bool
+    errors: Optional[List[ErrorDto]] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.image_id is not None
+
+
+class ImageLoadResults(NamedTuple):
+    """Outcome of `ImageStore.load_many`, keyed by image id"""
+
+    paths: Dict[str, Path]
+    failures: Dict[str, BaseException]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+class ImageStore:
+    """Images of `NomenclatureManagementApi` cached in a directory.
+
+    ``index.json`` maps content hashes to image ids and ``images/<id>``
+    holds the loaded images. The index is written after every call that
+    changes it, so a restart keeps the dedupe. It only knows images that
+    went through the store; an image deleted elsewhere is still considered
+    present until `forget` or `delete` is called for it.
+    """
+
+    def __init__(self, api, path: Union[str, Path]) -> None:
+        self.api = api
+        self.path = Path(path)
+        self.hashes: Dict[str, str] = {}
+        index = self.path / "index.json"
+        if index.exists():
+            with open(index, encoding="utf-8") as stream:
+                self.hashes = json.load(stream)
+
+    def save(self) -> None:
+        """Write the hash index."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        index = self.path / "index.json"
+        temporary = index.with_name(index.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as stream:
+            json.dump(self.hashes, stream)
+        os.replace(temporary, index)
+
+    def image_path(self, image_id: str) -> Path:
+        """Cache file of an image.
+
+        :raises ApiValueError: when the id is not a plain identifier, so
+            an id from the server cannot point outside the cache.
+        """
+        if not _IMAGE_ID.fullmatch(image_id):
+            raise ApiValueError("Invalid image id {0!r}".format(image_id))
+        return self.path / "images" / image_id
+
+    def forget(self, image_id: str) -> None:
+        """Drop an image from the index and the disk cache."""
+        self._forget(image_id)
+        self.save()
+
+    def _forget(self, image_id: str) -> None:
+        for digest in [key for key, value in self.hashes.items() if value == image_id]:
+            del self.hashes[digest]
+        path = self.image_path(image_id)
+        if path.exists():
+            path.unlink()
+
+    async def upload(self, source: ImageSource) -> ImageUploadResult:
+        """Upload an image unless one with the same content is known.
+
+        Uploads are not repeated on failure, since every save creates a
+        new image.
+        """
+        loop = asyncio.get_running_loop()
+        result = await self._upload(
+            source, await loop.run_in_executor(None, image_digest, source)
+        )
+        if result.uploaded:
+            self.save()
+        return result
+
+    async def _upload(self, source: ImageSource, digest: str) -> ImageUploadResult:
+        if digest in self.hashes:
+            return ImageUploadResult(source, digest, self.hashes[digest], False)
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(None, encode_image, source)
+            response = await self.api.v2_images_save_post(
+                base_image_dto=BaseImageDto(data=data)
+            )
+        except Exception as error:
+            return ImageUploadResult(source, digest, None, False, error=error)
+        if response.result != RequestResultDtoEnum.SUCCESS:
+            return ImageUploadResult(source, digest, None, False, errors=response.errors or [])
+        if response.response is None or not response.response.id:
+            return ImageUploadResult(
+                source, digest, None, False,
+                error=ApiException(reason="The server returned no image id"),
+            )
+        self.hashes[digest] = response.response.id
+        return ImageUploadResult(source, digest, response.response.id, True)
+
+    async def upload_many(
+        self, sources: Iterable[ImageSource], limit: Optional[int] = None
+    ) -> List[ImageUploadResult]:
+        """Upload images in parallel; equal contents are uploaded once.
+
+        :param limit: parallel requests, the client policy by default.
+        """
+        sources = list(sources)
+        first: Dict[str, int] = {}
+        loop = asyncio.get_running_loop()
+        digests = await asyncio.gather(
+            *(loop.run_in_executor(None, image_digest, source) for source in sources)
+        )
+        for index, digest in enumerate(digests):
+            first.setdefault(digest, index)
+        try:
+            uploaded = await gather_limited(
+                [
+                    functools.partial(self._upload, sources[index], digests[index])
+                    for index in first.values()
+                ],
+                concurrency_limit(self.api.api_client, limit),
+            )
+        finally:
+            self.save()
+        by_digest = dict(zip(first, uploaded))
+        results = []
+        for index, (source, digest) in enumerate(zip(sources, digests)):
+            result = by_digest[digest]
+            if first[digest] != index:
+                result = result._replace(source=source, uploaded=False)
+            results.append(result)
+        return results
+
+    async def load(self, image_id: str) -> Path:
+        """Path of the cached image, downloading it first when needed.
+
+        :raises ApiException: when the server reports an error or returns
+            no image data.
+        """
+        known = len(self.hashes)
+        path = await self._load(image_id)
+        if len(self.hashes) != known:
+            self.save()
+        return path
+
+    async def _load(self, image_id: str) -> Path:
+        path = self.image_path(image_id)
+        if path.exists():
+            return path
+        response = await retry_call(
+            functools.partial(self.api.v2_images_load_get, image_id=image_id)
+        )
+        if response.result != RequestResultDtoEnum.SUCCESS:
+            raise ApiException(reason="; ".join(
+                "{0}: {1}".format(error.code, error.value) for error in response.errors or []
+            ) or "Image {0} could not be loaded".format(image_id))
+        if response.response is None or response.response.data is None:
+            raise ApiException(reason="Image {0} has no data".format(image_id))
+        digest = await asyncio.get_running_loop().run_in_executor(
+            None, _write_image, response.response.data, path
+        )
+        self.hashes.setdefault(digest, image_id)
+        return path
+
+    async def load_many(
+        self, image_ids: Iterable[str], limit: Optional[int] = None
+    ) -> ImageLoadResults:
+        """Load images in parallel, answering cached ones from disk.
+
+        An image that cannot be loaded does not stop the others; its error
+        is reported in `ImageLoadResults.failures`.
+        """
+        results = ImageLoadResults({}, {})
+
+        async def load_one(image_id: str) -> None:
+            try:
+                results.paths[image_id] = await self._load(image_id)
+            except Exception as error:
+                results.failures[image_id] = error
+
+        try:
+            await gather_limited(
+                [functools.partial(load_one, image_id) for image_id in dict.fromkeys(image_ids)],
+                concurrency_limit(self.api.api_client, limit),
+            )
+        finally:
+            self.save()
+        return results
+
+    async def delete(self, image_ids: Iterable[str]) -> List[str]:
+        """Delete images on the server and from the store.
+
+        :return: ids the server reported as deleted.
+        """
+        image_ids = list(image_ids)
+        response = await retry_call(functools.partial(
+            self.api.v2_images_delete_post,
+            id_list_dto=IdListDto(items=[IdCodetDto(id=image_id) for image_id in image_ids]),
+        ))
+        if response.result != RequestResultDtoEnum.SUCCESS:
+            raise ApiException(reason="; ".join(
+                "{0}: {1}".format(error.code, error.value) for error in response.errors or []
+            ) or "Images could not be deleted")
+        deleted = [
+            item.id for item in (response.response.items if response.response else None) or []
+        ]
+        for image_id in deleted:
+            self._forget(image_id)
+        self.save()
+        return deleted
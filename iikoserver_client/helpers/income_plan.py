@@ -0,0 +1,153 @@
+"""Monthly income plan against actual revenue as daily series.
+
+`fetch_income_plan` loads `reports_monthly_income_plan_get` for several
+departments into one table; `plan_vs_actual` aligns it by department and
+date with actual revenue from `fetch_sales` or an OLAP table and adds
+month-to-date totals. The result converts to pandas with `to_pandas()`.
+"""
+
+import functools
+import math
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from iikoserver_client.helpers.columnar import Column, ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.helpers.conversions import EnumConverter, to_date
+from iikoserver_client.helpers.xml_stream import element_values, stream_xml_records
+from iikoserver_client.models.budget_plan_item_value_type_enum import (
+    BudgetPlanItemValueTypeEnum
+)
+
+INCOME_PLAN_SCHEMA = {
+    "department": "",
+    "date": "",
+    "plan_value": "d",
+    "value_type": "",
+}
+
+PLAN_VS_ACTUAL_SCHEMA = {
+    "department": "",
+    "date": "",
+    "plan": "d",
+    "actual": "d",
+    "plan_to_date": "d",
+    "actual_to_date": "d",
+    "execution_percent": "d",
+}
+
+_NAN = float("nan")
+
+
+async def fetch_income_plan(
+    api,
+    departments: Sequence[str],
+    date_from: date,
+    date_to: date,
+    limit: Optional[int] = None,
+) -> ColumnTable:
+    """Daily plan items of several departments.
+
+    :param api: `ReportsV1Api` instance.
+    :param date_to: last day, included.
+    """
+    table = ColumnTable.empty(INCOME_PLAN_SCHEMA)
+    value_types = EnumConverter(BudgetPlanItemValueTypeEnum)
+
+    async def run(department: str) -> None:
+        async for element in stream_xml_records(
+            api, "reports_monthly_income_plan_get",
+            department=department,
+            date_from=date_from.strftime("%d.%m.%Y"),
+            date_to=date_to.strftime("%d.%m.%Y"),
+        ):
+            record = element_values(element)
+            value_type = record.get("valueType")
+            plan_value = record.get("planValue")
+            table.append((
+                department,
+                to_date(record.get("date")),
+                float(plan_value) if plan_value else _NAN,
+                None if value_type is None else value_types(value_type),
+            ))
+
+    await gather_limited(
+        [functools.partial(run, department) for department in departments],
+        concurrency_limit(api.api_client, limit),
+    )
+    return table
+
+
+def _sum_by_day(
+    table: ColumnTable, department_column: str, date_column: str, value_column: str
+) -> Dict[Tuple[Optional[str], date], float]:
+    totals: Dict[Tuple[Optional[str], date], float] = {}
+    for department, day, value in zip(
+        table[department_column], table[date_column], table[value_column]
+    ):
+        day = to_date(day)
+        if day is None or value is None or value != value:
+            continue
+        key = (department, day)
+        totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _day_order(key: Tuple[Optional[str], date]) -> Tuple[Any, ...]:
+    department, day = key
+    return (department is None, department or "", day)
+
+
+def plan_vs_actual(
+    plan: ColumnTable,
+    actual: ColumnTable,
+    value_column: str = "value",
+    date_column: str = "date",
+    department_column: str = "department",
+    value_type: Optional[str] = BudgetPlanItemValueTypeEnum.ABSOLUTE.value,
+) -> ColumnTable:
+    """Merge plan and actual values on department and day.
+
+    :param plan: table from `fetch_income_plan`.
+    :param value_type: only plan items of this value type are summed, since
+        absolute amounts and percentages do not add up; None keeps all.
+    :param actual: revenue rows, e.g. from `fetch_sales` or an OLAP report;
+        several rows per day are summed and datetimes are cut to days.
+    :return: one row per department and day present in either table,
+        sorted with rows without a department last, and NaN where a side
+        has no value. Month-to-date totals
+        restart with every month; `execution_percent` is
+        ``actual_to_date / plan_to_date * 100``.
+    """
+    if value_type is not None:
+        plan = plan.take([
+            index for index, item_type in enumerate(plan["value_type"])
+            if item_type == value_type
+        ])
+    plans = _sum_by_day(plan, "department", "date", "plan_value")
+    actuals = _sum_by_day(actual, department_column, date_column, value_column)
+
+    result = ColumnTable.empty(PLAN_VS_ACTUAL_SCHEMA)
+    columns: List[Column] = [result[name] for name in list(PLAN_VS_ACTUAL_SCHEMA)[2:]]
+    departments, days = result["department"], result["date"]
+    period: Optional[Tuple[Optional[str], int, int]] = None
+    plan_to_date = actual_to_date = 0.0
+    for key in sorted(set(plans) | set(actuals), key=_day_order):
+        department, day = key
+        if period != (department, day.year, day.month):
+            period = (department, day.year, day.month)
+            plan_to_date = actual_to_date = 0.0
+        plan_value = plans.get(key, _NAN)
+        actual_value = actuals.get(key, _NAN)
+        if not math.isnan(plan_value):
+            plan_to_date += plan_value
+        if not math.isnan(actual_value):
+            actual_to_date += actual_value
+        departments.append(department)
+        days.append(day)
+        for column, value in zip(columns, (
+            plan_value, actual_value, plan_to_date, actual_to_date,
+            actual_to_date / plan_to_date * 100 if plan_to_date else _NAN,
+        )):
+            column.append(value)
+    return result
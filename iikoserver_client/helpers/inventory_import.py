@@ -0,0 +1,327 @@
+"""Chunked check and import of large inventory documents.
+
+`documents_check_incoming_inventory_post` validates an inventory and
+returns the expected amounts of its products. `InventoryWorkflow` checks
+a stocktake in chunks of lines and caches the outcome of every line by a
+fingerprint of the line and the document header, so after edits only new
+or changed lines are checked again. Cached results expire after `ttl`
+seconds, because expected amounts move with every stock operation. The
+import is then assembled from the lines that passed the check.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.models.incoming_inventory_item_xml import IncomingInventoryItemXml
+from iikoserver_client.models.incoming_inventory_validation_result_item_xml import (
+    IncomingInventoryValidationResultItemXml
+)
+from iikoserver_client.models.incoming_inventory_validation_result_xml import (
+    IncomingInventoryValidationResultXml
+)
+from iikoserver_client.models.incoming_inventory_xml import IncomingInventoryXml
+from iikoserver_client.models.incoming_inventory_xml_items import IncomingInventoryXmlItems
+
+DEFAULT_CHECK_CHUNK_SIZE = 500
+
+DEFAULT_CACHE_TTL = 900
+
+
+def _fingerprint(data: Dict[str, Any]) -> str:
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _header_fingerprint(document: IncomingInventoryXml) -> str:
+    header = document.to_dict()
+    header.pop("items", None)
+    return _fingerprint(header)
+
+
+def inventory_line_key(document: IncomingInventoryXml, item: IncomingInventoryItemXml) -> str:
+    """Cache key of a line: the line itself and the header it is checked with.
+
+    Expected amounts depend on the store, the date and the other header
+    fields, so a header change invalidates all lines.
+    """
+    return _line_key(_header_fingerprint(document), item)
+
+
+def _line_key(header: str, item: IncomingInventoryItemXml) -> str:
+    return _fingerprint({"header": header, "item": item.to_dict()})
+
+
+def _message(response: IncomingInventoryValidationResultXml) -> str:
+    return response.error_message or response.additional_info or ""
+
+
+class _ProductResults:
+    """Validation results by product id and by article.
+
+    A line names its product by `product_id` or by `product_article`; the
+    result names it by `IdCodeNameDto.id` and `code`, the article. The two
+    keys are indexed apart, so an article never matches an id.
+    """
+
+    def __init__(self, response: IncomingInventoryValidationResultXml) -> None:
+        self.by_id: Dict[str, IncomingInventoryValidationResultItemXml] = {}
+        self.by_article: Dict[str, IncomingInventoryValidationResultItemXml] = {}
+        for result in (response.items.item or []) if response.items is not None else []:
+            self.by_id[result.product.id] = result
+            if result.product.code:
+                self.by_article.setdefault(result.product.code, result)
+
+    def get(
+        self, item: IncomingInventoryItemXml
+    ) -> Optional[IncomingInventoryValidationResultItemXml]:
+        if item.product_id:
+            return self.by_id.get(item.product_id)
+        if item.product_article:
+            return self.by_article.get(item.product_article)
+        return None
+
+
+class InventoryCheckResult(NamedTuple):
+    """Outcome of checking a document.
+
+    `results` maps the index of every line that passed to the validation
+    result of its product (None when the server returned none), `errors`
+    maps failing lines to the server message. `document_errors` are
+    messages the server also returned for the header without lines, e.g.
+    an unknown store; the lines of such chunks are in neither mapping.
+    `checked` lines were sent to the server, `cached` lines were answered
+    from the cache.
+    """
+
+    results: Dict[int, Optional[IncomingInventoryValidationResultItemXml]]
+    errors: Dict[int, str]
+    checked: int
+    cached: int
+    document_errors: Sequence[str] = ()
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors and not self.document_errors
+
+
+class InventoryImportResult(NamedTuple):
+    """Import response and the check it was assembled from.
+
+    `result` is None when no line passed the check and nothing was sent.
+    """
+
+    result: Optional[IncomingInventoryValidationResultXml]
+    check: InventoryCheckResult
+
+
+class InventoryWorkflow:
+    """Check-then-import of inventories through `DocumentsManagementApi`.
+
+    Lines are checked in chunks of `chunk_size`. A chunk the server
+    rejects as a whole is split in halves and checked again, so one bad
+    line does not hide the results of the others; only single failing
+    lines end up in `InventoryCheckResult.errors` and are never cached.
+    When both halves fail with the message of the whole chunk, the header
+    is checked once without lines; only if that fails with the same
+    message does splitting stop with a document error, otherwise the
+    halves are split further.
+
+    :param cache_path: JSON file keeping the line results between runs.
+    :param ttl: maximum age in seconds of a cached line result, None to
+        keep results until the line or the header changes.
+    :param attempts: tries per request for transient failures.
+    """
+
+    def __init__(
+        self,
+        api,
+        chunk_size: int = DEFAULT_CHECK_CHUNK_SIZE,
+        cache_path: Optional[Union[str, Path]] = None,
+        attempts: int = 3,
+        retry_delay: float = 0.5,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.api = api
+        self.chunk_size = chunk_size
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.ttl = ttl
+        self.cache: Dict[str, Optional[IncomingInventoryValidationResultItemXml]] = {}
+        self.checked_at: Dict[str, float] = {}
+        if self.cache_path is not None and self.cache_path.exists():
+            with open(self.cache_path, encoding="utf-8") as stream:
+                for key, entry in json.load(stream).items():
+                    if not isinstance(entry, dict) or "checked_at" not in entry:
+                        continue
+                    self.cache[key] = IncomingInventoryValidationResultItemXml.from_dict(
+                        entry["result"]
+                    )
+                    self.checked_at[key] = entry["checked_at"]
+            self.expire()
+
+    def expire(self) -> None:
+        """Drop the cached results older than `ttl`."""
+        if self.ttl is None:
+            return
+        oldest = time.time() - self.ttl
+        for key in [key for key, checked_at in self.checked_at.items() if checked_at < oldest]:
+            del self.checked_at[key]
+            self.cache.pop(key, None)
+
+    def save(self) -> None:
+        """Write the cache to `cache_path`."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as stream:
+            json.dump(
+                {
+                    key: {
+                        "checked_at": self.checked_at[key],
+                        "result": value.to_dict() if value is not None else None,
+                    }
+                    for key, value in self.cache.items()
+                },
+                stream,
+                ensure_ascii=False,
+            )
+        os.replace(temporary, self.cache_path)
+
+    @staticmethod
+    def _with_items(
+        document: IncomingInventoryXml, items: Sequence[IncomingInventoryItemXml]
+    ) -> IncomingInventoryXml:
+        return document.model_copy(update={"items": IncomingInventoryXmlItems(item=list(items))})
+
+    async def _check(
+        self,
+        document: IncomingInventoryXml,
+        items: List[IncomingInventoryItemXml],
+        lines: List[int],
+    ) -> IncomingInventoryValidationResultXml:
+        return await retry_call(
+            functools.partial(
+                self.api.documents_check_incoming_inventory_post,
+                self._with_items(document, [items[index] for index in lines]),
+            ),
+            self.attempts,
+            self.retry_delay,
+        )
+
+    async def _is_document_error(
+        self, document: IncomingInventoryXml, message: str, probes: Dict[str, bool]
+    ) -> bool:
+        """Whether the header alone fails with `message`; checked once per message."""
+        if message not in probes:
+            response = await self._check(document, [], [])
+            probes[message] = not response.valid and _message(response) == message
+        return probes[message]
+
+    async def _check_lines(
+        self,
+        document: IncomingInventoryXml,
+        items: List[IncomingInventoryItemXml],
+        lines: List[int],
+        errors: Dict[int, str],
+        document_errors: List[str],
+        probes: Dict[str, bool],
+        response: Optional[IncomingInventoryValidationResultXml] = None,
+    ) -> None:
+        if response is None:
+            response = await self._check(document, items, lines)
+        if not response.valid:
+            message = _message(response)
+            if len(lines) == 1:
+                errors[lines[0]] = message
+                return
+            middle = len(lines) // 2
+            halves = [lines[:middle], lines[middle:]]
+            responses = [await self._check(document, items, half) for half in halves]
+            if (
+                all(not item.valid and _message(item) == message for item in responses)
+                and await self._is_document_error(document, message, probes)
+            ):
+                if message not in document_errors:
+                    document_errors.append(message)
+                return
+            for half, half_response in zip(halves, responses):
+                await self._check_lines(
+                    document, items, half, errors, document_errors, probes, half_response
+                )
+            return
+
+        header = _header_fingerprint(document)
+        results = _ProductResults(response)
+        checked_at = time.time()
+        for index in lines:
+            key = _line_key(header, items[index])
+            self.cache[key] = results.get(items[index])
+            self.checked_at[key] = checked_at
+
+    async def check(
+        self, document: IncomingInventoryXml, limit: Optional[int] = None
+    ) -> InventoryCheckResult:
+        """Check the lines of `document` that have no fresh cached result.
+
+        :param limit: parallel requests, the client policy by default.
+        """
+        self.expire()
+        items = document.items.item if document.items is not None else None
+        items = items or []
+        header = _header_fingerprint(document)
+        keys = [_line_key(header, item) for item in items]
+        pending = [index for index, key in enumerate(keys) if key not in self.cache]
+        errors: Dict[int, str] = {}
+        document_errors: List[str] = []
+        probes: Dict[str, bool] = {}
+        chunks = [
+            pending[start:start + self.chunk_size]
+            for start in range(0, len(pending), self.chunk_size)
+        ]
+        await gather_limited(
+            [
+                functools.partial(
+                    self._check_lines, document, items, chunk, errors, document_errors, probes
+                )
+                for chunk in chunks
+            ],
+            concurrency_limit(self.api.api_client, limit),
+        )
+        self.save()
+        return InventoryCheckResult(
+            results={
+                index: self.cache[key] for index, key in enumerate(keys) if key in self.cache
+            },
+            errors=errors,
+            checked=len(pending),
+            cached=len(items) - len(pending),
+            document_errors=document_errors,
+        )
+
+    async def import_document(
+        self, document: IncomingInventoryXml, limit: Optional[int] = None
+    ) -> InventoryImportResult:
+        """Check what is not cached yet and import the lines that passed.
+
+        Failing lines are left out of the import and reported. Nothing is
+        imported when no line passed.
+        """
+        check = await self.check(document, limit)
+        items = document.items.item if document.items is not None else None
+        passed = [item for index, item in enumerate(items or []) if index in check.results]
+        if not passed:
+            return InventoryImportResult(result=None, check=check)
+        result = await self.api.documents_import_incoming_inventory_post(
+            self._with_items(document, passed)
+        )
+        return InventoryImportResult(result=result, check=check)
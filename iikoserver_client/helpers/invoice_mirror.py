@@ -0,0 +1,268 @@
+"""Local mirror of exported invoices kept up to date incrementally.
+
+`InvoiceMirror` streams `documents_export_incoming_invoice_get` and
+`documents_export_outgoing_invoice_get` responses record by record and
+only builds models for invoices whose XML changed since the last sync.
+Documents are upserted by id into a gzip JSON store and their lines go to
+a columnar side table, so accounting exports read the mirror instead of
+downloading a month of invoices again.
+
+Incoming invoices are requested with `revision_from`; the cursor is taken
+from the ``revision`` attribute of the response root, when the server
+sends one, and persisted per supplier set and date window. The outgoing export has no
+revision filter, so its window is downloaded again and unchanged
+documents are recognized by the hash of their XML.
+"""
+
+import gzip
+import hashlib
+import json
+import math
+import os
+from datetime import date
+from pathlib import Path
+from typing import (
+    Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+)
+
+from lxml import etree
+from pydantic import BaseModel
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.xml_stream import stream_xml_records
+from iikoserver_client.models.incoming_invoice_item_xml import IncomingInvoiceItemXml
+from iikoserver_client.models.incoming_invoice_xml import IncomingInvoiceXml
+from iikoserver_client.models.outgoing_invoice_item_xml import OutgoingInvoiceItemXml
+from iikoserver_client.models.outgoing_invoice_xml import OutgoingInvoiceXml
+
+INCOMING = "incoming"
+OUTGOING = "outgoing"
+
+
+class InvoiceKind(NamedTuple):
+    """Export endpoint and models of one invoice type"""
+
+    operation: str
+    model: Type[Union[IncomingInvoiceXml, OutgoingInvoiceXml]]
+    item_model: Type[BaseModel]
+    revisioned: bool
+
+
+INVOICE_KINDS: Dict[str, InvoiceKind] = {
+    INCOMING: InvoiceKind(
+        "documents_export_incoming_invoice_get", IncomingInvoiceXml, IncomingInvoiceItemXml, True
+    ),
+    OUTGOING: InvoiceKind(
+        "documents_export_outgoing_invoice_get", OutgoingInvoiceXml, OutgoingInvoiceItemXml, False
+    ),
+}
+
+_ITEM_NUMBER_FIELDS = frozenset({
+    "amount", "actualAmount", "actualUnitWeight", "sum", "discountSum", "vatPercent", "vatSum",
+    "price", "priceWithoutVat",
+})
+
+
+def invoice_items_schema(kind: str) -> Dict[str, str]:
+    """Columns of the line side table: ``documentId`` and the item fields."""
+    schema = {"documentId": ""}
+    for name, field in INVOICE_KINDS[kind].item_model.model_fields.items():
+        alias = field.alias or name
+        schema[alias] = "d" if alias in _ITEM_NUMBER_FIELDS else ""
+    return schema
+
+
+def _document_id(document: Any) -> str:
+    if document.id:
+        return document.id
+    value = document.date_incoming
+    if isinstance(value, date):
+        value = value.isoformat()
+    return "{0}|{1}".format(document.document_number or "", value or "")
+
+
+class MirrorSyncResult(NamedTuple):
+    """Counts of one sync"""
+
+    inserted: int
+    updated: int
+    unchanged: int
+    revision: Optional[int]
+
+
+class InvoiceMirror:
+    """Invoice store in a directory, one set of files per invoice kind.
+
+    ``state.json`` holds the revision cursors, ``<kind>.documents.json.gz``
+    the documents with the hashes of their XML and
+    ``<kind>.items.cols.gz`` the line table.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.cursors: Dict[str, int] = {}
+        state = self.path / "state.json"
+        if state.exists():
+            with open(state, encoding="utf-8") as stream:
+                self.cursors = json.load(stream).get("cursors", {})
+        self._documents: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._items: Dict[str, ColumnTable] = {}
+
+    @staticmethod
+    def cursor_key(
+        kind: str, date_from: date, date_to: date, supplier_ids: Optional[Sequence[str]] = None
+    ) -> str:
+        """Cursor of one supplier set and window; documents of another window
+        that did not change after its cursor would be missed otherwise."""
+        return "|".join(
+            [kind, date_from.isoformat(), date_to.isoformat()] + sorted(supplier_ids or [])
+        )
+
+    def _load(self, kind: str) -> Tuple[Dict[str, Dict[str, Any]], ColumnTable]:
+        if kind not in INVOICE_KINDS:
+            raise ApiValueError("Unknown invoice kind '{0}'".format(kind))
+        if kind not in self._documents:
+            documents_path = self.path / "{0}.documents.json.gz".format(kind)
+            items_path = self.path / "{0}.items.cols.gz".format(kind)
+            documents: Dict[str, Dict[str, Any]] = {}
+            if documents_path.exists():
+                with gzip.open(documents_path, "rt", encoding="utf-8") as stream:
+                    documents = json.load(stream)
+            self._documents[kind] = documents
+            self._items[kind] = (
+                ColumnTable.read(items_path) if items_path.exists()
+                else ColumnTable.empty(invoice_items_schema(kind))
+            )
+        return self._documents[kind], self._items[kind]
+
+    def _save(self, kind: str) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        documents_path = self.path / "{0}.documents.json.gz".format(kind)
+        temporary = documents_path.with_name(documents_path.name + ".tmp")
+        with gzip.open(temporary, "wt", encoding="utf-8") as stream:
+            json.dump(self._documents[kind], stream, ensure_ascii=False)
+        os.replace(temporary, documents_path)
+
+        items_path = self.path / "{0}.items.cols.gz".format(kind)
+        temporary = items_path.with_name(items_path.name + ".tmp")
+        self._items[kind].write(temporary)
+        os.replace(temporary, items_path)
+
+        state = self.path / "state.json"
+        temporary = state.with_name(state.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as stream:
+            json.dump({"cursors": self.cursors}, stream)
+        os.replace(temporary, state)
+
+    @staticmethod
+    def _item_rows(
+        schema: Dict[str, str], document_id: str, document: Any
+    ) -> List[Tuple[Any, ...]]:
+        items = document.items.item if document.items is not None else None
+        rows = []
+        for item in items or []:
+            values = item.model_dump(by_alias=True)
+            row: List[Any] = [document_id]
+            for name, typecode in list(schema.items())[1:]:
+                value = values.get(name)
+                if typecode:
+                    value = float(value) if value is not None else math.nan
+                row.append(value)
+            rows.append(tuple(row))
+        return rows
+
+    async def sync(
+        self,
+        api,
+        kind: str,
+        date_from: date,
+        date_to: date,
+        supplier_ids: Optional[Sequence[str]] = None,
+    ) -> MirrorSyncResult:
+        """Fetch new and changed invoices of a period and upsert them.
+
+        :param api: `InvoicesManagementApi` instance.
+        :param kind: `INCOMING` or `OUTGOING`.
+        :param supplier_ids: counteragent filter; every supplier set and
+            window keeps its own cursor.
+        """
+        documents, items = self._load(kind)
+        invoice_kind = INVOICE_KINDS[kind]
+        key = self.cursor_key(kind, date_from, date_to, supplier_ids)
+        params: Dict[str, Any] = {
+            "var_from": date_from,
+            "to": date_to,
+            "supplier_id": list(supplier_ids) if supplier_ids else None,
+        }
+        if invoice_kind.revisioned:
+            params["revision_from"] = self.cursors.get(key)
+
+        revisions: List[int] = []
+
+        def read_revision(root: etree._Element) -> None:
+            value = root.get("revision")
+            if value:
+                revisions.append(int(value))
+
+        inserted = updated = unchanged = 0
+        changed: Dict[str, Any] = {}
+        async for element in stream_xml_records(
+            api, invoice_kind.operation, on_root=read_revision, **params
+        ):
+            digest = hashlib.sha1(etree.tostring(element)).hexdigest()
+            element_id = element.findtext("id")
+            if element_id and documents.get(element_id, {}).get("hash") == digest:
+                unchanged += 1
+                continue
+            document = invoice_kind.model.from_xml_element(element)
+            if document is None:
+                raise ApiValueError("Invoice record '{0}' is empty".format(element_id or ""))
+            document_id = _document_id(document)
+            stored = documents.get(document_id)
+            if stored is not None and stored["hash"] == digest:
+                unchanged += 1
+                continue
+            if stored is None:
+                inserted += 1
+            else:
+                updated += 1
+            documents[document_id] = {
+                "hash": digest,
+                "document": document.model_dump(by_alias=True, mode="json", exclude_none=True),
+            }
+            changed[document_id] = document
+
+        if changed:
+            kept = [
+                index for index, document_id in enumerate(items["documentId"])
+                if document_id not in changed
+            ]
+            table = items.take(kept)
+            schema = invoice_items_schema(kind)
+            for document_id, document in changed.items():
+                for row in self._item_rows(schema, document_id, document):
+                    table.append(row)
+            self._items[kind] = table
+        revision = revisions[0] if revisions else None
+        if revision is not None:
+            self.cursors[key] = max(revision, self.cursors.get(key, revision))
+        if changed or revision is not None:
+            self._save(kind)
+        return MirrorSyncResult(inserted, updated, unchanged, self.cursors.get(key))
+
+    def get(self, kind: str, document_id: str) -> Optional[Any]:
+        stored = self._load(kind)[0].get(document_id)
+        if stored is None:
+            return None
+        return INVOICE_KINDS[kind].model.model_validate(stored["document"])
+
+    def documents(self, kind: str) -> Iterator[Any]:
+        """Mirrored documents of a kind as models."""
+        model = INVOICE_KINDS[kind].model
+        for stored in self._load(kind)[0].values():
+            yield model.model_validate(stored["document"])
+
+    def items(self, kind: str) -> ColumnTable:
+        """Line table of a kind, one row per invoice line."""
+        return self._load(kind)[1]
@@ -0,0 +1,256 @@
+"""Typed columnar OLAP results for v1 (XML) and v2 (JSON) reports."""
+
+from array import array
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from iikoserver_client.helpers.columnar import Column, ColumnTable
+from iikoserver_client.helpers.conversions import to_date, to_datetime
+from iikoserver_client.helpers.xml_stream import (
+    aiter_xml_records, element_values, iter_xml_records, serialize_call
+)
+from iikoserver_client.models.olap_column_info import OlapColumnInfo
+from iikoserver_client.models.olap_field_type_enum import OlapFieldTypeEnum
+from iikoserver_client.models.olap_report_type_enum import OlapReportTypeEnum
+from iikoserver_client.models.olap_v2_report_type_enum import OlapV2ReportTypeEnum
+from iikoserver_client.models.olap_v2_response import OlapV2Response
+
+ColumnInfo = Mapping[str, OlapColumnInfo]
+
+_NAN = float("nan")
+
+
+def _to_float(value: Any) -> float:
+    if value is None or value == "":
+        return _NAN
+    return float(value)
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("Fractional value {0!r} in an integer column".format(value))
+    return int(value)
+
+
+_FLOAT_TYPES = {
+    OlapFieldTypeEnum.AMOUNT,
+    OlapFieldTypeEnum.MONEY,
+    OlapFieldTypeEnum.PERCENT,
+    OlapFieldTypeEnum.DURATION_IN_SECONDS,
+}
+
+
+class ColumnBuilder:
+    """Accumulates the values of one column with its OLAP type.
+
+    Float fields go to `array('d')` with NaN for gaps, integer fields to
+    `array('q')` until a gap shows up, everything else to a list in which
+    repeated strings share one object. An integer field that receives a
+    fractional value is widened to floats rather than truncated.
+    """
+
+    def __init__(self, field_type: Optional[OlapFieldTypeEnum] = None) -> None:
+        self.field_type = field_type
+        self.values: Column
+        self.convert: Callable[[Any], Any]
+        self._strings: Dict[str, str] = {}
+        if field_type in _FLOAT_TYPES:
+            self.values = array("d")
+            self.convert = _to_float
+        elif field_type == OlapFieldTypeEnum.INTEGER:
+            self.values = array("q")
+            self.convert = _to_int
+        elif field_type == OlapFieldTypeEnum.DATE:
+            self.values = []
+            self.convert = to_date
+        elif field_type == OlapFieldTypeEnum.DATETIME:
+            self.values = []
+            self.convert = to_datetime
+        else:
+            self.values = []
+            self.convert = self._intern
+
+    def _intern(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self._strings.setdefault(value, value)
+        return value
+
+    def append(self, value: Any) -> None:
+        if value is None or value == "":
+            self.append_missing()
+            return
+        try:
+            self.values.append(self.convert(value))
+        except (TypeError, ValueError, OverflowError):
+            if self.convert is _to_int and self._widen_to_float(value):
+                return
+            self._to_list()
+            self.values.append(value)
+
+    def _widen_to_float(self, value: Any) -> bool:
+        try:
+            number = _to_float(value)
+        except (TypeError, ValueError):
+            return False
+        if isinstance(self.values, array):
+            self.values = array("d", self.values)
+        self.convert = _to_float
+        self.values.append(number)
+        return True
+
+    def append_missing(self, count: int = 1) -> None:
+        if isinstance(self.values, array):
+            if self.values.typecode == "d":
+                self.values.extend([_NAN] * count)
+                return
+            self._to_list()
+        self.values.extend([None] * count)
+
+    def _to_list(self) -> None:
+        if isinstance(self.values, array):
+            self.values = self.values.tolist()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class TableBuilder:
+    """Builds a `ColumnTable` row by row; new columns are back-filled."""
+
+    def __init__(self, column_info: Optional[ColumnInfo] = None) -> None:
+        self.column_info = column_info or {}
+        self.columns: Dict[str, ColumnBuilder] = {}
+        self.num_rows = 0
+
+    def _column(self, name: str) -> ColumnBuilder:
+        builder = self.columns.get(name)
+        if builder is None:
+            info = self.column_info.get(name)
+            builder = ColumnBuilder(info.type if info is not None else None)
+            if self.num_rows:
+                builder.append_missing(self.num_rows)
+            self.columns[name] = builder
+        return builder
+
+    def add_columns(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._column(name)
+
+    def append(self, row: Mapping[str, Any]) -> None:
+        for name, value in row.items():
+            self._column(name).append(value)
+        self.num_rows += 1
+        for builder in self.columns.values():
+            if len(builder) < self.num_rows:
+                builder.append_missing()
+
+    def build(self) -> ColumnTable:
+        return ColumnTable({name: builder.values for name, builder in self.columns.items()})
+
+
+def parse_olap_v1(
+    source: Union[bytes, str, Iterable[bytes]],
+    column_info: Optional[ColumnInfo] = None,
+    columns: Optional[Iterable[str]] = None,
+) -> ColumnTable:
+    """Parse a v1 OLAP XML report (``<report><r>...</r></report>``).
+
+    :param source: the XML document or an iterable of its chunks.
+    :param column_info: column metadata from `v2_reports_olap_columns_get`
+        used to type the columns; unknown columns stay strings.
+    :param columns: column order of the result, e.g. the requested fields.
+    """
+    builder = TableBuilder(column_info)
+    builder.add_columns(columns or ())
+    for element in iter_xml_records(source):
+        builder.append(element_values(element))
+    return builder.build()
+
+
+def olap_v1_request_params(
+    api,
+    report: Union[OlapReportTypeEnum, str],
+    var_from: Union[str, date],
+    to: Union[str, date],
+    group_row: Optional[List[str]] = None,
+    agr: Optional[List[str]] = None,
+    group_col: Optional[List[str]] = None,
+    summary: Optional[bool] = None,
+) -> Tuple[Any, ...]:
+    """Serialize a `ReportsV1Api.reports_olap_get` call for `ApiClient.stream_api`.
+
+    `report` may be given by name, as the generated method accepts it.
+    """
+    report = OlapReportTypeEnum(report)
+    if isinstance(var_from, date):
+        var_from = var_from.strftime("%d.%m.%Y")
+    if isinstance(to, date):
+        to = to.strftime("%d.%m.%Y")
+    return serialize_call(
+        api, "reports_olap_get",
+        report=report,
+        var_from=var_from,
+        to=to,
+        summary=summary,
+        group_row=group_row,
+        group_col=group_col,
+        agr=agr,
+    )
+
+
+async def fetch_olap_v1(
+    api,
+    report: Union[OlapReportTypeEnum, str],
+    var_from: Union[str, date],
+    to: Union[str, date],
+    group_row: Optional[List[str]] = None,
+    agr: Optional[List[str]] = None,
+    group_col: Optional[List[str]] = None,
+    summary: Optional[bool] = None,
+    column_info: Optional[ColumnInfo] = None,
+    reports_v2_api=None,
+) -> ColumnTable:
+    """Run a v1 OLAP report and stream its rows into a typed table.
+
+    :param api: `ReportsV1Api` instance.
+    :param column_info: column metadata; when omitted and `reports_v2_api`
+        is given, it is loaded with `v2_reports_olap_columns_get` for
+        report types known to OLAP v2.
+    """
+    if column_info is None and reports_v2_api is not None:
+        try:
+            report_type = OlapV2ReportTypeEnum(OlapReportTypeEnum(report).value)
+        except ValueError:
+            report_type = None
+        if report_type is not None:
+            column_info = await reports_v2_api.v2_reports_olap_columns_get(
+                report_type=report_type
+            )
+
+    params = olap_v1_request_params(
+        api, report, var_from, to, group_row, agr, group_col, summary
+    )
+    builder = TableBuilder(column_info)
+    builder.add_columns((group_row or []) + (group_col or []) + (agr or []))
+    async with api.api_client.stream_api(*params) as response:
+        async for element in aiter_xml_records(response):
+            builder.append(element_values(element))
+    return builder.build()
+
+
+def olap_v2_table(
+    response: OlapV2Response,
+    column_info: Optional[ColumnInfo] = None,
+    columns: Optional[Iterable[str]] = None,
+) -> ColumnTable:
+    """Convert the rows of a v2 OLAP response to a typed table."""
+    builder = TableBuilder(column_info)
+    builder.add_columns(columns or ())
+    for row in response.data:
+        builder.append(row)
+    return builder.build()
@@ -0,0 +1,249 @@
+"""Persistent per-day cache of OLAP v2 results.
+
+Data of closed days does not change, so an OLAP v2 request with a date
+range is split into one request per day and every finished day is stored
+as a columnar file. Later runs of an equivalent request only query the
+days that are missing from the cache or still open. Only requests grouped
+by the day field can be split this way: each row then belongs to one day,
+so even averages and distinct counts stay exact.
+"""
+
+import functools
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from dateutil.parser import isoparse
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.helpers.olap import ColumnInfo
+from iikoserver_client.helpers.olap_planner import (
+    MAX_OLAP_FIELDS, join_olap_responses, olap_request_fields, plan_olap_request
+)
+from iikoserver_client.models.olap_filter import OlapFilter
+from iikoserver_client.models.olap_filter_type_enum import OlapFilterTypeEnum
+from iikoserver_client.models.olap_period_type_enum import OlapPeriodTypeEnum
+from iikoserver_client.models.olap_v2_request import OlapV2Request
+
+_SHARD_SUFFIX = ".cols.gz"
+
+
+def _normalize_filter(olap_filter: OlapFilter) -> Dict[str, Any]:
+    data = {
+        name: value for name, value in olap_filter.to_dict().items() if value is not None
+    }
+    if "values" in data:
+        data["values"] = sorted(data["values"], key=lambda value: json.dumps(value, default=str))
+    return data
+
+
+def olap_request_key(request: OlapV2Request, date_field: Optional[str] = None) -> str:
+    """Canonical hash of the data a request selects.
+
+    Field order, the summary flag and the order of filter values do not
+    change the key. The filter on `date_field` is left out, since it is the
+    dimension the cache is sharded by.
+    """
+    canonical = {
+        "reportType": request.report_type,
+        "groupByRowFields": sorted(request.group_by_row_fields),
+        "groupByColFields": sorted(request.group_by_col_fields or []),
+        "aggregateFields": sorted(request.aggregate_fields),
+        "filters": {
+            name: _normalize_filter(olap_filter)
+            for name, olap_filter in sorted((request.filters or {}).items())
+            if name != date_field
+        },
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_midnight(value: Union[date, datetime]) -> bool:
+    return not isinstance(value, datetime) or value.time() == datetime.min.time()
+
+
+def _as_datetime(value: Any) -> Union[date, datetime]:
+    if isinstance(value, (date, datetime)):
+        return value
+    return isoparse(str(value))
+
+
+def olap_request_days(request: OlapV2Request, date_field: str) -> List[date]:
+    """Days covered by the custom `DateRange` filter on `date_field`.
+
+    :raises ApiValueError: when the filter is missing or not an explicit
+        (custom) date range.
+    """
+    olap_filter = (request.filters or {}).get(date_field)
+    if olap_filter is None or olap_filter.filter_type != OlapFilterTypeEnum.DATERANGE:
+        raise ApiValueError("Request has no DateRange filter on '{0}'".format(date_field))
+    if olap_filter.period_type not in (None, OlapPeriodTypeEnum.CUSTOM):
+        raise ApiValueError("Only CUSTOM date ranges can be cached by day")
+    if olap_filter.var_from is None or olap_filter.to is None:
+        raise ApiValueError("DateRange filter on '{0}' needs both bounds".format(date_field))
+
+    low = _as_datetime(olap_filter.var_from)
+    high = _as_datetime(olap_filter.to)
+    start = low.date() if isinstance(low, datetime) else low
+    if olap_filter.include_low is False and _is_midnight(low):
+        start += timedelta(days=1)
+    end = high.date() if isinstance(high, datetime) else high
+    if olap_filter.include_high or not _is_midnight(high):
+        end += timedelta(days=1)
+    return [start + timedelta(days=offset) for offset in range((end - start).days)]
+
+
+def olap_request_for_day(request: OlapV2Request, date_field: str, day: date) -> OlapV2Request:
+    """Copy of `request` limited to one day."""
+    filters = dict(request.filters or {})
+    filters[date_field] = OlapFilter.model_validate({
+        "filterType": OlapFilterTypeEnum.DATERANGE.value,
+        "periodType": OlapPeriodTypeEnum.CUSTOM,
+        "from": day.isoformat(),
+        "to": (day + timedelta(days=1)).isoformat(),
+        "includeLow": True,
+        "includeHigh": False,
+    })
+    return request.model_copy(update={"filters": filters})
+
+
+class OlapCache:
+    """Day-sharded OLAP v2 results on disk.
+
+    Shards live in ``<path>/<request key>/<YYYY-MM-DD>.cols.gz``. A day is
+    closed, and therefore cached, when it is older than `recent_days` days
+    (today is day 0) or, per call, before an explicit `closed_before` date.
+
+    :param path: cache directory.
+    :param recent_days: number of latest days that are always re-queried.
+    """
+
+    def __init__(self, path: Union[str, Path], recent_days: int = 2) -> None:
+        self.path = Path(path)
+        self.recent_days = recent_days
+        self.hits = 0
+        self.misses = 0
+
+    def closed_before(self, today: Optional[date] = None) -> date:
+        """First day that is still considered open."""
+        return (today or date.today()) - timedelta(days=self.recent_days - 1)
+
+    def shard_path(self, key: str, day: date) -> Path:
+        return self.path / key / (day.isoformat() + _SHARD_SUFFIX)
+
+    def load_shard(self, key: str, day: date) -> Optional[ColumnTable]:
+        path = self.shard_path(key, day)
+        if not path.exists():
+            return None
+        return ColumnTable.read(path)
+
+    def store_shard(self, key: str, day: date, table: ColumnTable) -> None:
+        path = self.shard_path(key, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write aside and rename, so a crash never leaves a partial shard
+        temporary = path.with_name(path.name + ".tmp")
+        table.write(temporary)
+        os.replace(temporary, path)
+
+    def invalidate(
+        self, request: OlapV2Request, date_field: str, days: Optional[Sequence[date]] = None
+    ) -> int:
+        """Drop the cached shards of a request, all or only `days`.
+
+        :return: number of removed shards.
+        """
+        directory = self.path / olap_request_key(request, date_field)
+        if not directory.exists():
+            return 0
+        if days is None:
+            paths = list(directory.glob("*" + _SHARD_SUFFIX))
+        else:
+            paths = [self.shard_path(directory.name, day) for day in days]
+        removed = 0
+        for path in paths:
+            if path.exists():
+                path.unlink()
+                removed += 1
+        return removed
+
+    async def fetch(
+        self,
+        api,
+        request: OlapV2Request,
+        date_field: str,
+        column_info: Optional[ColumnInfo] = None,
+        closed_before: Optional[date] = None,
+        max_fields: int = MAX_OLAP_FIELDS,
+        attribute_fields: Sequence[str] = (),
+        limit: Optional[int] = None,
+    ) -> ColumnTable:
+        """Run `request` day by day, reading closed days from the cache.
+
+        Missing and open days are planned like `fetch_olap_wide()` and all
+        their parts run concurrently; closed days are stored afterwards.
+
+        :param api: `ReportsV2Api` instance.
+        :param date_field: field of the `DateRange` filter to shard by,
+            e.g. ``OpenDate.Typed`` for sales.
+        :param closed_before: first open day, `closed_before()` by default.
+        :return: rows of all days in day order, columns in request order.
+        :raises ApiValueError: when `date_field` is not a row grouping field
+            of the request; per-day rows could not be merged into the
+            totals such a request asks for.
+        """
+        if date_field not in request.group_by_row_fields:
+            raise ApiValueError(
+                "Only requests grouped by '{0}' can be cached by day".format(date_field)
+            )
+        days = olap_request_days(request, date_field)
+        key = olap_request_key(request, date_field)
+        closed_before = closed_before or self.closed_before()
+
+        shards: Dict[date, ColumnTable] = {}
+        for day in days:
+            if day < closed_before:
+                table = self.load_shard(key, day)
+                if table is not None:
+                    shards[day] = table
+        missing = [day for day in days if day not in shards]
+        self.hits += len(shards)
+        self.misses += len(missing)
+
+        if missing:
+            if column_info is None:
+                column_info = await api.v2_reports_olap_columns_get(
+                    report_type=request.report_type
+                )
+            plans = [
+                plan_olap_request(
+                    olap_request_for_day(request, date_field, day),
+                    column_info, max_fields, attribute_fields,
+                )
+                for day in missing
+            ]
+            jobs: List[Tuple[int, OlapV2Request]] = [
+                (index, part) for index, plan in enumerate(plans) for part in plan.parts
+            ]
+            responses = await gather_limited(
+                [functools.partial(api.v2_reports_olap_post, olap_v2_request=part)
+                 for _, part in jobs],
+                concurrency_limit(api.api_client, limit),
+            )
+            for index, (day, plan) in enumerate(zip(missing, plans)):
+                table = join_olap_responses(
+                    plan,
+                    [response for (job, _), response in zip(jobs, responses) if job == index],
+                    column_info,
+                )
+                if day < closed_before:
+                    self.store_shard(key, day, table)
+                shards[day] = table
+
+        columns = olap_request_fields(request)
+        return ColumnTable.concat(shards[day].select(columns) for day in days)
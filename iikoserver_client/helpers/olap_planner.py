@@ -0,0 +1,186 @@
+"""Splitting wide OLAP v2 requests into narrow ones joined locally.
+
+iikoServer recommends at most 7 fields per OLAP v2 report. A wider report
+is planned as several requests that all group by the same key fields and
+each carry a share of the remaining fields; their rows are joined back on
+the key values.
+"""
+
+import functools
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.helpers.olap import ColumnInfo, TableBuilder
+from iikoserver_client.models.olap_v2_request import OlapV2Request
+from iikoserver_client.models.olap_v2_response import OlapV2Response
+
+MAX_OLAP_FIELDS = 7
+"""Field count per OLAP v2 report recommended by iikoServer"""
+
+
+def olap_request_fields(request: OlapV2Request) -> List[str]:
+    """All fields a request groups or aggregates by."""
+    return (
+        list(request.group_by_row_fields)
+        + list(request.group_by_col_fields or [])
+        + list(request.aggregate_fields)
+    )
+
+
+def validate_olap_request(request: OlapV2Request, column_info: ColumnInfo) -> None:
+    """Check every field of a request against the report column metadata.
+
+    :raises ApiValueError: listing every unknown field and every field used
+        for an operation it does not allow.
+    """
+    problems = []
+    checks = (
+        ("grouping", "grouping_allowed", request.group_by_row_fields),
+        ("grouping", "grouping_allowed", request.group_by_col_fields or []),
+        ("aggregation", "aggregation_allowed", request.aggregate_fields),
+        ("filtering", "filtering_allowed", list(request.filters or {})),
+    )
+    for operation, flag, fields in checks:
+        for field in fields:
+            info = column_info.get(field)
+            if info is None:
+                problems.append("unknown field '{0}'".format(field))
+            elif not getattr(info, flag):
+                problems.append("'{0}' does not allow {1}".format(field, operation))
+    if problems:
+        raise ApiValueError(
+            "Invalid OLAP request: {0}".format("; ".join(dict.fromkeys(problems)))
+        )
+
+
+class OlapPlan:
+    """Requests that together answer one wide OLAP request.
+
+    :param keys: fields every part groups by and the join is made on.
+    :param parts: narrow requests, each with the keys and a share of the
+        attribute and aggregate fields.
+    :param columns: result column order.
+    """
+
+    def __init__(self, keys: List[str], parts: List[OlapV2Request], columns: List[str]) -> None:
+        self.keys = keys
+        self.parts = parts
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.parts)
+
+    def __repr__(self) -> str:
+        return "OlapPlan(keys={0}, parts={1})".format(
+            self.keys, [olap_request_fields(part) for part in self.parts]
+        )
+
+
+def _split_evenly(fields: Sequence[str], parts: int) -> List[List[str]]:
+    size, extra = divmod(len(fields), parts)
+    chunks = []
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        chunks.append(list(fields[start:end]))
+        start = end
+    return chunks
+
+
+def plan_olap_request(
+    request: OlapV2Request,
+    column_info: Optional[ColumnInfo] = None,
+    max_fields: int = MAX_OLAP_FIELDS,
+    attribute_fields: Sequence[str] = (),
+) -> OlapPlan:
+    """Split `request` into parts of at most `max_fields` fields.
+
+    :param column_info: column metadata to validate the request with.
+    :param attribute_fields: row grouping fields that depend on the other
+        grouping fields (e.g. a dish name next to the dish id). They do not
+        change the row granularity, so they may go to different parts. All
+        other row and column grouping fields are join keys.
+    :raises ApiValueError: when the request is invalid or the keys alone
+        leave no room for other fields in a part.
+    """
+    if column_info is not None:
+        validate_olap_request(request, column_info)
+
+    attributes = [f for f in request.group_by_row_fields if f in attribute_fields]
+    keys = [f for f in request.group_by_row_fields if f not in attribute_fields]
+    col_fields = list(request.group_by_col_fields or [])
+    columns = list(request.group_by_row_fields) + col_fields + list(request.aggregate_fields)
+
+    if len(olap_request_fields(request)) <= max_fields:
+        return OlapPlan(keys + col_fields, [request], columns)
+
+    capacity = max_fields - len(keys) - len(col_fields)
+    if capacity < 1:
+        raise ApiValueError(
+            "Cannot split OLAP request: {0} key fields leave no room within {1} fields".format(
+                len(keys) + len(col_fields), max_fields
+            )
+        )
+    payload = attributes + list(request.aggregate_fields)
+    count = math.ceil(len(payload) / capacity)
+    parts = []
+    for chunk in _split_evenly(payload, count):
+        parts.append(request.model_copy(update={
+            "build_summary": False,
+            "group_by_row_fields": keys + [f for f in chunk if f in attributes],
+            "aggregate_fields": [f for f in chunk if f not in attributes],
+        }))
+    return OlapPlan(keys + col_fields, parts, columns)
+
+
+def join_olap_responses(
+    plan: OlapPlan,
+    responses: Sequence[OlapV2Response],
+    column_info: Optional[ColumnInfo] = None,
+) -> ColumnTable:
+    """Full outer join of the part responses on the plan keys."""
+    rows: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for response in responses:
+        for record in response.data:
+            key = tuple(record.get(field) for field in plan.keys)
+            row = rows.get(key)
+            if row is None:
+                rows[key] = dict(record)
+            else:
+                row.update(record)
+    builder = TableBuilder(column_info)
+    builder.add_columns(plan.columns)
+    for row in rows.values():
+        builder.append(row)
+    return builder.build()
+
+
+async def fetch_olap_wide(
+    api,
+    request: OlapV2Request,
+    column_info: Optional[ColumnInfo] = None,
+    max_fields: int = MAX_OLAP_FIELDS,
+    attribute_fields: Sequence[str] = (),
+    limit: Optional[int] = None,
+) -> ColumnTable:
+    """Plan, run and join a possibly wide OLAP v2 request.
+
+    :param api: `ReportsV2Api` instance.
+    :param column_info: column metadata; loaded with
+        `v2_reports_olap_columns_get` when omitted.
+    :param limit: parallel part requests, the client policy by default.
+    """
+    if column_info is None:
+        column_info = await api.v2_reports_olap_columns_get(report_type=request.report_type)
+    plan = plan_olap_request(request, column_info, max_fields, attribute_fields)
+    responses = await gather_limited(
+        [
+            functools.partial(api.v2_reports_olap_post, olap_v2_request=part)
+            for part in plan.parts
+        ],
+        concurrency_limit(api.api_client, limit),
+    )
+    return join_olap_responses(plan, responses, column_info)
@@ -0,0 +1,209 @@
+"""Local catalog of OLAP v2 presets that runs them as explicit requests."""
+
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.olap import ColumnInfo, olap_v2_table
+from iikoserver_client.helpers.olap_cache import OlapCache
+from iikoserver_client.helpers.olap_planner import (
+    MAX_OLAP_FIELDS, fetch_olap_wide, olap_request_fields
+)
+from iikoserver_client.models.olap_filter import OlapFilter
+from iikoserver_client.models.olap_filter_type_enum import OlapFilterTypeEnum
+from iikoserver_client.models.olap_period_type_enum import OlapPeriodTypeEnum
+from iikoserver_client.models.olap_preset import OlapPreset
+from iikoserver_client.models.olap_preset_type_enum import OlapPresetTypeEnum
+from iikoserver_client.models.olap_v2_report_type_enum import OlapV2ReportTypeEnum
+from iikoserver_client.models.olap_v2_request import OlapV2Request
+
+DEFAULT_DATE_FIELDS: Dict[str, str] = {
+    OlapV2ReportTypeEnum.SALES: "OpenDate.Typed",
+    OlapV2ReportTypeEnum.TRANSACTIONS: "DateTime.DateTyped",
+    OlapV2ReportTypeEnum.DELIVERIES: "OpenDate.Typed",
+}
+"""Day field of each report type used to bind a preset to a period"""
+
+
+def preset_request(
+    preset: OlapPreset,
+    date_from: Optional[Union[date, datetime]] = None,
+    date_to: Optional[Union[date, datetime]] = None,
+    date_field: Optional[str] = None,
+    build_summary: bool = False,
+) -> OlapV2Request:
+    """Translate a preset to an explicit `OlapV2Request`.
+
+    With a period, the filter on `date_field` (the report type default
+    from `DEFAULT_DATE_FIELDS` if omitted) is replaced by a custom
+    `DateRange` from `date_from` (included) to `date_to` (excluded), the
+    same bounds `v2_reports_olap_by_preset_id_preset_id_get` uses.
+    """
+    filters = dict(preset.filters or {})
+    if date_from is not None or date_to is not None:
+        if date_from is None or date_to is None:
+            raise ApiValueError("Both date_from and date_to are required")
+        date_field = date_field or DEFAULT_DATE_FIELDS.get(preset.report_type)
+        if date_field is None:
+            raise ApiValueError(
+                "No date field known for report type {0}".format(preset.report_type)
+            )
+        filters[date_field] = OlapFilter.model_validate({
+            "filterType": OlapFilterTypeEnum.DATERANGE.value,
+            "periodType": OlapPeriodTypeEnum.CUSTOM,
+            "from": date_from.isoformat(),
+            "to": date_to.isoformat(),
+            "includeLow": True,
+            "includeHigh": False,
+        })
+    return OlapV2Request(
+        reportType=preset.report_type,
+        buildSummary=build_summary,
+        groupByRowFields=list(preset.group_by_row_fields),
+        groupByColFields=list(preset.group_by_col_fields) if preset.group_by_col_fields else None,
+        aggregateFields=list(preset.aggregate_fields),
+        filters=filters or None,
+    )
+
+
+class OlapPresetCatalog:
+    """Cached OLAP v2 preset definitions addressable by id or name.
+
+    The preset list is loaded once and reloaded by `refresh()` when it is
+    older than `ttl` seconds, so looking a preset up by name no longer
+    costs a request.
+
+    :param ttl: maximum age in seconds before `refresh()` reloads the list,
+        None keeps it until `load()` is called again.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600) -> None:
+        self.ttl = ttl
+        self.loaded_at: Optional[float] = None
+        self.presets: Dict[str, OlapPreset] = {}
+        self.by_name: Dict[str, List[OlapPreset]] = defaultdict(list)
+
+    @classmethod
+    async def create(cls, api, ttl: Optional[float] = 3600) -> "OlapPresetCatalog":
+        """Load a catalog through `ReportsV2Api`."""
+        catalog = cls(ttl)
+        await catalog.load(api)
+        return catalog
+
+    @property
+    def expired(self) -> bool:
+        if self.loaded_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self.loaded_at >= self.ttl
+
+    async def refresh(self, api) -> bool:
+        """Reload the presets if the list expired.
+
+        :return: True when the list was reloaded.
+        """
+        if not self.expired:
+            return False
+        await self.load(api)
+        return True
+
+    async def load(self, api, preset_type: Optional[OlapPresetTypeEnum] = None) -> None:
+        """Unconditionally reload the presets, all or of one type only."""
+        if preset_type is None:
+            presets = await api.v2_reports_olap_presets_get()
+        else:
+            presets = await api.v2_reports_olap_presets_preset_type_get(preset_type=preset_type)
+        self.build(presets)
+
+    def build(self, presets: Sequence[OlapPreset]) -> None:
+        """Replace the catalog with the given presets."""
+        by_name: Dict[str, List[OlapPreset]] = defaultdict(list)
+        for preset in presets:
+            by_name[preset.name.casefold()].append(preset)
+        self.presets = {preset.id: preset for preset in presets}
+        self.by_name = by_name
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.presets)
+
+    def __iter__(self):
+        return iter(self.presets.values())
+
+    def get(self, preset_id: str) -> Optional[OlapPreset]:
+        return self.presets.get(preset_id)
+
+    def resolve(
+        self, name_or_id: str, report_type: Optional[OlapV2ReportTypeEnum] = None
+    ) -> OlapPreset:
+        """Find a preset by id or case-insensitive name.
+
+        :raises ApiValueError: when no preset or more than one matches.
+        """
+        preset = self.presets.get(name_or_id)
+        if preset is not None:
+            return preset
+        matches = [
+            preset for preset in self.by_name.get(name_or_id.casefold(), [])
+            if report_type is None or preset.report_type == report_type
+        ]
+        if not matches:
+            raise ApiValueError("Unknown OLAP preset '{0}'".format(name_or_id))
+        if len(matches) > 1:
+            raise ApiValueError("OLAP preset name '{0}' is ambiguous: {1}".format(
+                name_or_id, ", ".join(preset.id for preset in matches)
+            ))
+        return matches[0]
+
+    async def run(
+        self,
+        api,
+        name_or_id: str,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        date_field: Optional[str] = None,
+        cache: Optional[OlapCache] = None,
+        column_info: Optional[ColumnInfo] = None,
+        max_fields: int = MAX_OLAP_FIELDS,
+        limit: Optional[int] = None,
+        report_type: Optional[OlapV2ReportTypeEnum] = None,
+    ) -> ColumnTable:
+        """Run a preset as an explicit request.
+
+        With a period the preset is translated by `preset_request()` and
+        planned by `fetch_olap_wide()`. It goes through `cache` instead
+        when given and the preset groups rows by the date field, the only
+        case `OlapCache` can split by day. Without a period the server runs
+        the preset with its own relative dates.
+
+        :param api: `ReportsV2Api` instance.
+        :param date_to: end of the period, excluded.
+        :param report_type: narrows a lookup by name, see `resolve()`.
+        """
+        await self.refresh(api)
+        preset = self.resolve(name_or_id, report_type)
+        if date_from is None and date_to is None:
+            if column_info is None:
+                column_info = await api.v2_reports_olap_columns_get(
+                    report_type=preset.report_type
+                )
+            response = await api.v2_reports_olap_by_preset_id_preset_id_get(
+                preset_id=preset.id, summary=False
+            )
+            return olap_v2_table(
+                response, column_info, olap_request_fields(preset_request(preset))
+            )
+
+        date_field = date_field or DEFAULT_DATE_FIELDS.get(preset.report_type)
+        request = preset_request(preset, date_from, date_to, date_field)
+        if (
+            cache is not None
+            and date_field is not None
+            and date_field in request.group_by_row_fields
+        ):
+            return await cache.fetch(
+                api, request, date_field, column_info, max_fields=max_fields, limit=limit
+            )
+        return await fetch_olap_wide(api, request, column_info, max_fields, limit=limit)
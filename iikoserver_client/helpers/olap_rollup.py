@@ -0,0 +1,259 @@
+"""Local re-aggregation of columnar OLAP results.
+
+Tables produced by `olap_v2_table`, `fetch_olap_wide` or `OlapCache` can
+be filtered with the semantics of `OlapFilter` and grouped again by any
+subset of their grouping fields, so week or month totals, per-group sums
+and report summaries do not need another server round-trip.
+"""
+
+import math
+from array import array
+from datetime import date, datetime, timedelta
+from typing import (
+    Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+)
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import Column, ColumnTable
+from iikoserver_client.helpers.conversions import to_date, to_datetime
+from iikoserver_client.models.olap_filter import OlapFilter
+from iikoserver_client.models.olap_filter_type_enum import OlapFilterTypeEnum
+from iikoserver_client.models.olap_v2_request import OlapV2Request
+
+AGGREGATIONS = ("sum", "count", "min", "max")
+
+Aggregates = Mapping[str, Union[str, Sequence[str]]]
+"""Column name -> aggregation or list of aggregations"""
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _coercer(column: Column) -> Callable[[Any], Any]:
+    """Converter of filter values to the type stored in `column`."""
+    if isinstance(column, array):
+        return float
+    for value in column:
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            return to_datetime
+        if isinstance(value, date):
+            return to_date
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float
+        break
+    return lambda value: value
+
+
+def _filter_mask(column: Column, olap_filter: OlapFilter) -> List[bool]:
+    coerce = _coercer(column)
+    filter_type = olap_filter.filter_type
+    if filter_type in (OlapFilterTypeEnum.INCLUDEVALUES, OlapFilterTypeEnum.EXCLUDEVALUES):
+        values = {
+            None if value is None else coerce(value) for value in olap_filter.values or []
+        }
+        include = filter_type == OlapFilterTypeEnum.INCLUDEVALUES
+        return [
+            ((None if _is_missing(value) else value) in values) == include
+            for value in column
+        ]
+    if filter_type in (OlapFilterTypeEnum.RANGE, OlapFilterTypeEnum.DATERANGE):
+        low = None if olap_filter.var_from is None else coerce(olap_filter.var_from)
+        high = None if olap_filter.to is None else coerce(olap_filter.to)
+        include_low = olap_filter.include_low is not False
+        include_high = bool(olap_filter.include_high)
+        mask = []
+        for value in column:
+            if _is_missing(value):
+                mask.append(False)
+                continue
+            mask.append(
+                (low is None or value > low or include_low and value == low)
+                and (high is None or value < high or include_high and value == high)
+            )
+        return mask
+    raise ApiValueError("Unsupported OLAP filter type '{0}'".format(filter_type))
+
+
+def filter_table(table: ColumnTable, filters: Mapping[str, OlapFilter]) -> ColumnTable:
+    """Rows of `table` that pass every filter.
+
+    Only explicit ranges are supported for `DateRange`; relative
+    `periodType` values are resolved by the server and are rejected here.
+    """
+    if not filters:
+        return table
+    keep = [True] * table.num_rows
+    for name, olap_filter in filters.items():
+        if name not in table:
+            raise ApiValueError("Cannot filter by '{0}': no such column".format(name))
+        if olap_filter.period_type not in (None, "CUSTOM"):
+            raise ApiValueError(
+                "Cannot filter '{0}' by period {1} locally".format(name, olap_filter.period_type)
+            )
+        for index, passed in enumerate(_filter_mask(table[name], olap_filter)):
+            if not passed:
+                keep[index] = False
+    return table.take([index for index, passed in enumerate(keep) if passed])
+
+
+def _aggregate(
+    column: Column, groups: "array[int]", group_count: int, function: str
+) -> Column:
+    if function == "count":
+        counts = array("q", [0] * group_count)
+        for group, value in zip(groups, column):
+            if not _is_missing(value):
+                counts[group] += 1
+        return counts
+
+    numeric = isinstance(column, array) or function == "sum"
+    results: List[Any] = [None] * group_count
+    for group, value in zip(groups, column):
+        if _is_missing(value):
+            continue
+        current = results[group]
+        if current is None:
+            results[group] = value
+        elif function == "sum":
+            results[group] = current + value
+        elif function == "min":
+            if value < current:
+                results[group] = value
+        elif value > current:
+            results[group] = value
+    if numeric:
+        return array("d", [math.nan if value is None else value for value in results])
+    return results
+
+
+def _functions(aggregates: Aggregates) -> List[Tuple[str, str, str]]:
+    """(output name, column, function) for every requested aggregation."""
+    result = []
+    for column, functions in aggregates.items():
+        if isinstance(functions, str):
+            result.append((column, column, functions))
+            continue
+        for function in functions:
+            result.append(("{0}.{1}".format(column, function), column, function))
+    for _, _, function in result:
+        if function not in AGGREGATIONS:
+            raise ApiValueError("Unsupported aggregation '{0}'".format(function))
+    return result
+
+
+def rollup(
+    table: ColumnTable,
+    group_by: Sequence[str],
+    aggregates: Aggregates,
+    filters: Optional[Mapping[str, OlapFilter]] = None,
+) -> ColumnTable:
+    """Group `table` by `group_by` and aggregate the other columns.
+
+    :param group_by: grouping columns; an empty sequence gives one total row.
+    :param aggregates: column -> ``sum``, ``count``, ``min`` or ``max``, or
+        a list of them; with a list the results are named ``<column>.<fn>``.
+    :param filters: `OlapFilter` by column applied before grouping.
+    :return: one row per group in order of first appearance. Missing keys
+        (None or NaN) form a single group, keyed by NaN in numeric columns
+        and by None otherwise. Sums, minima
+        and maxima of numeric columns are floats, NaN when a group has no
+        values.
+    """
+    functions = _functions(aggregates)
+    for name in list(group_by) + [column for _, column, _ in functions]:
+        if name not in table:
+            raise ApiValueError("No such column '{0}'".format(name))
+    table = filter_table(table, filters or {})
+
+    index: Dict[Tuple[Any, ...], int] = {}
+    groups = array("q")
+    keys = zip(*(table[name] for name in group_by)) if group_by else ((),) * table.num_rows
+    for key in keys:
+        key = tuple(None if _is_missing(value) else value for value in key)
+        group = index.get(key)
+        if group is None:
+            group = index[key] = len(index)
+        groups.append(group)
+    if not group_by:
+        index.setdefault((), 0)
+
+    columns: Dict[str, Iterable[Any]] = {}
+    for position, name in enumerate(group_by):
+        source = table[name]
+        values = [key[position] for key in index]
+        if isinstance(source, array):
+            columns[name] = array(
+                source.typecode, [math.nan if value is None else value for value in values]
+            )
+        else:
+            columns[name] = values
+    for output, column, function in functions:
+        columns[output] = _aggregate(table[column], groups, len(index), function)
+    return ColumnTable(columns)
+
+
+def rollup_levels(
+    table: ColumnTable,
+    group_by: Sequence[str],
+    aggregates: Aggregates,
+    filters: Optional[Mapping[str, OlapFilter]] = None,
+) -> Dict[Tuple[str, ...], ColumnTable]:
+    """Subtotals for every prefix of `group_by`, down to the grand total.
+
+    This is what a report built with ``build_summary=true`` returns in its
+    summary, computed from the detailed rows instead.
+    """
+    table = filter_table(table, filters or {})
+    return {
+        tuple(group_by[:size]): rollup(table, group_by[:size], aggregates)
+        for size in range(len(group_by), -1, -1)
+    }
+
+
+def rollup_request(
+    table: ColumnTable, request: OlapV2Request, function: str = "sum"
+) -> ColumnTable:
+    """Answer `request` from a more detailed table.
+
+    The table must contain the row grouping, aggregate and filter fields
+    of the request; aggregate fields are combined with `function`.
+    """
+    return rollup(
+        table,
+        request.group_by_row_fields + list(request.group_by_col_fields or []),
+        {name: function for name in request.aggregate_fields},
+        request.filters,
+    )
+
+
+_PERIODS: Dict[str, Callable[[date], date]] = {
+    "day": lambda day: day,
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+    "quarter": lambda day: day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1),
+    "year": lambda day: day.replace(month=1, day=1),
+}
+
+
+def with_period(
+    table: ColumnTable, column: str, period: str, name: Optional[str] = None
+) -> ColumnTable:
+    """Add a column with the first day of the `period` each date falls in.
+
+    :param period: ``day``, ``week`` (starting on Monday), ``month``,
+        ``quarter`` or ``year``.
+    :param name: new column name, ``<column>.<period>`` by default.
+    """
+    start_of = _PERIODS.get(period)
+    if start_of is None:
+        raise ApiValueError("Unsupported period '{0}'".format(period))
+    values = []
+    for value in table[column]:
+        value = to_date(value)
+        values.append(None if value is None else start_of(value))
+    columns = dict(table.columns)
+    columns[name or "{0}.{1}".format(column, period)] = values
+    return ColumnTable(columns)
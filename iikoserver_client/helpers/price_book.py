@@ -0,0 +1,180 @@
+"""In-memory price book built from menu change orders (`v2_price_get`)."""
+
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from iikoserver_client.exceptions import ApiException
+from iikoserver_client.models.price_type_enum import PriceTypeEnum
+from iikoserver_client.models.product_price_dto import ProductPriceDto
+from iikoserver_client.models.product_price_item_dto import ProductPriceItemDto
+from iikoserver_client.models.product_price_list_response_dto import ProductPriceListResponseDto
+from iikoserver_client.models.request_result_dto_enum import RequestResultDtoEnum
+
+PriceKey = Tuple[Optional[str], Optional[str], Optional[str]]
+"""(department_id, product_id, product_size_id)"""
+
+_OPEN_END = date.max.toordinal()
+
+
+class PriceIntervals:
+    """Date intervals of one product price, sorted by start.
+
+    Lookups bisect the starts and walk back only while the running maximum
+    of interval ends still covers the requested day, so overlapping orders
+    are resolved to the most recently started one in O(log n) for the usual
+    non-overlapping case.
+    """
+
+    __slots__ = ("starts", "ends", "max_ends", "items")
+
+    def __init__(self, items: List[ProductPriceItemDto]) -> None:
+        items = sorted(
+            items,
+            key=lambda item: (item.date_from or date.min).toordinal()
+        )
+        self.items = items
+        self.starts = [(item.date_from or date.min).toordinal() for item in items]
+        self.ends = [
+            item.date_to.toordinal() if item.date_to else _OPEN_END
+            for item in items
+        ]
+        self.max_ends = []
+        running = 0
+        for end in self.ends:
+            running = max(running, end)
+            self.max_ends.append(running)
+
+    def at(self, day: int) -> Optional[ProductPriceItemDto]:
+        """Return the item in effect on the `day` ordinal, if any."""
+        index = bisect_right(self.starts, day) - 1
+        while index >= 0 and self.max_ends[index] >= day:
+            if self.ends[index] >= day:
+                return self.items[index]
+            index -= 1
+        return None
+
+
+class PriceBook:
+    """Point-in-time product prices per department.
+
+    The book is loaded once with `load()` and kept current with `refresh()`,
+    which requests only entities changed after the last seen revision. A
+    changed product replaces all of its intervals.
+
+    Prices are resolved by day; intra-day order schedules are not applied.
+    """
+
+    def __init__(self) -> None:
+        self.revision: Optional[int] = None
+        self.date_from: Optional[date] = None
+        self.date_to: Optional[date] = None
+        self.department_id: Optional[List[str]] = None
+        self.type: Optional[PriceTypeEnum] = None
+        self._intervals: Dict[PriceKey, PriceIntervals] = {}
+
+    @classmethod
+    async def load(
+        cls,
+        api,
+        date_from: date,
+        date_to: Optional[date] = None,
+        department_id: Optional[List[str]] = None,
+        type: Optional[PriceTypeEnum] = None,
+    ) -> "PriceBook":
+        """Build a price book through `MenuChangeManagementApi.v2_price_get`."""
+        book = cls()
+        book.date_from = date_from
+        book.date_to = date_to
+        book.department_id = department_id
+        book.type = type
+        await book.refresh(api)
+        return book
+
+    async def refresh(self, api) -> int:
+        """Apply price changes made since the last loaded revision.
+
+        :return: number of updated (department, product, size) keys.
+        """
+        if self.date_from is None:
+            raise ValueError("PriceBook.refresh() requires a book created by load()")
+        response = await api.v2_price_get(
+            date_from=self.date_from,
+            date_to=self.date_to,
+            department_id=self.department_id,
+            include_out_of_sale=True,
+            type=self.type,
+            revision_from=self.revision,
+        )
+        return self.apply(response)
+
+    def apply(self, response: ProductPriceListResponseDto) -> int:
+        """Merge a `v2_price_get` response into the book."""
+        if response.result == RequestResultDtoEnum.ERROR:
+            raise ApiException(
+                status=0,
+                reason="Failed to load prices: {0}".format(
+                    "; ".join(
+                        "{0}: {1}".format(error.code, error.value)
+                        for error in response.errors or []
+                    )
+                )
+            )
+        for price in response.response or []:
+            self.put(price)
+        if response.revision is not None:
+            self.revision = response.revision
+        return len(response.response or [])
+
+    def put(self, price: ProductPriceDto) -> None:
+        """Replace the intervals of a single product price."""
+        key = (price.department_id, price.product_id, price.product_size_id)
+        if price.prices:
+            self._intervals[key] = PriceIntervals(price.prices)
+        else:
+            self._intervals.pop(key, None)
+
+    def item_at(
+        self,
+        department_id: str,
+        product_id: str,
+        at: Union[date, datetime],
+        product_size_id: Optional[str] = None,
+    ) -> Optional[ProductPriceItemDto]:
+        """Return the price order item in effect at `at`, if any."""
+        intervals = self._intervals.get((department_id, product_id, product_size_id))
+        if intervals is None:
+            return None
+        return intervals.at(at.toordinal())
+
+    def price_at(
+        self,
+        department_id: str,
+        product_id: str,
+        at: Union[date, datetime],
+        product_size_id: Optional[str] = None,
+        category_id: Optional[str] = None,
+    ) -> Optional[float]:
+        """Return the price of a product at `at`.
+
+        :param category_id: price category; its own price is used when the
+            order defines one, the base price otherwise.
+        :return: the price, or None when the product is not on sale.
+        """
+        item = self.item_at(department_id, product_id, at, product_size_id)
+        if item is None or item.included is False:
+            return None
+        if category_id is not None:
+            for category_price in item.prices_for_categories or []:
+                if category_price.category_id == category_id:
+                    return category_price.price
+        return item.price
+
+    def keys(self) -> Iterator[PriceKey]:
+        return iter(self._intervals)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, key: PriceKey) -> bool:
+        return key in self._intervals
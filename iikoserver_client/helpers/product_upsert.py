@@ -0,0 +1,254 @@
+"""Bulk product upsert that only writes what differs from the catalog.
+
+`ProductCatalog` indexes the live products by id and article (``num``).
+`plan_product_upsert` matches every desired product against it: unknown
+products are created with `v2_entities_products_save_post`, known ones
+are updated with `v2_entities_products_update_post` only when a field the
+caller set differs from the catalog, and the rest are left out.
+`ProductUpserter` runs the plan under the client concurrency limit,
+keeps the catalog current and collects the errors of all calls.
+"""
+
+import functools
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited, retry_call
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.product_dto import ProductDto
+from iikoserver_client.models.product_save_dto import ProductSaveDto
+from iikoserver_client.models.product_unit_operation_response_scheme import (
+    ProductUnitOperationResponseScheme
+)
+from iikoserver_client.models.product_update_dto import ProductUpdateDto
+from iikoserver_client.models.request_result_dto_enum import RequestResultDtoEnum
+
+DesiredProduct = Union[ProductSaveDto, ProductUpdateDto]
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_dump(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return value
+
+
+def product_key(product: Any) -> str:
+    """Reporting key of a product: its id, article or name."""
+    return getattr(product, "id", None) or product.num or product.name
+
+
+class ProductCatalog:
+    """Products indexed by id and by article; deleted ones are only
+    matched by id."""
+
+    def __init__(self, products: Iterable[ProductDto] = ()) -> None:
+        self.by_id: Dict[str, ProductDto] = {}
+        self.by_num: Dict[str, ProductDto] = {}
+        for product in products:
+            self.put(product)
+
+    @classmethod
+    async def load(cls, api, include_deleted: bool = False) -> "ProductCatalog":
+        """Load every product through `NomenclatureManagementApi`."""
+        return cls(await api.v2_entities_products_list_get(include_deleted=include_deleted) or [])
+
+    def put(self, product: ProductDto) -> None:
+        previous = self.by_id.get(product.id)
+        if previous is not None and previous.num and self.by_num.get(previous.num) is previous:
+            del self.by_num[previous.num]
+        self.by_id[product.id] = product
+        if product.num and not product.deleted:
+            self.by_num[product.num] = product
+
+    def match(self, desired: DesiredProduct) -> Optional[ProductDto]:
+        product_id = getattr(desired, "id", None)
+        if product_id:
+            return self.by_id.get(product_id)
+        return self.by_num.get(desired.num) if desired.num else None
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+
+def product_changes(current: ProductDto, desired: DesiredProduct) -> Dict[str, Any]:
+    """Fields set on `desired` whose value differs from `current`.
+
+    Fields the caller did not set are not compared, so a desired product
+    may carry only the fields it wants to change.
+    """
+    changes = {}
+    for name in desired.model_fields_set:
+        if name == "id" or name not in ProductUpdateDto.model_fields:
+            continue
+        value = getattr(desired, name)
+        if _dump(value) != _dump(getattr(current, name)):
+            changes[name] = value
+    return changes
+
+
+class ProductUpsertPlan(NamedTuple):
+    """Calls needed to reach the desired products"""
+
+    saves: List[ProductSaveDto]
+    updates: List[Tuple[ProductUpdateDto, List[str]]]
+    unchanged: List[DesiredProduct]
+    unknown: List[ProductUpdateDto]
+    conflicts: List[str]
+
+
+def plan_product_upsert(
+    catalog: ProductCatalog, desired: Iterable[DesiredProduct]
+) -> ProductUpsertPlan:
+    """Match desired products against the catalog.
+
+    An update carries the catalog product with the changed fields
+    applied, as the update endpoint replaces the whole product. Desired
+    products with an id the catalog does not know go to `unknown`.
+
+    A product listed twice is planned once: an identical repeat counts as
+    unchanged, a differing one puts its `product_key` into `conflicts`
+    and no call is planned for it.
+    """
+    saves: Dict[str, ProductSaveDto] = {}
+    updates: Dict[str, Tuple[ProductUpdateDto, List[str]]] = {}
+    conflicts: Set[str] = set()
+    unchanged: List[DesiredProduct] = []
+    unknown: List[ProductUpdateDto] = []
+    for product in desired:
+        current = catalog.match(product)
+        if current is None:
+            if isinstance(product, ProductUpdateDto):
+                unknown.append(product)
+                continue
+            key = product_key(product)
+            planned_save = saves.setdefault(key, product)
+            if planned_save is not product:
+                if _dump(planned_save) != _dump(product):
+                    conflicts.add(key)
+                else:
+                    unchanged.append(product)
+            continue
+        changes = product_changes(current, product)
+        if not changes:
+            unchanged.append(product)
+            continue
+        update = ProductUpdateDto.from_dict(current.to_dict())
+        if update is None:
+            raise ApiValueError("Product {0} cannot be converted for update".format(current.id))
+        update = ProductUpdateDto.model_validate(dict(update, **changes))
+        planned_update = updates.setdefault(current.id, (update, sorted(changes)))
+        if planned_update[0] is not update:
+            if _dump(planned_update[0]) != _dump(update):
+                conflicts.add(current.id)
+            else:
+                unchanged.append(product)
+    return ProductUpsertPlan(
+        [save for key, save in saves.items() if key not in conflicts],
+        [entry for key, entry in updates.items() if key not in conflicts],
+        unchanged,
+        unknown,
+        sorted(conflicts),
+    )
+
+
+class ProductUpsertReport(NamedTuple):
+    """Outcome of a bulk upsert"""
+
+    created: List[ProductDto]
+    updated: List[ProductDto]
+    unchanged: int
+    errors: Dict[str, List[ErrorDto]]
+    failures: Dict[str, BaseException]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.failures
+
+
+class ProductUpserter:
+    """Runs product upsert plans through `NomenclatureManagementApi`.
+
+    Updates are repeated on transient failures; saves are not, since a
+    repeated save may create the product twice.
+
+    :param catalog: live products, e.g. `ProductCatalog.load`; it is
+        updated with the products the server returns.
+    """
+
+    def __init__(
+        self,
+        api,
+        catalog: ProductCatalog,
+        generate_nomenclature_code: Optional[bool] = None,
+        generate_fast_code: Optional[bool] = None,
+        attempts: int = 3,
+        retry_delay: float = 0.5,
+    ) -> None:
+        self.api = api
+        self.catalog = catalog
+        self.generate_nomenclature_code = generate_nomenclature_code
+        self.generate_fast_code = generate_fast_code
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+
+    async def run(
+        self, desired: Iterable[DesiredProduct], limit: Optional[int] = None
+    ) -> ProductUpsertReport:
+        """Create and update what differs from the catalog.
+
+        :param limit: parallel requests, the client policy by default.
+        """
+        plan = plan_product_upsert(self.catalog, desired)
+        report = ProductUpsertReport([], [], len(plan.unchanged), {}, {})
+        for product in plan.unknown:
+            report.errors[product_key(product)] = [
+                ErrorDto(code="NOT_FOUND", value="Product {0} is not in the catalog".format(
+                    product.id
+                ))
+            ]
+        for key in plan.conflicts:
+            report.errors[key] = [ErrorDto(
+                code="DUPLICATE", value="Product {0} is listed with different fields".format(key)
+            )]
+
+        async def run_call(key: str, created: bool, call) -> None:
+            try:
+                response: ProductUnitOperationResponseScheme = await call()
+            except Exception as error:
+                report.failures[key] = error
+                return
+            if response.result != RequestResultDtoEnum.SUCCESS or response.response is None:
+                report.errors[key] = response.errors or []
+                return
+            self.catalog.put(response.response)
+            (report.created if created else report.updated).append(response.response)
+
+        calls = [
+            functools.partial(
+                run_call, product_key(product), True,
+                functools.partial(
+                    self.api.v2_entities_products_save_post,
+                    generate_nomenclature_code=self.generate_nomenclature_code,
+                    generate_fast_code=self.generate_fast_code,
+                    product_save_dto=product,
+                ),
+            )
+            for product in plan.saves
+        ] + [
+            functools.partial(
+                run_call, product_key(product), False,
+                functools.partial(
+                    retry_call,
+                    functools.partial(
+                        self.api.v2_entities_products_update_post, product_update_dto=product
+                    ),
+                    self.attempts,
+                    self.retry_delay,
+                ),
+            )
+            for product, _ in plan.updates
+        ]
+        await gather_limited(calls, concurrency_limit(self.api.api_client, limit))
+        return report
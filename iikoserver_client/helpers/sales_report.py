@@ -0,0 +1,135 @@
+"""Chain-wide `reports_sales_get` values in one table.
+
+The sales report is built for one department per call. `fetch_sales`
+fans the calls out over departments and date windows, streams every
+``dayDishValue`` record from the responses and sums the values into a
+table keyed by department, date and dish.
+"""
+
+import functools
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from lxml import etree
+
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.concurrency import concurrency_limit, gather_limited
+from iikoserver_client.helpers.conversions import to_date
+from iikoserver_client.helpers.xml_stream import (
+    element_values, iter_xml_records, stream_xml_records
+)
+
+SALES_SCHEMA = {
+    "department": "",
+    "date": "",
+    "product_id": "",
+    "product_name": "",
+    "value": "d",
+}
+
+SalesKey = Tuple[str, Optional[date], Optional[str]]
+
+
+class SalesAggregator:
+    """Sums ``dayDishValue`` records by (department, date, product)."""
+
+    def __init__(self) -> None:
+        self.values: Dict[SalesKey, float] = {}
+        self.names: Dict[str, str] = {}
+
+    def add(self, department: str, element: etree._Element) -> None:
+        record = element_values(element)
+        product_id = record.get("productId")
+        product_name = record.get("productName")
+        if product_id is not None and product_name:
+            self.names.setdefault(product_id, product_name)
+        value = record.get("value")
+        key = (department, to_date(record.get("date")), product_id)
+        self.values[key] = self.values.get(key, 0.0) + (float(value) if value else 0.0)
+
+    def table(self) -> ColumnTable:
+        """Rows ordered by department, date and product."""
+        result = ColumnTable.empty(SALES_SCHEMA)
+        ordered = sorted(
+            self.values.items(),
+            key=lambda item: (item[0][0], item[0][1] or date.min, item[0][2] or ""),
+        )
+        for (department, day, product_id), value in ordered:
+            name = self.names.get(product_id) if product_id is not None else None
+            result.append((department, day, product_id, name, value))
+        return result
+
+
+def parse_sales_report(
+    source: Union[bytes, str, Iterable[bytes]], department: str
+) -> ColumnTable:
+    """Aggregate one `reports_sales_get` XML document."""
+    aggregator = SalesAggregator()
+    for element in iter_xml_records(source):
+        aggregator.add(department, element)
+    return aggregator.table()
+
+
+def date_windows(
+    date_from: date, date_to: date, days: Optional[int] = None
+) -> List[Tuple[date, date]]:
+    """Split an inclusive period into windows of at most `days` days."""
+    if days is None:
+        return [(date_from, date_to)]
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    windows = []
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=days - 1), date_to)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+
+async def fetch_sales(
+    api,
+    departments: Sequence[str],
+    date_from: date,
+    date_to: date,
+    days_per_request: Optional[int] = None,
+    dish_details: bool = True,
+    all_revenue: Optional[bool] = None,
+    hour_from: Optional[int] = None,
+    hour_to: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> ColumnTable:
+    """Sales of several departments over a period in one table.
+
+    :param api: `ReportsV1Api` instance.
+    :param date_to: last day of the period, included.
+    :param days_per_request: split the period into windows of this many
+        days, one request per department and window; by default one
+        request per department.
+    :param limit: parallel requests, the client policy by default.
+    """
+    aggregator = SalesAggregator()
+
+    async def run(department: str, start: date, end: date) -> None:
+        async for element in stream_xml_records(
+            api, "reports_sales_get",
+            department=department,
+            date_from=start.strftime("%d.%m.%Y"),
+            date_to=end.strftime("%d.%m.%Y"),
+            hour_from=hour_from,
+            hour_to=hour_to,
+            dish_details=dish_details,
+            all_revenue=all_revenue,
+        ):
+            aggregator.add(department, element)
+
+    windows = date_windows(date_from, date_to, days_per_request)
+    await gather_limited(
+        [
+            functools.partial(run, department, start, end)
+            for department in departments
+            for start, end in windows
+        ],
+        concurrency_limit(api.api_client, limit),
+    )
+    return aggregator.table()
@@ -0,0 +1,133 @@
+"""Streaming export of `reports_store_operations_get` to CSV or Parquet.
+
+The store operations report is the largest payload of the API. Its
+``storeReportItemDto`` records are read from the response stream one by
+one, converted to plain values by a per-column converter and written
+through a bounded buffer, so no model objects are built and memory use
+does not grow with the report.
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from lxml import etree
+
+from iikoserver_client.helpers.conversions import EnumConverter
+from iikoserver_client.helpers.export import DEFAULT_BUFFER_ROWS, TableWriter, open_table_writer
+from iikoserver_client.helpers.xml_stream import iter_xml_records, stream_xml_records
+from iikoserver_client.models.document_type_enum import DocumentTypeEnum
+from iikoserver_client.models.transaction_type_enum import TransactionTypeEnum
+
+
+def _to_bool(text: str) -> bool:
+    return text.strip().lower() == "true"
+
+
+_STRING = ("string", str)
+_FLOAT = ("float", float)
+
+STORE_OPERATIONS_COLUMNS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "date": _STRING,
+    "operationalDate": _STRING,
+    "documentId": _STRING,
+    "documentNum": _STRING,
+    "documentType": ("string", EnumConverter(DocumentTypeEnum)),
+    "type": ("string", EnumConverter(TransactionTypeEnum)),
+    "incoming": ("bool", _to_bool),
+    "documentComment": _STRING,
+    "primaryStore": _STRING,
+    "secondaryAccount": _STRING,
+    "expenseAccount": _STRING,
+    "revenueAccount": _STRING,
+    "product": _STRING,
+    "productGroup": _STRING,
+    "productCategory": _STRING,
+    "amount": _FLOAT,
+    "secondaryAmount": _FLOAT,
+    "sum": _FLOAT,
+    "sumWithoutNds": _FLOAT,
+    "sumNds": _FLOAT,
+    "ndsPercent": _FLOAT,
+    "cost": _FLOAT,
+    "documentSum": _FLOAT,
+    "firstEstimatedPurchasePrice": _FLOAT,
+    "secondEstimatedPurchasePrice": _FLOAT,
+}
+"""XML field -> (export column kind, converter) in output order"""
+
+STORE_OPERATIONS_SCHEMA = {name: kind for name, (kind, _) in STORE_OPERATIONS_COLUMNS.items()}
+
+
+class StoreOperationsRowConverter:
+    """Converts ``storeReportItemDto`` elements to rows in schema order."""
+
+    def __init__(self) -> None:
+        self.positions = {name: index for index, name in enumerate(STORE_OPERATIONS_COLUMNS)}
+        self.converters: List[Callable[[str], Any]] = [
+            converter for _, converter in STORE_OPERATIONS_COLUMNS.values()
+        ]
+
+    def __call__(self, element: etree._Element) -> List[Any]:
+        row: List[Any] = [None] * len(self.converters)
+        for child in element:
+            index = self.positions.get(child.tag)
+            if index is None or not child.text:
+                continue
+            row[index] = self.converters[index](child.text)
+        return row
+
+
+def write_store_operations(
+    source: Union[bytes, str, Iterable[bytes]], writer: TableWriter
+) -> int:
+    """Write a store operations XML document (or its chunks) to `writer`.
+
+    :return: number of rows written.
+    """
+    convert = StoreOperationsRowConverter()
+    count = 0
+    for element in iter_xml_records(source):
+        writer.write_row(convert(element))
+        count += 1
+    return count
+
+
+def _format_date(value: Union[str, date]) -> str:
+    return value.strftime("%d.%m.%Y") if isinstance(value, date) else value
+
+
+async def export_store_operations(
+    api,
+    path: Union[str, Path],
+    date_from: Union[str, date],
+    date_to: Union[str, date],
+    stores: Optional[List[str]] = None,
+    document_types: Optional[List[DocumentTypeEnum]] = None,
+    product_detalization: Optional[bool] = None,
+    show_cost_corrections: Optional[bool] = None,
+    preset_id: Optional[str] = None,
+    format: Optional[str] = None,
+    buffer_rows: int = DEFAULT_BUFFER_ROWS,
+) -> int:
+    """Stream a store operations report into a CSV or Parquet file.
+
+    :param api: `ReportsV1Api` instance.
+    :param format: ``csv`` or ``parquet``, by default from the file suffix.
+    :param buffer_rows: rows kept in memory between writes.
+    :return: number of exported rows.
+    """
+    convert = StoreOperationsRowConverter()
+    with open_table_writer(path, STORE_OPERATIONS_SCHEMA, format, buffer_rows) as writer:
+        async for element in stream_xml_records(
+            api, "reports_store_operations_get",
+            date_from=_format_date(date_from),
+            date_to=_format_date(date_to),
+            stores=stores,
+            document_types=document_types,
+            product_detalization=product_detalization,
+            show_cost_corrections=show_cost_corrections,
+            preset_id=preset_id,
+        ):
+            writer.write_row(convert(element))
+    return writer.rows_written
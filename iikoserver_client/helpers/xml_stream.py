@@ -0,0 +1,131 @@
+"""Incremental parsing of large XML responses.
+
+Report endpoints return XML documents that are a flat list of records
+under the root element. Instead of decoding the whole body to a string and
+building a model tree, the helpers here feed the response stream to an
+`lxml` pull parser and hand out one record element at a time, freeing
+each record once it has been consumed.
+"""
+
+import inspect
+from typing import (
+    Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+)
+
+from lxml import etree
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+RootCallback = Callable[[etree._Element], None]
+"""Called with the root element as soon as its start tag is parsed"""
+
+
+def _pull_records(
+    parser: etree.XMLPullParser,
+    depth: int,
+    state: Dict[str, int],
+    on_root: Optional[RootCallback] = None,
+) -> Iterator[etree._Element]:
+    for event, element in parser.read_events():
+        if event == "start":
+            state["depth"] += 1
+            if state["depth"] == 0 and on_root is not None:
+                on_root(element)
+            continue
+        state["depth"] -= 1
+        if state["depth"] == depth - 1:
+            yield element
+            # Free the record and the already processed siblings
+            element.clear(keep_tail=False)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+def iter_xml_records(
+    chunks: Union[bytes, str, Iterable[bytes]], depth: int = 1
+) -> Iterator[etree._Element]:
+    """Yield completed elements found `depth` levels below the root.
+
+    Each element is cleared after the consumer moves on, so its content
+    must be read before advancing the iterator.
+    """
+    if isinstance(chunks, str):
+        chunks = [chunks.encode("utf-8")]
+    elif isinstance(chunks, bytes):
+        chunks = [chunks[i:i + DEFAULT_CHUNK_SIZE]
+                  for i in range(0, len(chunks), DEFAULT_CHUNK_SIZE)]
+    parser = etree.XMLPullParser(events=("start", "end"), huge_tree=True)
+    state = {"depth": -1}
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _pull_records(parser, depth, state)
+    parser.close()
+    yield from _pull_records(parser, depth, state)
+
+
+async def aiter_xml_records(
+    response,
+    depth: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_root: Optional[RootCallback] = None,
+) -> AsyncIterator[etree._Element]:
+    """Async variant of `iter_xml_records` reading a streamed response.
+
+    :param response: `RESTResponse` obtained from `ApiClient.stream_api()`.
+    :param on_root: receives the root element, e.g. to read its
+        attributes, even when the response has no records.
+    """
+    parser = etree.XMLPullParser(events=("start", "end"), huge_tree=True)
+    state = {"depth": -1}
+    async for chunk in response.response.content.iter_chunked(chunk_size):
+        parser.feed(chunk)
+        for element in _pull_records(parser, depth, state, on_root):
+            yield element
+    parser.close()
+    for element in _pull_records(parser, depth, state, on_root):
+        yield element
+
+
+def serialize_call(api, operation: str, **params: Any) -> Tuple[Any, ...]:
+    """Serialize a call of `api.<operation>` for `ApiClient.stream_api`.
+
+    Parameters that are not given are passed as None, like the generated
+    method defaults do.
+    """
+    serialize = getattr(api, "_{0}_serialize".format(operation))
+    arguments: Dict[str, Any] = dict.fromkeys(inspect.signature(serialize).parameters)
+    unknown = set(params) - set(arguments)
+    if unknown:
+        raise TypeError("{0}() got unexpected parameters: {1}".format(
+            operation, ", ".join(sorted(unknown))
+        ))
+    arguments["_host_index"] = 0
+    arguments.update(params)
+    return serialize(**arguments)
+
+
+async def stream_xml_records(
+    api,
+    operation: str,
+    depth: int = 1,
+    on_root: Optional[RootCallback] = None,
+    **params: Any,
+) -> AsyncIterator[etree._Element]:
+    """Call `api.<operation>` and yield its XML records as they arrive.
+
+    :param api: generated API instance, e.g. `ReportsV1Api`.
+    :param operation: name of the API method, e.g. ``reports_sales_get``.
+    :param depth: level of the record elements below the root.
+    :param on_root: see `aiter_xml_records`.
+    """
+    request = serialize_call(api, operation, **params)
+    async with api.api_client.stream_api(*request) as response:
+        async for element in aiter_xml_records(response, depth, on_root=on_root):
+            yield element
+
+
+def element_values(element: etree._Element) -> Dict[str, Optional[str]]:
+    """Map child tag names of a record element to their text."""
+    return {child.tag: child.text for child in element if isinstance(child.tag, str)}
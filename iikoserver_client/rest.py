@@ -16,10 +16,12 @@ import io
 import json
 import re
 import ssl
-from typing import Optional, Union
+from typing import Any, Dict, Iterator, Optional, Union
 
 import aiohttp
+import aiohttp.payload
 import aiohttp_retry
+from lxml import etree
 
 from iikoserver_client.exceptions import ApiException, ApiValueError
 
@@ -27,6 +29,92 @@ RESTResponseType = aiohttp.ClientResponse
 
 ALLOW_RETRY_METHODS = frozenset({'DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT', 'TRACE'})
 
+XML_CHUNK_SIZE = 64 * 1024
+
+
+def _xml_config(model: Any) -> Dict[str, Any]:
+    return getattr(model, "_{0}__xml_config".format(type(model).__name__), {})
+
+
+def iter_xml_chunks(model: Any, chunk_size: int = XML_CHUNK_SIZE) -> Iterator[bytes]:
+    """Serialize an XML model in chunks of about `chunk_size` bytes.
+
+    The document equals ``model.to_xml()`` without pretty-printing. The
+    entries of list containers, like the ``items`` of import documents,
+    are built and written one at a time, so a document with thousands of
+    lines never exists as a single element tree.
+    """
+    config = _xml_config(model)
+    root = etree.Element(config.get("root_name", type(model).__name__))
+    containers = {}
+    header = model
+    for name, field_config in config.get("field_configs", {}).items():
+        value = getattr(model, name, None)
+        if value is None:
+            continue
+        entries = getattr(value, "item", None)
+        if isinstance(entries, list) and entries:
+            entry_config = _xml_config(value).get("field_configs", {}).get("item", {})
+            containers[field_config.get("xml_name", name)] = (
+                entry_config.get("xml_name", "item"), entries
+            )
+            header = header.model_copy(update={name: value.model_copy(update={"item": []})})
+    header._to_xml_element_internal(root)
+
+    buffer = io.BytesIO()
+    with etree.xmlfile(buffer, encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element(root.tag, root.attrib):
+            for child in root:
+                container = containers.pop(child.tag, None)
+                if container is None:
+                    xf.write(child)
+                    continue
+                entry_tag, entries = container
+                with xf.element(child.tag, child.attrib):
+                    for entry in entries:
+                        if not hasattr(entry, "_to_xml_element_internal"):
+                            continue
+                        element = etree.Element(entry_tag)
+                        entry._to_xml_element_internal(element)
+                        xf.write(element)
+                        xf.flush()
+                        if buffer.tell() >= chunk_size:
+                            yield buffer.getvalue()
+                            buffer.seek(0)
+                            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class XmlModelPayload(aiohttp.payload.Payload):
+    """Request body that serializes an XML model while it is sent.
+
+    The size is unknown up front, so the body goes out with chunked
+    transfer encoding. The model is serialized again on every write,
+    which keeps the payload reusable for retries and redirects.
+    """
+
+    _autoclose = True
+
+    def __init__(
+        self,
+        value: Any,
+        chunk_size: int = XML_CHUNK_SIZE,
+        content_type: str = "application/xml",
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(value, content_type=content_type, **kwargs)
+        self.chunk_size = chunk_size
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return b"".join(iter_xml_chunks(self._value, self.chunk_size)).decode(encoding, errors)
+
+    async def write(self, writer) -> None:
+        for chunk in iter_xml_chunks(self._value, self.chunk_size):
+            await writer.write(chunk)
+
+
 class RESTResponse(io.IOBase):
 
     def __init__(self, resp) -> None:
@@ -176,7 +264,7 @@ class RESTClientObject:
             # Pass a `bytes` or `str` parameter directly in the body to support
             # other content types than Json when `body` argument is provided
             # in serialized form
-            elif isinstance(body, str) or isinstance(body, bytes):
+            elif isinstance(body, (str, bytes, aiohttp.payload.Payload)):
                 args["data"] = body
             else:
                 # Cannot generate the request from given parameters
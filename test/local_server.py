@@ -0,0 +1,44 @@
+# coding: utf-8
+
+"""Local aiohttp server for tests that exercise the real HTTP stack."""
+
+import contextlib
+from typing import Any, AsyncIterator, Iterable
+
+from aiohttp import web
+
+from iikoserver_client import ApiClient
+from iikoserver_client.configuration import Configuration
+
+BASE_PATH = "/resto/api"
+
+
+@contextlib.asynccontextmanager
+async def local_api_client(
+    routes: Iterable[web.RouteDef], **settings: Any
+) -> AsyncIterator[ApiClient]:
+    """Serve `routes` on a free local port and yield a client pointed at it.
+
+    Route paths are relative to the API base path, e.g.
+    ``web.get("/reports/olap", handler)``. `settings` are set on the
+    client `Configuration`.
+    """
+    app = web.Application()
+    app.add_routes([
+        web.route(route.method, BASE_PATH + route.path, route.handler, **route.kwargs)
+        for route in routes
+    ])
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        configuration = Configuration()
+        configuration.host = "http://127.0.0.1:%d%s" % (port, BASE_PATH)
+        for name, value in settings.items():
+            setattr(configuration, name, value)
+        async with ApiClient(configuration) as api_client:
+            yield api_client
+    finally:
+        await runner.cleanup()
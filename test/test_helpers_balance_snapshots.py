@@ -0,0 +1,87 @@
+# coding: utf-8
+
+import tempfile
+import unittest
+from datetime import datetime
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.balance_snapshots import BalanceChange, StoreBalanceSnapshots
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.models.store_balance import StoreBalance
+
+
+def balances(*rows):
+    return [StoreBalance(store=s, product=p, amount=a, sum=m) for s, p, a, m in rows]
+
+
+class FakeReportsV2Api:
+
+    def __init__(self, reports) -> None:
+        self.reports = list(reports)
+        self.calls = []
+
+    async def v2_reports_balance_stores_get(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.reports.pop(0)
+
+
+class TestStoreBalanceSnapshots(unittest.IsolatedAsyncioTestCase):
+    """StoreBalanceSnapshots unit tests"""
+
+    def test_update_emits_only_changes(self) -> None:
+        snapshots = StoreBalanceSnapshots()
+        first = snapshots.update(balances(("s1", "p1", 2, 20), ("s1", "p2", 0, 0)))
+        self.assertEqual(first, [BalanceChange("s1", "p1", 2.0, 20.0, 2.0, 20.0)])
+        self.assertEqual(len(snapshots), 2)
+
+        second = snapshots.update(balances(("s1", "p1", 2, 20), ("s1", "p2", 1, 5)))
+        self.assertEqual(second, [BalanceChange("s1", "p2", 1.0, 5.0, 1.0, 5.0)])
+
+        third = snapshots.update(balances(("s1", "p2", 1, 5)))
+        self.assertEqual(third, [BalanceChange("s1", "p1", 0.0, 0.0, -2.0, -20.0)])
+        self.assertIsNone(snapshots.get("s1", "p1"))
+        self.assertEqual(snapshots.get("s1", "p2"), (1.0, 5.0))
+
+    def test_scope_limits_removals(self) -> None:
+        snapshots = StoreBalanceSnapshots()
+        snapshots.update(balances(("s1", "p1", 1, 1), ("s2", "p1", 3, 3)))
+        changes = snapshots.update(balances(("s2", "p1", 4, 4)), stores=["s2"])
+        self.assertEqual(changes, [BalanceChange("s2", "p1", 4.0, 4.0, 1.0, 1.0)])
+        self.assertEqual(snapshots.get("s1", "p1"), (1.0, 1.0))
+        table = snapshots.to_table()
+        self.assertEqual(sorted(table["store"]), ["s1", "s2"])
+
+    async def test_poll_writes_history(self) -> None:
+        with tempfile.TemporaryDirectory() as path:
+            api = FakeReportsV2Api([
+                balances(("s1", "p1", 1, 10)),
+                balances(("s1", "p1", 1, 10)),
+                balances(("s1", "p1", 3, 30)),
+            ])
+            snapshots = StoreBalanceSnapshots(history_path=path)
+            for hour in (10, 11, 12):
+                await snapshots.poll(api, datetime(2024, 1, 1, hour), store=["s1"])
+            self.assertEqual(api.calls[0]["store"], ["s1"])
+
+            history = list(snapshots.history())
+            self.assertEqual([ts.hour for ts, _ in history], [10, 12])
+            self.assertIsInstance(history[1][1], ColumnTable)
+            self.assertEqual(history[1][1].to_pydict()["amount_delta"], [2.0])
+
+    async def test_history_of_one_second_is_kept(self) -> None:
+        with tempfile.TemporaryDirectory() as path:
+            api = FakeReportsV2Api([balances(("s1", "p1", 1, 10)), balances(("s1", "p1", 2, 20))])
+            snapshots = StoreBalanceSnapshots(history_path=path)
+            for _ in range(2):
+                await snapshots.poll(api, datetime(2024, 1, 1, 10), store=["s1"])
+            history = list(snapshots.history())
+            self.assertEqual(len(history), 2)
+            self.assertEqual(history[1][1].to_pydict()["amount_delta"], [1.0])
+
+    async def test_department_without_stores_is_rejected(self) -> None:
+        with self.assertRaises(ApiValueError):
+            await StoreBalanceSnapshots().poll(FakeReportsV2Api([]), department=["d1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
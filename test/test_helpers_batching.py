@@ -0,0 +1,146 @@
+# coding: utf-8
+
+import asyncio
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from iikoserver_client import ApiClient
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.helpers.batching import (
+    chunk_ids, fetch_by_ids, products_by_ids, store_balances_by_products
+)
+from iikoserver_client.helpers.concurrency import (
+    DEFAULT_CONCURRENCY, concurrency_limit, gather_limited
+)
+from iikoserver_client.models.store_balance import StoreBalance
+
+
+class FakeApi:
+    """Records calls and answers list lookups with one item per id"""
+
+    def __init__(self, max_concurrent_requests=None) -> None:
+        configuration = Configuration()
+        configuration.max_concurrent_requests = max_concurrent_requests
+        self.api_client = SimpleNamespace(configuration=configuration)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _answer(self, method, ids):
+        self.calls.append((method, list(ids)))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        # Reverse order and a duplicate to check stitching
+        return [SimpleNamespace(id=value) for value in reversed(ids)] + [
+            SimpleNamespace(id=ids[0])
+        ]
+
+    async def v2_entities_products_list_get(self, include_deleted=None, ids=None):
+        return await self._answer("get", ids)
+
+    async def v2_entities_products_list_post(self, include_deleted=None, ids=None):
+        return await self._answer("post", ids)
+
+    async def v2_reports_balance_stores_get(
+        self, timestamp, department=None, store=None, product=None
+    ):
+        self.calls.append(("balance", list(product)))
+        return [
+            StoreBalance(store=s, product=p, amount=1, sum=2)
+            for p in product for s in ("s1", "s2")
+        ]
+
+
+class TestBatchingHelpers(unittest.IsolatedAsyncioTestCase):
+    """Id chunking helpers unit tests"""
+
+    def test_chunk_ids_respects_query_length(self) -> None:
+        ids = ["%036d" % i for i in range(100)]
+        chunks = chunk_ids(ids, "ids", max_query_length=420)
+        self.assertEqual([value for chunk in chunks for value in chunk], ids)
+        for chunk in chunks:
+            self.assertLessEqual(len("&".join("ids=" + v for v in chunk)) + 1, 420)
+
+    def test_chunk_ids_respects_chunk_size(self) -> None:
+        chunks = chunk_ids(list("abcdefg"), max_query_length=None, max_chunk_size=3)
+        self.assertEqual(chunks, [["a", "b", "c"], ["d", "e", "f"], ["g"]])
+
+    def test_concurrency_limit_resolution(self) -> None:
+        api = FakeApi(max_concurrent_requests=2)
+        self.assertEqual(concurrency_limit(api.api_client), 2)
+        self.assertEqual(concurrency_limit(api.api_client, 7), 7)
+        self.assertEqual(concurrency_limit(FakeApi().api_client), DEFAULT_CONCURRENCY)
+        with self.assertRaises(ValueError):
+            concurrency_limit(None, 0)
+
+    async def test_request_semaphore_follows_the_limit(self) -> None:
+        configuration = Configuration()
+        client = ApiClient(configuration)
+        try:
+            self.assertIsNone(client.request_semaphore)
+            configuration.max_concurrent_requests = 1
+            first = client.request_semaphore
+            self.assertIs(client.request_semaphore, first)
+            configuration.max_concurrent_requests = 3
+            self.assertEqual(client.request_semaphore._value, 3)
+        finally:
+            await client.close()
+
+    async def test_gather_limited_keeps_order_and_bounds(self) -> None:
+        running = 0
+        peak = 0
+
+        async def job(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+            return value * 2
+
+        results = await gather_limited(
+            [lambda v=v: job(v) for v in range(10)], limit=3
+        )
+        self.assertEqual(results, [v * 2 for v in range(10)])
+        self.assertLessEqual(peak, 3)
+
+    async def test_fetch_by_ids_stitches_in_input_order(self) -> None:
+        api = FakeApi(max_concurrent_requests=2)
+        ids = ["%036d" % i for i in range(300)] + ["%036d" % 5]
+
+        async def fetch(chunk):
+            return await api.v2_entities_products_list_get(ids=chunk)
+
+        items = await fetch_by_ids(fetch, ids, api_client=api.api_client)
+        self.assertEqual([item.id for item in items], ids[:300])
+        self.assertGreater(len(api.calls), 1)
+        self.assertLessEqual(api.max_in_flight, 2)
+
+    async def test_products_by_ids_switches_to_post(self) -> None:
+        api = FakeApi()
+        await products_by_ids(api, ["a", "b"])
+        self.assertEqual([method for method, _ in api.calls], ["get"])
+
+        api = FakeApi()
+        ids = ["%036d" % i for i in range(2500)]
+        items = await products_by_ids(api, ids)
+        self.assertEqual({method for method, _ in api.calls}, {"post"})
+        self.assertEqual(len(api.calls), 3)
+        self.assertEqual([item.id for item in items], ids)
+
+    async def test_store_balances_dedupe_by_store_and_product(self) -> None:
+        api = FakeApi()
+        balances = await store_balances_by_products(
+            api, datetime(2024, 1, 1), ["p2", "p1", "p2"]
+        )
+        self.assertEqual(
+            [(b.product, b.store) for b in balances],
+            [("p2", "s1"), ("p2", "s2"), ("p1", "s1"), ("p1", "s2")],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
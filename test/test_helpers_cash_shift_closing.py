@@ -0,0 +1,175 @@
+# coding: utf-8
+
+import asyncio
+import unittest
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiException
+from iikoserver_client.helpers.cash_shift_closing import CashShiftCloser, accept_document
+from iikoserver_client.models.cash_shift_dto import CashShiftDto
+from iikoserver_client.models.cash_shift_payments_dto import CashShiftPaymentsDto
+from iikoserver_client.models.cash_shift_save_response_dto import CashShiftSaveResponseDto
+from iikoserver_client.models.closed_session_document_dto import ClosedSessionDocumentDto
+from iikoserver_client.models.payment_record_dto import PaymentRecordDto
+
+
+def shift(shift_id: str, number: int) -> CashShiftDto:
+    return CashShiftDto.from_dict({
+        "id": shift_id, "sessionNumber": number, "cashRegNumber": 1,
+        "openDate": "2024-05-01T09:00:00", "sessionStartCash": 0, "payOrders": 100,
+        "sumWriteoffOrders": 0, "salesCash": 60, "salesCredit": 0, "salesCard": 40,
+        "payIn": 0, "payOut": 0, "payIncome": 60, "cashRemain": 0, "cashDiff": 0,
+        "sessionStatus": "UNACCEPTED",
+    })
+
+
+def record(transaction_id: str, amount: float) -> PaymentRecordDto:
+    return PaymentRecordDto.from_dict({
+        "info": {
+            "id": transaction_id, "date": "2024-05-01T10:00:00",
+            "creationDate": "2024-05-01T10:00:00", "group": "CARD",
+            "type": "CARD", "sum": amount,
+        },
+        "actualSum": amount, "originalSum": amount, "editedPayAccountId": "account-card",
+    })
+
+
+def document(shift_id: str) -> ClosedSessionDocumentDto:
+    return ClosedSessionDocumentDto.from_dict({
+        "id": "doc-" + shift_id,
+        "session": {"sessionId": shift_id, "groupId": "group-1", "number": 1},
+        "departmentId": "department-1",
+        "items": [{"num": 1, "transactionId": "t-cash-" + shift_id, "status": "UNACCEPTED"}],
+    })
+
+
+class FakeCashShiftsApi:
+
+    def __init__(self) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.shifts = [shift("s1", 1), shift("s2", 2), shift("s3", 3)]
+        self.active = 0
+        self.peak = 0
+        self.failures = {"s3": 1}
+        self.missing = set()
+        self.statuses = {}
+        self.saved = []
+
+    async def _track(self):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+
+    async def v2_cashshifts_list_get(self, open_date_from, open_date_to, status,
+                                     department_id=None):
+        return self.shifts
+
+    async def v2_cashshifts_payments_list_session_id_get(self, session_id, hide_accepted=None):
+        await self._track()
+        return CashShiftPaymentsDto(
+            sessionId=session_id, cashlessRecords=[record("t-card-" + session_id, 40)],
+            payInRecords=[], payOutsRecords=[],
+        )
+
+    async def v2_cashshifts_closed_session_document_id_get(self, id):
+        await self._track()
+        if id in self.missing:
+            raise ApiException(status=404, reason="Not Found")
+        return document(id)
+
+    async def v2_cashshifts_save_post(self, closed_session_document_dto):
+        shift_id = closed_session_document_dto.session.session_id
+        if self.failures.get(shift_id):
+            self.failures[shift_id] -= 1
+            raise ApiException(status=503, reason="Service Unavailable")
+        self.saved.append(shift_id)
+        errors = None
+        if shift_id == "s2":
+            errors = {
+                "documentError": [{"code": "EMPTY", "value": "accountShortageId"}],
+                "itemError": [{"identifier": 2, "error": [{"code": "CLOSED", "value": "period"}]}],
+            }
+        return CashShiftSaveResponseDto.from_dict({
+            "importResult": "ERROR" if errors else "SUCCESS",
+            "status": self.statuses.get(shift_id, "UNACCEPTED" if errors else "ACCEPTED"),
+            "errors": errors,
+            "document": closed_session_document_dto.to_dict(),
+        })
+
+
+class TestCashShiftCloser(unittest.IsolatedAsyncioTestCase):
+    """CashShiftCloser unit tests"""
+
+    def test_accept_document_adds_missing_payments(self) -> None:
+        payments = CashShiftPaymentsDto(
+            sessionId="s1", cashlessRecords=[record("t-card", 40), record("t-cash-s1", 60)],
+            payInRecords=[], payOutsRecords=[],
+        )
+        accepted = accept_document(document("s1"), payments)
+        self.assertEqual([(item.num, item.transaction_id, item.status) for item in accepted.items],
+                         [(1, "t-cash-s1", "ACCEPTED"), (2, "t-card", "ACCEPTED")])
+        self.assertEqual(accepted.items[1].sum_real, 40)
+        self.assertEqual(accepted.items[1].account_override_id, "account-card")
+
+    def test_accept_document_keeps_warnings_unless_asked(self) -> None:
+        warned = document("s1")
+        warned.items[0].status = "HASWARNINGS"
+        self.assertEqual(accept_document(warned).items[0].status, "HASWARNINGS")
+        self.assertEqual(accept_document(warned, accept_warnings=True).items[0].status,
+                         "ACCEPTED")
+
+    async def test_close_day(self) -> None:
+        api = FakeCashShiftsApi()
+        closer = CashShiftCloser(api, retry_delay=0)
+        closings = await closer.prefetch(date(2024, 5, 1), date(2024, 5, 1), limit=3)
+        self.assertEqual([closing.shift.id for closing in closings], ["s1", "s2", "s3"])
+        self.assertGreater(api.peak, 1)
+        self.assertLessEqual(api.peak, 3)
+
+        report = await closer.accept(closings)
+        self.assertFalse(report.ok)
+        self.assertEqual([result.shift.id for result in report.accepted()], ["s1", "s3"])
+        self.assertEqual([result.shift.id for result in report.rejected()], ["s2"])
+        self.assertEqual(sorted(api.saved), ["s1", "s2", "s3"])
+        self.assertEqual(
+            list(report.table().rows()),
+            [("s2", 2, 0, "EMPTY", "accountShortageId"), ("s2", 2, 2, "CLOSED", "period")],
+        )
+        self.assertIsInstance(closings[0].shift.open_date, datetime)
+
+        again = await CashShiftCloser(api).close_day(date(2024, 5, 1))
+        self.assertEqual(len(again.results), 3)
+
+    async def test_failed_prefetch_is_reported(self) -> None:
+        api = FakeCashShiftsApi()
+        api.missing.add("s2")
+        report = await CashShiftCloser(api, retry_delay=0).close_day(date(2024, 5, 1))
+        self.assertEqual([result.shift.id for result in report.accepted()], ["s1", "s3"])
+        failed = report.rejected()[0]
+        self.assertEqual((failed.shift.id, failed.document), ("s2", None))
+        self.assertIsInstance(failed.error, ApiException)
+        self.assertEqual([row[:4] for row in report.table().rows()], [("s2", 2, 0, "FAILED")])
+        self.assertNotIn("s2", api.saved)
+
+    async def test_accepted_needs_status_and_no_warnings(self) -> None:
+        api = FakeCashShiftsApi()
+        api.failures = {}
+        api.statuses["s3"] = "UNACCEPTED"
+        closings = await CashShiftCloser(api, retry_delay=0).prefetch(
+            date(2024, 5, 1), date(2024, 5, 1)
+        )
+        warned = closings[0].document.model_copy(deep=True)
+        warned.items[0].status = "HASWARNINGS"
+        closings[0] = closings[0]._replace(document=warned)
+        report = await CashShiftCloser(api).accept(closings)
+        self.assertEqual(report.accepted(), [])
+        self.assertEqual([result.shift.id for result in report.rejected()], ["s1", "s2", "s3"])
+        accepted = await CashShiftCloser(api, accept_warnings=True).accept(closings[:1])
+        self.assertTrue(accepted.ok)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# coding: utf-8
+
+import asyncio
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiException, ApiValueError
+from iikoserver_client.helpers.chart_publisher import (
+    ChartPublisher, chart_fingerprint, chart_key, chart_levels
+)
+from iikoserver_client.models.assembly_chart_delete_response_scheme import (
+    AssemblyChartDeleteResponseScheme
+)
+from iikoserver_client.models.assembly_chart_dto import AssemblyChartDto
+from iikoserver_client.models.assembly_chart_save_response_scheme import (
+    AssemblyChartSaveResponseScheme
+)
+from iikoserver_client.models.chart_result_dto import ChartResultDto
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.save_assembly_chart_dto import SaveAssemblyChartDto
+
+
+def line(product_id: str, amount=1) -> dict:
+    values = dict.fromkeys(
+        ["amountIn", "amountMiddle", "amountOut", "amountIn1", "amountOut1", "amountIn2",
+         "amountOut2", "amountIn3", "amountOut3"],
+        amount,
+    )
+    return dict(values, productId=product_id)
+
+
+def chart(product_id: str, *ingredients: str, amount=1) -> SaveAssemblyChartDto:
+    return SaveAssemblyChartDto.from_dict({
+        "assembledProductId": product_id,
+        "dateFrom": "2024-03-01",
+        "items": [line(ingredient, amount) for ingredient in ingredients],
+    })
+
+
+def live(saved: SaveAssemblyChartDto) -> AssemblyChartDto:
+    data = saved.to_dict()
+    data["id"] = "chart-" + saved.assembled_product_id
+    data["items"] = [
+        dict(item, id="line-{0}".format(index)) for index, item in enumerate(data["items"])
+    ]
+    return AssemblyChartDto.from_dict(data)
+
+
+class FakeChartsApi:
+
+    def __init__(self, live_charts=()) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.live_charts = list(live_charts)
+        self.saved = []
+        self.deleted = []
+
+    async def v2_assembly_charts_get_all_get(self, date_from, date_to=None):
+        return ChartResultDto(assemblyCharts=self.live_charts)
+
+    async def v2_assembly_charts_save_post(self, save_assembly_chart_dto=None):
+        await asyncio.sleep(0)
+        self.saved.append(save_assembly_chart_dto.assembled_product_id)
+        if save_assembly_chart_dto.assembled_product_id == "broken":
+            return AssemblyChartSaveResponseScheme(
+                result="ERROR", errors=[ErrorDto(code="E1", value="bad unit")], response=None
+            )
+        return AssemblyChartSaveResponseScheme(
+            result="SUCCESS", response=live(save_assembly_chart_dto)
+        )
+
+    async def v2_assembly_charts_delete_post(self, id_codet_dto=None):
+        await asyncio.sleep(0)
+        if id_codet_dto.id == "chart-missing":
+            raise ApiException(status=404, reason="Not Found")
+        self.deleted.append(id_codet_dto.id)
+        return AssemblyChartDeleteResponseScheme(result="SUCCESS", response=id_codet_dto.id)
+
+
+class TestChartPublisher(unittest.IsolatedAsyncioTestCase):
+    """ChartPublisher unit tests"""
+
+    def test_fingerprint_ignores_ids_order_and_number_types(self) -> None:
+        saved = chart("dish", "sauce", "salt")
+        reordered = chart("dish", "salt", "sauce", amount=1.0)
+        self.assertEqual(chart_fingerprint(live(saved)), chart_fingerprint(reordered))
+        self.assertNotEqual(chart_fingerprint(saved), chart_fingerprint(chart("dish", "sauce")))
+
+    def test_levels(self) -> None:
+        levels = chart_levels([
+            chart("dish", "sauce", "salt"), chart("sauce", "base"), chart("base", "water"),
+            chart("soup", "water"),
+        ])
+        self.assertEqual(
+            [[item.assembled_product_id for item in level] for level in levels],
+            [["base", "soup"], ["sauce"], ["dish"]],
+        )
+        with self.assertRaises(ApiValueError):
+            chart_levels([chart("a", "b"), chart("b", "a")])
+
+    async def test_publish_skips_unchanged_and_dependents_of_failures(self) -> None:
+        api = FakeChartsApi([live(chart("sauce", "base"))])
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = Path(directory) / "charts.json"
+            publisher = ChartPublisher(api, cache_path)
+            self.assertEqual(await publisher.load(date(2024, 3, 1)), 1)
+            report = await publisher.publish([
+                chart("dish", "sauce"), chart("sauce", "base"), chart("base", "water"),
+                chart("broken", "water"), chart("pie", "broken"), chart("cake", "pie"),
+            ])
+            self.assertEqual(api.saved[:2], ["base", "broken"])
+            self.assertEqual(sorted(api.saved), ["base", "broken", "dish"])
+            self.assertEqual(report.unchanged, [chart_key(chart("sauce"))])
+            self.assertEqual(sorted(report.skipped), ["cake|2024-03-01", "pie|2024-03-01"])
+            self.assertEqual(report.errors["broken|2024-03-01"][0].code, "E1")
+
+            again = await ChartPublisher(api, cache_path).publish([chart("dish", "sauce")])
+            self.assertTrue(again.ok)
+            self.assertEqual(len(again.unchanged), 1)
+
+            results = await publisher.delete(["chart-missing", "chart-dish"])
+            self.assertFalse(results.ok)
+            self.assertEqual(results.deleted, ["chart-dish"])
+            self.assertEqual(list(results.failures), ["chart-missing"])
+            self.assertNotIn("dish|2024-03-01", publisher.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
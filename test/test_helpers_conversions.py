@@ -0,0 +1,32 @@
+# coding: utf-8
+
+import unittest
+from datetime import date, datetime
+
+from iikoserver_client.helpers.conversions import EnumConverter, to_date, to_datetime
+from iikoserver_client.models.document_type_enum import DocumentTypeEnum
+
+
+class TestConversions(unittest.TestCase):
+    """Report value conversions unit tests"""
+
+    def test_to_date(self) -> None:
+        self.assertEqual(to_date("2024-01-02"), date(2024, 1, 2))
+        self.assertEqual(to_date("02.01.2024"), date(2024, 1, 2))
+        self.assertEqual(to_date(datetime(2024, 1, 2, 10, 30)), date(2024, 1, 2))
+        self.assertIsNone(to_date(""))
+
+    def test_to_datetime(self) -> None:
+        self.assertEqual(to_datetime("2024-01-02T10:30:00"), datetime(2024, 1, 2, 10, 30))
+        self.assertEqual(to_datetime("02.01.2024 10:30"), datetime(2024, 1, 2, 10, 30))
+        self.assertIsNone(to_datetime(None))
+
+    def test_enum_converter_passes_unknown_values(self) -> None:
+        convert = EnumConverter(DocumentTypeEnum)
+        self.assertEqual(convert("INCOMING_INVOICE"), DocumentTypeEnum.INCOMING_INVOICE.value)
+        self.assertEqual(convert("NEW_DOCUMENT_KIND"), "NEW_DOCUMENT_KIND")
+        self.assertIs(convert("NEW_DOCUMENT_KIND"), convert.cache["NEW_DOCUMENT_KIND"])
+
+
+if __name__ == '__main__':
+    unittest.main()
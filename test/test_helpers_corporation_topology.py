@@ -0,0 +1,100 @@
+# coding: utf-8
+
+import unittest
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.helpers.corporation_topology import CorporationTopology
+from iikoserver_client.models.corporation_departments_get200_response import (
+    CorporationDepartmentsGet200Response
+)
+from iikoserver_client.models.corporation_groups_get200_response import (
+    CorporationGroupsGet200Response
+)
+from iikoserver_client.models.corporation_terminals_get200_response import (
+    CorporationTerminalsGet200Response
+)
+
+
+def item(id, parent, type):
+    return {"id": id, "parentId": parent, "name": id, "type": type}
+
+
+class FakeCorporationApi:
+
+    def __init__(self) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.calls = 0
+        self.stores = [item("store1", "dep1", "STORE"), item("store2", "dep2", "STORE")]
+
+    async def corporation_departments_get(self):
+        self.calls += 1
+        return CorporationDepartmentsGet200Response.from_dict({"corporateItemDtoes": [
+            item("corp", None, "CORPORATION"),
+            item("jur", "corp", "JURPERSON"),
+            item("dep1", "jur", "DEPARTMENT"),
+            item("dep2", "corp", "DEPARTMENT"),
+        ]})
+
+    async def corporation_stores_get(self):
+        return CorporationDepartmentsGet200Response.from_dict(
+            {"corporateItemDtoes": self.stores}
+        )
+
+    async def corporation_groups_get(self):
+        return CorporationGroupsGet200Response.from_dict({"groupDtoes": [{
+            "id": "grp1", "name": "Hall", "departmentId": "dep1",
+            "groupServiceMode": "TABLE_SERVICE", "pointOfSaleDtoes": {"pointOfSaleDtoes": []},
+        }]})
+
+    async def corporation_terminals_get(self):
+        return CorporationTerminalsGet200Response.from_dict({"terminalDtoes": [{
+            "id": "term1", "name": "POS", "anonymous": False,
+            "groupInfo": {"id": "grp1", "name": "Hall"}, "restaurantSectionIds": [],
+        }]})
+
+
+class TestCorporationTopology(unittest.IsolatedAsyncioTestCase):
+    """CorporationTopology unit tests"""
+
+    async def test_queries(self) -> None:
+        api = FakeCorporationApi()
+        topology = await CorporationTopology.create(api)
+        self.assertEqual(len(topology), 8)
+        self.assertEqual([n.id for n in topology.stores_under("corp")], ["store2", "store1"])
+        self.assertEqual([n.id for n in topology.stores_under("jur")], ["store1"])
+        self.assertEqual([n.id for n in topology.departments_under("corp")], ["dep2", "dep1"])
+        self.assertEqual([n.id for n in topology.terminals_under("jur")], ["term1"])
+        self.assertEqual([n.id for n in topology.groups_under("dep1")], ["grp1"])
+        self.assertEqual(topology.department_of("term1").id, "dep1")
+        self.assertEqual([n.id for n in topology.ancestors("store1")], ["dep1", "jur", "corp"])
+        self.assertEqual([n.id for n in topology.roots()], ["corp"])
+
+    async def test_ttl_refresh(self) -> None:
+        api = FakeCorporationApi()
+        topology = await CorporationTopology.create(api, ttl=3600)
+        self.assertFalse(await topology.refresh(api))
+        topology.ttl = 0
+        self.assertTrue(await topology.refresh(api))
+        self.assertEqual(api.calls, 2)
+
+    async def test_refresh_replaces_nodes(self) -> None:
+        api = FakeCorporationApi()
+        topology = await CorporationTopology.create(api, ttl=0)
+        old_store = topology.get("store1")
+        api.stores = [item("store1", "dep2", "STORE"), item("store3", "dep2", "STORE")]
+        self.assertTrue(await topology.refresh(api))
+
+        self.assertNotIn("store2", topology)
+        self.assertIsNotNone(topology.get("store3"))
+        self.assertIsNot(topology.get("store1"), old_store)
+        self.assertEqual(topology.parent("store1").id, "dep2")
+        self.assertEqual([n.id for n in topology.stores_under("dep1")], [])
+        self.assertEqual(sorted(n.id for n in topology.stores_under("dep2")),
+                         ["store1", "store3"])
+        self.assertEqual([n.id for n in topology.ancestors("store1")], ["dep2", "corp"])
+        self.assertEqual(len(topology), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# coding: utf-8
+
+import unittest
+from datetime import date
+
+from aiohttp import web
+
+from iikoserver_client.api.reports_v1_api import ReportsV1Api
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.delivery_reports import (
+    fetch_delivery_report, parse_delivery_report
+)
+from test.local_server import local_api_client
+
+COURIERS = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n<report><rows>'
+    b'<row><courier>Ivan</courier><metrics>'
+    b'<metric><metricType>AVERAGE</metricType><orderCount>3</orderCount>'
+    b'<totalTime>31.5</totalTime></metric>'
+    b'<metric><metricType>MAXIMUM</metricType><totalTime>45</totalTime></metric>'
+    b'</metrics></row>'
+    b'</rows></report>'
+)
+
+LOYALTY = (
+    b'<report><rows><row><date>2024-01-02</date><metricType>AVERAGE</metricType>'
+    b'<newGuestCount>4</newGuestCount><regions>'
+    b'<region><region>North</region><orderCount>7</orderCount></region>'
+    b'</regions></row></rows></report>'
+)
+
+
+class TestDeliveryReports(unittest.IsolatedAsyncioTestCase):
+    """Delivery report flattening unit tests"""
+
+    def test_parse_nested_metrics(self) -> None:
+        table = parse_delivery_report(COURIERS, "couriers")
+        self.assertEqual(
+            table.column_names, ["department", "courier", "metricType", "metric", "value"]
+        )
+        self.assertEqual(list(table.rows()), [
+            (None, "Ivan", "AVERAGE", "orderCount", 3.0),
+            (None, "Ivan", "AVERAGE", "totalTime", 31.5),
+            (None, "Ivan", "MAXIMUM", "totalTime", 45.0),
+        ])
+
+    def test_parse_row_and_sub_row_metrics(self) -> None:
+        table = parse_delivery_report(LOYALTY, "loyalty", department="D1")
+        self.assertEqual(list(table.rows()), [
+            ("D1", "2024-01-02", "AVERAGE", None, "newGuestCount", 4.0),
+            ("D1", "2024-01-02", "AVERAGE", "North", "orderCount", 7.0),
+        ])
+        with self.assertRaises(ApiValueError):
+            parse_delivery_report(LOYALTY, "unknown")
+
+    async def test_fetch_fans_out_by_department(self) -> None:
+        queries = []
+
+        async def couriers(request):
+            queries.append(request.query)
+            return web.Response(body=COURIERS, content_type="application/xml")
+
+        async with local_api_client([web.get("/reports/delivery/couriers", couriers)]) as client:
+            table = await fetch_delivery_report(
+                ReportsV1Api(client), "couriers", date(2024, 1, 1), date(2024, 1, 2),
+                departments=["D1", "D2"], target_common_time=25,
+            )
+        self.assertEqual(sorted(query["department"] for query in queries), ["D1", "D2"])
+        self.assertEqual(queries[0]["dateFrom"], "2024-01-01")
+        self.assertEqual(queries[0]["targetCommonTime"], "25")
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(sorted(set(table["department"])), ["D1", "D2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+import unittest
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiException
+from iikoserver_client.helpers.document_feed import (
+    CREATED, DELETED, INTERNAL_TRANSFER, UPDATED, WRITEOFF, DocumentChangeFeed
+)
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.internal_transfer_list_with_revision_dto import (
+    InternalTransferListWithRevisionDto
+)
+from iikoserver_client.models.writeoff_document_dto import WriteoffDocumentDto
+from iikoserver_client.models.writeoff_document_list_with_revision_dto import (
+    WriteoffDocumentListWithRevisionDto
+)
+
+
+def writeoff(document_id: str, status: str = "PROCESSED") -> WriteoffDocumentDto:
+    return WriteoffDocumentDto(
+        id=document_id, dateIncoming=datetime(2024, 1, 2, 10, 0), status=status,
+        storeId="store-1", accountId="account-1", items=[],
+    )
+
+
+class FakeDocumentsApi:
+
+    def __init__(self, writeoffs) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.writeoffs = list(writeoffs)
+        self.revisions = []
+
+    async def v2_documents_writeoff_get(self, date_from, date_to, revision_from=None):
+        self.revisions.append(revision_from)
+        documents = self.writeoffs.pop(0) if self.writeoffs else []
+        if documents is None:
+            return WriteoffDocumentListWithRevisionDto(
+                result="ERROR", errors=[ErrorDto(code="E1", value="store is closed")]
+            )
+        return WriteoffDocumentListWithRevisionDto(
+            result="SUCCESS", response=documents, revision=len(self.revisions) * 10
+        )
+
+    async def v2_documents_internal_transfer_get(self, date_from, date_to, revision_from=None):
+        return InternalTransferListWithRevisionDto(result="SUCCESS", response=[], revision=1)
+
+
+class TestDocumentChangeFeed(unittest.IsolatedAsyncioTestCase):
+    """DocumentChangeFeed unit tests"""
+
+    async def test_poll_classifies_changes(self) -> None:
+        api = FakeDocumentsApi([
+            [writeoff("w1"), writeoff("w2")],
+            [writeoff("w1"), writeoff("w2", "DELETED"), writeoff("w3")],
+        ])
+        feed = DocumentChangeFeed(api, date(2024, 1, 1), date(2024, 1, 31))
+        first = await feed.poll()
+        second = await feed.poll()
+        self.assertEqual([(event.kind, event.change) for event in first], [
+            (WRITEOFF, CREATED), (WRITEOFF, CREATED),
+        ])
+        self.assertEqual([(event.document.id, event.change) for event in second], [
+            ("w1", UPDATED), ("w2", DELETED), ("w3", CREATED),
+        ])
+        self.assertEqual(api.revisions, [None, 10])
+        self.assertEqual(feed.revisions, {WRITEOFF: 20, INTERNAL_TRANSFER: 1})
+
+    async def test_events_back_off_while_idle(self) -> None:
+        api = FakeDocumentsApi([[writeoff("w1")], [], [], [writeoff("w2")]])
+        feed = DocumentChangeFeed(
+            api, date(2024, 1, 1), kinds=[WRITEOFF], emit_initial=False,
+            poll_interval=0.001, max_interval=0.003,
+        )
+        intervals = []
+        async for event in feed:
+            intervals.append(feed.interval)
+            feed.close()
+        self.assertEqual(event.document.id, "w2")
+        self.assertEqual(len(api.revisions), 4)
+        self.assertEqual(intervals, [0.001])
+
+    async def test_error_result_raises(self) -> None:
+        feed = DocumentChangeFeed(FakeDocumentsApi([None]), date(2024, 1, 1), kinds=[WRITEOFF])
+        with self.assertRaises(ApiException) as context:
+            await feed.poll()
+        self.assertIn("store is closed", str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
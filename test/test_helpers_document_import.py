@@ -0,0 +1,135 @@
+# coding: utf-8
+
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiException
+from iikoserver_client.helpers.concurrency import retry_call
+from iikoserver_client.helpers.document_import import (
+    DUPLICATE, FAILED, IMPORTED, INVALID, REJECTED, SKIPPED, DocumentImporter, document_key,
+    validate_document
+)
+from iikoserver_client.models.document_validation_result_xml import DocumentValidationResultXml
+from iikoserver_client.models.incoming_invoice_item_xml import IncomingInvoiceItemXml
+from iikoserver_client.models.incoming_invoice_xml import IncomingInvoiceXml
+from iikoserver_client.models.incoming_invoice_xml_items import IncomingInvoiceXmlItems
+
+
+def make_invoice(number: str, day: str = "2024-01-02", product: str = "p1") -> IncomingInvoiceXml:
+    return IncomingInvoiceXml(
+        documentNumber=number,
+        dateIncoming=day,
+        items=IncomingInvoiceXmlItems(item=[
+            IncomingInvoiceItemXml(num=1, product=product, amount=2, sum=10),
+        ]),
+    )
+
+
+class FakeInvoicesApi:
+
+    def __init__(self, failures: int = 0) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.failures = failures
+        self.calls = []
+
+    async def documents_import_incoming_invoice_post(self, document):
+        self.calls.append(document.document_number)
+        if self.failures:
+            self.failures -= 1
+            raise ApiException(status=503, reason="Service Unavailable")
+        if document.document_number == "bad":
+            raise ApiException(status=400, reason="Bad Request")
+        return DocumentValidationResultXml(
+            valid=document.document_number != "rejected",
+            warning=False,
+            documentNumber=document.document_number,
+            errorMessage="duplicate supplier" if document.document_number == "rejected" else None,
+        )
+
+
+class TestDocumentImport(unittest.IsolatedAsyncioTestCase):
+    """DocumentImporter unit tests"""
+
+    def test_validate_document(self) -> None:
+        self.assertEqual(validate_document(make_invoice("1")), [])
+        self.assertEqual(
+            validate_document(IncomingInvoiceXml(documentNumber="1")),
+            ["dateIncoming is required", "document has no items"],
+        )
+        invoice = make_invoice("1", product=None)
+        invoice.items.item.append(IncomingInvoiceItemXml(num=1, product="p2", amount=-1, sum=1))
+        self.assertEqual(validate_document(invoice), [
+            "item 1: product is not set",
+            "item 2: amount is negative",
+            "item 2: num 1 is used twice",
+        ])
+
+    async def test_date_spellings_share_a_key(self) -> None:
+        self.assertEqual(document_key(make_invoice("1")), "IncomingInvoiceXml|1|2024-01-02")
+        self.assertEqual(document_key(make_invoice("1", day="2024-01-02T00:00:00")),
+                         document_key(make_invoice("1")))
+        api = FakeInvoicesApi()
+        report = await DocumentImporter(api, retry_delay=0).run(
+            [make_invoice("1"), make_invoice("1", day="2024-01-02T00:00:00")]
+        )
+        self.assertEqual([result.status for result in report.results], [IMPORTED, DUPLICATE])
+        self.assertEqual(api.calls, ["1"])
+
+    async def test_run_reports_every_document(self) -> None:
+        api = FakeInvoicesApi()
+        with tempfile.TemporaryDirectory() as directory:
+            journal = os.path.join(directory, "imported.txt")
+            importer = DocumentImporter(api, journal, retry_delay=0)
+            documents = [
+                make_invoice("1"), make_invoice("1"), make_invoice("rejected"),
+                make_invoice("bad"), IncomingInvoiceXml(documentNumber="empty"),
+            ]
+            report = await importer.run(documents, limit=2)
+            self.assertEqual(
+                [result.status for result in report.results],
+                [IMPORTED, DUPLICATE, REJECTED, FAILED, INVALID],
+            )
+            self.assertFalse(report.ok)
+            self.assertEqual(report.results[2].message, "duplicate supplier")
+            table = report.table()
+            self.assertEqual(table["status"][0], IMPORTED)
+            self.assertEqual(table["attempts"][3], 1)
+
+            rerun = await DocumentImporter(api, journal, retry_delay=0).run([make_invoice("1")])
+        self.assertEqual(rerun.results[0].status, SKIPPED)
+        self.assertEqual(api.calls.count("1"), 1)
+
+    async def test_invalid_documents_do_not_block_the_batch(self) -> None:
+        api = FakeInvoicesApi()
+        broken = make_invoice("2", product=None)
+        report = await DocumentImporter(api, retry_delay=0).run(
+            [SimpleNamespace(document_number="x"), broken, make_invoice("2")]
+        )
+        self.assertEqual([result.status for result in report.results],
+                         [INVALID, INVALID, IMPORTED])
+        self.assertEqual(report.results[0].key, "SimpleNamespace|x|")
+        self.assertEqual(report.table()["document_number"], ["x", "2", "2"])
+        self.assertEqual(api.calls, ["2"])
+
+    async def test_transient_failures_are_retried(self) -> None:
+        api = FakeInvoicesApi(failures=2)
+        report = await DocumentImporter(api, retry_delay=0).run([make_invoice("1")])
+        self.assertEqual(report.results[0].status, IMPORTED)
+        self.assertEqual(report.results[0].attempts, 3)
+        self.assertEqual(report.results[0].key, document_key(make_invoice("1")))
+
+    async def test_retry_call_gives_up(self) -> None:
+        api = FakeInvoicesApi(failures=5)
+        with self.assertRaises(ApiException):
+            await retry_call(
+                lambda: api.documents_import_incoming_invoice_post(make_invoice("1")),
+                attempts=2, delay=0,
+            )
+        self.assertEqual(len(api.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
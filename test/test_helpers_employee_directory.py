@@ -0,0 +1,172 @@
+# coding: utf-8
+
+import unittest
+from datetime import date
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.helpers.employee_directory import (
+    EmployeeDirectory, RecordIndex, response_revision
+)
+from iikoserver_client.models.attendance_types_xml import AttendanceTypesXml
+from iikoserver_client.models.attendance_xml import AttendanceXml
+from iikoserver_client.models.attendances_xml import AttendancesXml
+from iikoserver_client.models.employee_roles_xml import EmployeeRolesXml
+from iikoserver_client.models.employees_xml import EmployeesXml
+from iikoserver_client.models.schedule_types_xml import ScheduleTypesXml
+from iikoserver_client.models.schedules_xml import SchedulesXml
+
+
+def attendance(id, employee, department, start, role=None, end=None):
+    return {
+        "id": id, "employeeId": employee, "departmentId": department,
+        "departmentName": department, "dateFrom": start, "dateTo": end, "roleId": role,
+    }
+
+
+class FakeEmployeesApi:
+
+    def __init__(self, attendance_pages, revision=None) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.attendance_pages = list(attendance_pages)
+        self.revision = revision
+        self.calls = []
+
+    async def employees_get(self, include_deleted=None):
+        return EmployeesXml.from_dict({"employees": [
+            {"id": "e1", "code": "1", "name": "Ann", "mainRoleId": "r1",
+             "departmentCodes": ["D1"]},
+            {"id": "e2", "code": "2", "name": "Bob"},
+        ]})
+
+    async def employees_roles_get(self):
+        return EmployeeRolesXml.from_dict(
+            {"role": [{"id": "r1", "code": "C", "name": "Cook"}]}
+        )
+
+    async def employees_attendance_types_get(self, include_deleted=None):
+        return AttendanceTypesXml.from_dict({"attendanceType": []})
+
+    async def employees_schedule_types_get(self):
+        return ScheduleTypesXml.from_dict({"employeeScheduleTypes": []})
+
+    def _raw(self):
+        if self.revision is None:
+            return b"<attendances/>"
+        return b'<attendances revision="%d"/>' % self.revision
+
+    async def employees_attendance_get_with_http_info(self, **kwargs):
+        self.calls.append(kwargs)
+        data = AttendancesXml.from_dict({"attendances": self.attendance_pages.pop(0)})
+        return SimpleNamespace(data=data, raw_data=self._raw())
+
+    async def employees_schedule_get_with_http_info(self, **kwargs):
+        data = SchedulesXml.from_dict({"schedule": [{
+            "id": "s1", "employeeId": "e1", "departmentId": "dep1",
+            "departmentName": "dep1", "dateFrom": "2024-01-02T09:00:00",
+        }]})
+        return SimpleNamespace(data=data, raw_data=self._raw())
+
+
+class TestEmployeeDirectory(unittest.IsolatedAsyncioTestCase):
+    """EmployeeDirectory unit tests"""
+
+    def test_response_revision(self) -> None:
+        self.assertEqual(response_revision(b'<?xml version="1.0"?><a revision="42"><b/></a>'), 42)
+        self.assertIsNone(response_revision(b"<a><b/></a>"))
+        self.assertIsNone(response_revision(b""))
+
+    def test_records_are_indexed_on_every_day_they_cover(self) -> None:
+        index = RecordIndex()
+        index.upsert(AttendanceXml.from_dict(attendance(
+            "night", "e1", "dep1", "2024-01-02T22:00:00", end="2024-01-03T06:00:00"
+        )))
+        index.upsert(AttendanceXml.from_dict(attendance(
+            "trip", "e2", "dep1", "2024-01-05T09:00:00", end="2024-01-08T00:00:00"
+        )))
+        days = {day: [record.id for record in index.select(day=day)]
+                for day in (date(2024, 1, d) for d in range(1, 10))}
+        self.assertEqual(days[date(2024, 1, 2)], ["night"])
+        self.assertEqual(days[date(2024, 1, 3)], ["night"])
+        self.assertEqual([days[date(2024, 1, d)] for d in (5, 6, 7)], [["trip"]] * 3)
+        self.assertEqual(days[date(2024, 1, 8)], [])
+
+        index.upsert(AttendanceXml.from_dict(attendance(
+            "trip", "e2", "dep1", "2024-01-05T09:00:00", end="2024-01-05T18:00:00"
+        )))
+        self.assertEqual(index.select(day=date(2024, 1, 6)), [])
+        index.discard("night")
+        self.assertEqual(index.select(day=date(2024, 1, 3)), [])
+
+    async def test_indexed_joins_and_incremental_refresh(self) -> None:
+        api = FakeEmployeesApi([
+            [
+                attendance("a1", "e1", "dep1", "2024-01-02T09:00:00"),
+                attendance("a2", "e2", "dep1", "2024-01-02T10:00:00", "r1"),
+                attendance("a3", "e1", "dep2", "2024-01-03T09:00:00"),
+            ],
+            [attendance("a3", "e1", "dep1", "2024-01-04T09:00:00")],
+        ], revision=7)
+        directory = await EmployeeDirectory.load(api, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(len(directory.employees), 2)
+        self.assertEqual(directory.attendance_revision, 7)
+        self.assertEqual(
+            [a.id for a in directory.attendances_for(department_id="dep1", day=date(2024, 1, 2))],
+            ["a1", "a2"],
+        )
+        self.assertEqual([a.id for a in directory.attendances_for(employee_id="e1")], ["a1", "a3"])
+        self.assertEqual(directory.role_of(directory.attendances.records["a1"]).name, "Cook")
+        self.assertEqual([e.id for e in directory.employees_in_department("D1")], ["e1", "e2"])
+
+        joined = directory.join(department_id="dep1", day=date(2024, 1, 2))
+        self.assertEqual(len(joined["e1"]["schedules"]), 1)
+        self.assertEqual(len(joined["e2"]["attendances"]), 1)
+
+        await directory.refresh(api)
+        self.assertEqual(api.calls[1]["revision_from"], 7)
+        self.assertEqual(len(directory.attendances), 3)
+        self.assertEqual(directory.attendances_for(department_id="dep2"), [])
+        self.assertEqual(
+            [a.id for a in directory.attendances_for(day=date(2024, 1, 4))], ["a3"]
+        )
+
+    async def test_refresh_without_revision_replaces_window(self) -> None:
+        api = FakeEmployeesApi([
+            [attendance("a1", "e1", "dep1", "2024-01-02T09:00:00")],
+            [attendance("a2", "e1", "dep1", "2024-01-02T09:00:00")],
+        ])
+        directory = await EmployeeDirectory.load(api, date(2024, 1, 1), date(2024, 1, 31))
+        await directory.refresh(api)
+        self.assertIsNone(api.calls[1]["revision_from"])
+        self.assertEqual(list(directory.attendances.records), ["a2"])
+
+    async def test_periodic_full_refresh_drops_deleted_records(self) -> None:
+        api = FakeEmployeesApi([
+            [attendance("a1", "e1", "dep1", "2024-01-02T09:00:00")],
+            [],
+            [attendance("a2", "e1", "dep1", "2024-01-02T09:00:00")],
+        ], revision=7)
+        directory = EmployeeDirectory(date(2024, 1, 1), date(2024, 1, 31), full_refresh_every=1)
+        for _ in range(3):
+            await directory.refresh(api)
+        self.assertEqual([call["revision_from"] for call in api.calls], [None, 7, None])
+        self.assertEqual(list(directory.attendances.records), ["a2"])
+
+    async def test_load_forwards_full_refresh_every(self) -> None:
+        api = FakeEmployeesApi([
+            [attendance("a1", "e1", "dep1", "2024-01-02T09:00:00")],
+            [],
+            [attendance("a2", "e1", "dep1", "2024-01-02T09:00:00")],
+        ], revision=7)
+        directory = await EmployeeDirectory.load(
+            api, date(2024, 1, 1), date(2024, 1, 31), full_refresh_every=1
+        )
+        self.assertEqual(directory.full_refresh_every, 1)
+        await directory.refresh(api)
+        await directory.refresh(api)
+        self.assertEqual([call["revision_from"] for call in api.calls], [None, 7, None])
+        self.assertEqual(list(directory.attendances.records), ["a2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
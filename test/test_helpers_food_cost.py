@@ -0,0 +1,78 @@
+# coding: utf-8
+
+import tempfile
+import unittest
+from datetime import date
+
+from aiohttp import web
+
+from iikoserver_client.api.reports_v1_api import ReportsV1Api
+from iikoserver_client.helpers.food_cost import (
+    INGREDIENT_ENTRY, PRODUCT_EXPENSE, FoodCostBatch, plan_food_cost
+)
+from test.local_server import local_api_client
+
+INGREDIENTS = (
+    b'<ingredientEntryDtoes><ingredientEntryDto><treeLevel>1</treeLevel>'
+    b'<product>flour</product><amountInMainUnit>0.25</amountInMainUnit>'
+    b'</ingredientEntryDto></ingredientEntryDtoes>'
+)
+
+EXPENSES = (
+    b'<dayDishValues><dayDishValue><date>01.01.2024</date><productId>flour</productId>'
+    b'<value>3</value></dayDishValue></dayDishValues>'
+)
+
+
+class TestFoodCostBatch(unittest.IsolatedAsyncioTestCase):
+    """FoodCostBatch unit tests"""
+
+    def test_plan_groups_requests(self) -> None:
+        periods = [(date(2024, 1, 1), date(2024, 1, 10)), (date(2024, 1, 11), date(2024, 1, 20)),
+                   (date(2024, 3, 1), date(2024, 3, 2))]
+        pieces = plan_food_cost(["D1"], ["pizza", "pasta"], periods, max_days=15)
+        expenses = [(p.date_from, p.date_to) for p in pieces if p.report == PRODUCT_EXPENSE]
+        self.assertEqual(expenses, [
+            (date(2024, 1, 1), date(2024, 1, 15)),
+            (date(2024, 1, 16), date(2024, 1, 20)),
+            (date(2024, 3, 1), date(2024, 3, 2)),
+        ])
+        self.assertEqual(len([p for p in pieces if p.report == INGREDIENT_ENTRY]), 6)
+
+    async def test_run_resumes_after_failure(self) -> None:
+        calls = {"ingredients": 0, "expenses": 0}
+
+        async def ingredient_entry(request):
+            calls["ingredients"] += 1
+            return web.Response(body=INGREDIENTS, content_type="application/xml")
+
+        async def product_expense(request):
+            calls["expenses"] += 1
+            if calls["expenses"] == 1:
+                return web.Response(status=503, text="busy")
+            return web.Response(body=EXPENSES, content_type="application/xml")
+
+        routes = [
+            web.get("/reports/ingredientEntry", ingredient_entry),
+            web.get("/reports/productExpense", product_expense),
+        ]
+        pieces = plan_food_cost(["D1"], ["pizza"], [(date(2024, 1, 1), date(2024, 1, 1))])
+        async with local_api_client(routes) as client:
+            api = ReportsV1Api(client)
+            with tempfile.TemporaryDirectory() as path:
+                first = await FoodCostBatch(path).run(api, pieces)
+                second = await FoodCostBatch(path).run(api, pieces)
+
+        self.assertEqual(list(first.failed), [pieces[1]])
+        self.assertEqual(first.ingredient_entries.num_rows, 1)
+        self.assertEqual(first.product_expenses.num_rows, 0)
+        self.assertEqual(calls, {"ingredients": 1, "expenses": 2})
+        self.assertFalse(second.failed)
+        self.assertEqual(second.ingredient_entries["dish"], ["pizza"])
+        self.assertEqual(list(second.ingredient_entries["amountInMainUnit"]), [0.25])
+        self.assertEqual(second.product_expenses["date"], [date(2024, 1, 1)])
+        self.assertEqual(list(second.product_expenses["value"]), [3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
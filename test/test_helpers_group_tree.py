@@ -0,0 +1,186 @@
+# coding: utf-8
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.group_tree import (
+    DesiredGroup, GroupTreeSync, plan_group_sync, sync_categories
+)
+from iikoserver_client.models.entity_dto import EntityDto
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.product_category_unit_response_scheme import (
+    ProductCategoryUnitResponseScheme
+)
+from iikoserver_client.models.product_group_dto import ProductGroupDto
+from iikoserver_client.models.product_group_unit_operation_response_scheme import (
+    ProductGroupUnitOperationResponseScheme
+)
+from iikoserver_client.models.products_and_groups_operation_response_scheme import (
+    ProductsAndGroupsOperationResponseScheme
+)
+
+
+def group(group_id: str, name: str, parent=None, deleted: bool = False) -> ProductGroupDto:
+    return ProductGroupDto(id=group_id, name=name, parent=parent, deleted=deleted)
+
+
+class FakeNomenclatureApi:
+
+    def __init__(self, groups, categories=()) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.groups = {item.id: item for item in groups}
+        self.categories = list(categories)
+        self.calls = []
+
+    async def v2_entities_products_group_list_get(self, include_deleted=None):
+        return list(self.groups.values())
+
+    async def v2_entities_products_group_save_post(self, product_group_save_dto=None):
+        await asyncio.sleep(0)
+        self.calls.append(("save", product_group_save_dto.name, product_group_save_dto.parent))
+        if product_group_save_dto.name == "Broken":
+            return ProductGroupUnitOperationResponseScheme(
+                result="ERROR", errors=[ErrorDto(code="E1", value="name is taken")]
+            )
+        created = ProductGroupDto.from_dict(dict(
+            product_group_save_dto.to_dict(), id="new-" + product_group_save_dto.name,
+            deleted=False,
+        ))
+        self.groups[created.id] = created
+        return ProductGroupUnitOperationResponseScheme(result="SUCCESS", response=created)
+
+    async def v2_entities_products_group_update_post(self, product_group_update_dto=None):
+        await asyncio.sleep(0)
+        update = product_group_update_dto
+        self.calls.append(("update", update.id, update.parent))
+        updated = ProductGroupDto.from_dict(dict(update.to_dict(), deleted=False))
+        self.groups[updated.id] = updated
+        return ProductGroupUnitOperationResponseScheme(result="SUCCESS", response=updated)
+
+    async def _set_deleted(self, name, scheme, deleted):
+        ids = [item.id for item in scheme.product_groups.items]
+        self.calls.append((name, sorted(ids)))
+        for group_id in ids:
+            self.groups[group_id] = self.groups[group_id].model_copy(update={"deleted": deleted})
+        return ProductsAndGroupsOperationResponseScheme(result="SUCCESS")
+
+    async def v2_entities_products_group_restore_post(
+        self, product_group_delete_restore_request_scheme=None
+    ):
+        scheme = product_group_delete_restore_request_scheme
+        return await self._set_deleted("restore", scheme, False)
+
+    async def v2_entities_products_group_delete_post(
+        self, product_group_delete_restore_request_scheme=None
+    ):
+        return await self._set_deleted("delete", product_group_delete_restore_request_scheme, True)
+
+    async def v2_entities_products_category_list_get(self, include_deleted=None):
+        return self.categories
+
+    async def _category(self, name, category_id):
+        self.calls.append((name, category_id))
+        if category_id == "new-Nameless":
+            return ProductCategoryUnitResponseScheme.model_construct(
+                result="SUCCESS", errors=None, response=None
+            )
+        return ProductCategoryUnitResponseScheme(
+            result="SUCCESS", response=EntityDto(id=category_id, name=name, deleted=False)
+        )
+
+    async def v2_entities_products_category_save_post(self, base_entity_dto=None):
+        return await self._category("save", "new-" + base_entity_dto.name)
+
+    async def v2_entities_products_category_restore_post(self, id_codet_dto=None):
+        return await self._category("restore", id_codet_dto.id)
+
+    async def v2_entities_products_category_delete_post(self, id_codet_dto=None):
+        return await self._category("delete", id_codet_dto.id)
+
+
+class TestGroupTree(unittest.IsolatedAsyncioTestCase):
+    """Group tree sync unit tests"""
+
+    def setUp(self) -> None:
+        self.live = [
+            group("g-food", "Food"),
+            group("g-hot", "Hot", "g-food"),
+            group("g-drinks", "Drinks", deleted=True),
+            group("g-old", "Old"),
+        ]
+
+    def test_plan_is_minimal_and_ordered(self) -> None:
+        plan = plan_group_sync(self.live, [
+            DesiredGroup("food", "Food"),
+            DesiredGroup("drinks", "Drinks"),
+            DesiredGroup("hot", "Hot", "drinks"),
+            DesiredGroup("tea", "Tea", "drinks"),
+        ], delete_missing=True)
+        self.assertEqual(plan.unchanged, 1)
+        self.assertEqual(plan.deletes, ["g-old"])
+        first, second = plan.levels
+        self.assertEqual([(item.key, item.group_id, item.restore) for item in first],
+                         [("drinks", "g-drinks", True)])
+        self.assertEqual(
+            {item.key: (item.group_id, item.changes.get("parent")) for item in second},
+            {"hot": ("g-hot", "drinks"), "tea": (None, "drinks")},
+        )
+
+    def test_plan_rejects_cycles(self) -> None:
+        with self.assertRaises(ApiValueError):
+            plan_group_sync([], [DesiredGroup("a", "A", "b"), DesiredGroup("b", "B", "a")])
+        with self.assertRaises(ApiValueError):
+            plan_group_sync([], [DesiredGroup("a", "A", "missing")])
+
+    async def test_sync_runs_parents_first(self) -> None:
+        api = FakeNomenclatureApi(self.live)
+        report = await GroupTreeSync(api).sync([
+            DesiredGroup("food", "Food"),
+            DesiredGroup("bar", "Bar"),
+            DesiredGroup("hot", "Hot", "bar"),
+            DesiredGroup("tea", "Tea", "bar"),
+        ], delete_missing=True)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.created, {"bar": "new-Bar", "tea": "new-Tea"})
+        self.assertEqual(report.updated, ["hot"])
+        self.assertEqual(report.deleted, ["g-old"])
+        self.assertEqual(api.calls[0], ("save", "Bar", None))
+        self.assertEqual(api.groups["g-hot"].parent, "new-Bar")
+        self.assertEqual(api.calls[-1], ("delete", ["g-old"]))
+
+    async def test_failed_parent_skips_children_and_deletes(self) -> None:
+        api = FakeNomenclatureApi(self.live)
+        report = await GroupTreeSync(api).sync([
+            DesiredGroup("broken", "Broken"),
+            DesiredGroup("child", "Child", "broken"),
+        ], delete_missing=True)
+        self.assertEqual(report.errors["broken"][0].code, "E1")
+        self.assertIn("child", report.skipped)
+        self.assertEqual(report.deleted, [])
+        self.assertFalse(any(call[0] == "delete" for call in api.calls))
+
+    async def test_sync_categories(self) -> None:
+        api = FakeNomenclatureApi([], [
+            EntityDto(id="c1", name="Bar", deleted=False),
+            EntityDto(id="c2", name="Kitchen", deleted=True),
+            EntityDto(id="c3", name="Old", deleted=False),
+        ])
+        report = await sync_categories(api, ["Bar", "Kitchen", "Pastry"], delete_missing=True)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.created, {"Pastry": "new-Pastry"})
+        self.assertEqual(report.restored, ["Kitchen"])
+        self.assertEqual(report.deleted, ["Old"])
+        self.assertEqual(len(api.calls), 3)
+
+    async def test_sync_categories_without_created_entity(self) -> None:
+        api = FakeNomenclatureApi([])
+        report = await sync_categories(api, ["Nameless"])
+        self.assertFalse(report.ok)
+        self.assertEqual((report.created, report.errors), ({}, {"Nameless": []}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+# coding: utf-8
+
+import asyncio
+import base64
+import hashlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiException, ApiValueError
+from iikoserver_client.helpers.image_store import ImageStore, decode_image, encode_image
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.id_codet_dto import IdCodetDto
+from iikoserver_client.models.id_list_dto import IdListDto
+from iikoserver_client.models.image_delete_response_scheme import ImageDeleteResponseScheme
+from iikoserver_client.models.image_dto import ImageDto
+from iikoserver_client.models.image_operation_response_scheme import (
+    ImageOperationResponseScheme
+)
+
+
+class FakeImagesApi:
+
+    def __init__(self) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.images = {}
+        self.uploads = 0
+        self.loads = 0
+        self.return_ids = True
+
+    async def v2_images_save_post(self, base_image_dto=None):
+        await asyncio.sleep(0)
+        self.uploads += 1
+        image_id = "image-{0}".format(self.uploads)
+        self.images[image_id] = base_image_dto.data
+        if not self.return_ids:
+            return ImageOperationResponseScheme.model_construct(result="SUCCESS", response=None)
+        return ImageOperationResponseScheme(
+            result="SUCCESS", response=ImageDto(id=image_id, data=base_image_dto.data)
+        )
+
+    async def v2_images_load_get(self, image_id):
+        await asyncio.sleep(0)
+        self.loads += 1
+        if image_id == "empty":
+            return ImageOperationResponseScheme(
+                result="SUCCESS", response=ImageDto.model_construct(id=image_id, data=None)
+            )
+        if image_id not in self.images:
+            return ImageOperationResponseScheme(
+                result="ERROR", errors=[ErrorDto(code="NOT_FOUND", value=image_id)],
+                response=ImageDto(id=image_id, data=""),
+            )
+        return ImageOperationResponseScheme(
+            result="SUCCESS", response=ImageDto(id=image_id, data=self.images[image_id])
+        )
+
+    async def v2_images_delete_post(self, id_list_dto=None):
+        ids = [item.id for item in id_list_dto.items if self.images.pop(item.id, None)]
+        return ImageDeleteResponseScheme(
+            result="SUCCESS", response=IdListDto(items=[IdCodetDto(id=item) for item in ids])
+        )
+
+
+class TestImageStore(unittest.IsolatedAsyncioTestCase):
+    """ImageStore unit tests"""
+
+    def test_chunked_base64_round_trip(self) -> None:
+        content = bytes(range(256)) * 101
+        text = encode_image(content, chunk_size=30)
+        self.assertEqual(text, base64.b64encode(content).decode("ascii"))
+        target = io.BytesIO()
+        decode_image(base64.encodebytes(content), target, chunk_size=40)
+        self.assertEqual(target.getvalue(), content)
+        with self.assertRaises(ValueError):
+            encode_image(content, chunk_size=10)
+
+    async def test_upload_dedupes_and_load_caches(self) -> None:
+        api = FakeImagesApi()
+        with tempfile.TemporaryDirectory() as directory:
+            photo = Path(directory) / "photo.jpg"
+            photo.write_bytes(b"\xff\xd8jpeg" * 1000)
+            store = ImageStore(api, Path(directory) / "cache")
+            results = await store.upload_many([photo, b"\xff\xd8jpeg" * 1000, b"other"])
+            self.assertEqual(api.uploads, 2)
+            self.assertEqual([result.image_id for result in results],
+                             ["image-1", "image-1", "image-2"])
+            self.assertEqual([result.uploaded for result in results], [True, False, True])
+
+            nightly = ImageStore(api, Path(directory) / "cache")
+            again = await nightly.upload(photo)
+            self.assertEqual((again.image_id, again.uploaded, api.uploads), ("image-1", False, 2))
+
+            loaded = await nightly.load_many(["missing", "image-2", "image-2"])
+            self.assertEqual(loaded.paths["image-2"].read_bytes(), b"other")
+            self.assertIsInstance(loaded.failures["missing"], ApiException)
+            await nightly.load("image-2")
+            self.assertEqual(api.loads, 2)
+            with self.assertRaises(ApiException):
+                await nightly.load("missing")
+            with self.assertRaises(ApiException):
+                await nightly.load("empty")
+            api.images["corrupt"] = "abc"
+            with self.assertRaises(ValueError):
+                await nightly.load("corrupt")
+            self.assertEqual(list(nightly.image_path("x").parent.iterdir()),
+                             [nightly.image_path("image-2")])
+
+            self.assertEqual(await nightly.delete(["image-2"]), ["image-2"])
+            self.assertFalse(nightly.image_path("image-2").exists())
+            self.assertTrue((await nightly.upload(b"other")).uploaded)
+
+    async def test_single_calls_persist_the_index(self) -> None:
+        api = FakeImagesApi()
+        with tempfile.TemporaryDirectory() as directory:
+            cache = Path(directory) / "cache"
+            await ImageStore(api, cache).upload(b"photo")
+            self.assertFalse((await ImageStore(api, cache).upload(b"photo")).uploaded)
+            self.assertEqual(api.uploads, 1)
+
+            api.images["image-9"] = base64.b64encode(b"loaded").decode("ascii")
+            await ImageStore(api, cache).load("image-9")
+            self.assertEqual(ImageStore(api, cache).hashes.get(
+                hashlib.sha256(b"loaded").hexdigest()), "image-9")
+
+            ImageStore(api, cache).forget("image-1")
+            self.assertTrue((await ImageStore(api, cache).upload(b"photo")).uploaded)
+
+    async def test_rejects_unsafe_ids_and_missing_responses(self) -> None:
+        api = FakeImagesApi()
+        with tempfile.TemporaryDirectory() as directory:
+            store = ImageStore(api, Path(directory) / "cache")
+            for image_id in ("../index.json", "a/b", "", ".."):
+                with self.assertRaises(ApiValueError):
+                    store.image_path(image_id)
+            loaded = await store.load_many(["../../outside"])
+            self.assertIsInstance(loaded.failures["../../outside"], ApiValueError)
+
+            api.return_ids = False
+            result = await store.upload(b"photo")
+            self.assertFalse(result.ok)
+            self.assertIsInstance(result.error, ApiException)
+            self.assertEqual(store.hashes, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# coding: utf-8
+
+import math
+import unittest
+from array import array
+from datetime import date, datetime
+
+from aiohttp import web
+
+from iikoserver_client.api.reports_v1_api import ReportsV1Api
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.income_plan import fetch_income_plan, plan_vs_actual
+from test.local_server import local_api_client
+
+PLAN = (
+    b'<budgetPlanItemDtoes>'
+    b'<budgetPlanItemDto><date>2024-01-31T00:00:00</date><planValue>100</planValue>'
+    b'<valueType>ABSOLUTE</valueType></budgetPlanItemDto>'
+    b'<budgetPlanItemDto><date>2024-02-01T00:00:00</date><planValue>200</planValue>'
+    b'<valueType>ABSOLUTE</valueType></budgetPlanItemDto>'
+    b'</budgetPlanItemDtoes>'
+)
+
+
+class TestIncomePlan(unittest.IsolatedAsyncioTestCase):
+    """Income plan helpers unit tests"""
+
+    async def test_plan_vs_actual(self) -> None:
+        departments = []
+
+        async def income_plan(request):
+            departments.append(request.query["department"])
+            return web.Response(body=PLAN, content_type="application/xml")
+
+        routes = [web.get("/reports/monthlyIncomePlan", income_plan)]
+        async with local_api_client(routes) as client:
+            plan = await fetch_income_plan(
+                ReportsV1Api(client), ["D1"], date(2024, 1, 1), date(2024, 2, 29)
+            )
+        self.assertEqual(departments, ["D1"])
+        self.assertEqual(plan["value_type"], ["ABSOLUTE", "ABSOLUTE"])
+
+        actual = ColumnTable({
+            "department": ["D1", "D1", "D1", "D1"],
+            "date": [datetime(2024, 1, 30, 12), datetime(2024, 1, 31, 10),
+                     datetime(2024, 1, 31, 20), datetime(2024, 2, 1, 9)],
+            "value": array("d", [10.0, 60.0, 30.0, 50.0]),
+        })
+        result = plan_vs_actual(plan, actual)
+        self.assertEqual(result["date"], [date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1)])
+        self.assertTrue(math.isnan(result["plan"][0]))
+        self.assertEqual(list(result["actual"]), [10.0, 90.0, 50.0])
+        self.assertEqual(list(result["plan_to_date"]), [0.0, 100.0, 200.0])
+        self.assertEqual(list(result["actual_to_date"]), [10.0, 100.0, 50.0])
+        self.assertTrue(math.isnan(result["execution_percent"][0]))
+        self.assertEqual(list(result["execution_percent"][1:]), [100.0, 25.0])
+
+    def test_plan_vs_actual_sums_one_value_type(self) -> None:
+        plan = ColumnTable({
+            "department": ["D1", "D1", "D1"],
+            "date": [date(2024, 1, 31)] * 3,
+            "plan_value": array("d", [100.0, 15.0, 40.0]),
+            "value_type": ["ABSOLUTE", "PERCENT", "SEASONAL"],
+        })
+        actual = ColumnTable({
+            "department": ["D1"], "date": [date(2024, 1, 31)], "value": array("d", [50.0]),
+        })
+        self.assertEqual(list(plan_vs_actual(plan, actual)["plan"]), [100.0])
+        self.assertEqual(list(plan_vs_actual(plan, actual, value_type="PERCENT")["plan"]),
+                         [15.0])
+        self.assertEqual(list(plan_vs_actual(plan, actual, value_type="SEASONAL")["plan"]),
+                         [40.0])
+
+    def test_plan_vs_actual_without_department(self) -> None:
+        plan = ColumnTable({
+            "department": ["D1", None],
+            "date": [date(2024, 1, 31), date(2024, 1, 30)],
+            "plan_value": array("d", [100.0, 10.0]),
+            "value_type": ["ABSOLUTE", "ABSOLUTE"],
+        })
+        actual = ColumnTable({
+            "department": [None, "D1"],
+            "date": [date(2024, 1, 31), date(2024, 1, 31)],
+            "value": array("d", [5.0, 50.0]),
+        })
+        result = plan_vs_actual(plan, actual)
+        self.assertEqual(list(zip(result["department"], result["date"])), [
+            ("D1", date(2024, 1, 31)), (None, date(2024, 1, 30)), (None, date(2024, 1, 31)),
+        ])
+        self.assertEqual(list(result["plan_to_date"]), [100.0, 10.0, 10.0])
+        self.assertEqual(list(result["actual_to_date"]), [50.0, 0.0, 5.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
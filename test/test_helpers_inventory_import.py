@@ -0,0 +1,177 @@
+# coding: utf-8
+
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.helpers.inventory_import import InventoryWorkflow
+from iikoserver_client.models.id_code_name_dto import IdCodeNameDto
+from iikoserver_client.models.incoming_inventory_item_xml import IncomingInventoryItemXml
+from iikoserver_client.models.incoming_inventory_validation_result_item_xml import (
+    IncomingInventoryValidationResultItemXml
+)
+from iikoserver_client.models.incoming_inventory_validation_result_xml import (
+    IncomingInventoryValidationResultXml
+)
+from iikoserver_client.models.incoming_inventory_validation_result_xml_items import (
+    IncomingInventoryValidationResultXmlItems
+)
+from iikoserver_client.models.incoming_inventory_xml import IncomingInventoryXml
+from iikoserver_client.models.incoming_inventory_xml_items import IncomingInventoryXmlItems
+
+
+def make_inventory(amounts, store="store-1") -> IncomingInventoryXml:
+    return IncomingInventoryXml(
+        documentNumber="inv-1",
+        storeId=store,
+        items=IncomingInventoryXmlItems(item=[
+            IncomingInventoryItemXml(productId=product, amountContainer=amount)
+            for product, amount in amounts
+        ]),
+    )
+
+
+class FakeDocumentsApi:
+
+    def __init__(self) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.checked = []
+        self.imported = []
+
+    async def documents_check_incoming_inventory_post(self, document):
+        products = [item.product_id for item in document.items.item]
+        self.checked.append(products)
+        if document.store_id == "missing":
+            return IncomingInventoryValidationResultXml(
+                valid=False, documentNumber="inv-1", otherSuggestedNumber=None,
+                errorMessage="unknown store",
+            )
+        if any((product or "").startswith("broken") for product in products):
+            return IncomingInventoryValidationResultXml(
+                valid=False, documentNumber="inv-1", otherSuggestedNumber=None,
+                errorMessage="unknown product",
+            )
+        return IncomingInventoryValidationResultXml(
+            valid=True,
+            documentNumber="inv-1",
+            otherSuggestedNumber=None,
+            items=IncomingInventoryValidationResultXmlItems(item=[
+                IncomingInventoryValidationResultItemXml(
+                    product=IdCodeNameDto(
+                        id=item.product_id or "id-" + item.product_article,
+                        code=item.product_article or (item.product_id or "").upper(),
+                    ),
+                    expectedAmount=1,
+                    expectedSum=10,
+                    actualAmount=item.amount_container,
+                    differenceAmount=item.amount_container - 1,
+                    differenceSum=0,
+                )
+                for item in document.items.item
+            ]),
+        )
+
+    async def documents_import_incoming_inventory_post(self, document):
+        self.imported.append([item.product_id for item in document.items.item])
+        return IncomingInventoryValidationResultXml(
+            valid=True, documentNumber="inv-1", otherSuggestedNumber=None
+        )
+
+
+class TestInventoryWorkflow(unittest.IsolatedAsyncioTestCase):
+    """InventoryWorkflow unit tests"""
+
+    async def test_check_isolates_failing_lines(self) -> None:
+        api = FakeDocumentsApi()
+        workflow = InventoryWorkflow(api, chunk_size=4, retry_delay=0)
+        document = make_inventory([("a", 1), ("b", 2), ("broken", 3), ("c", 4), ("d", 5)])
+        check = await workflow.check(document, limit=1)
+        self.assertEqual(check.errors, {2: "unknown product"})
+        self.assertEqual(sorted(check.results), [0, 1, 3, 4])
+        self.assertEqual(check.results[1].difference_amount, 1)
+        self.assertEqual((check.checked, check.cached), (5, 0))
+        self.assertFalse(check.valid)
+
+        result = await workflow.import_document(document)
+        self.assertTrue(result.result.valid)
+        self.assertEqual(api.imported, [["a", "b", "c", "d"]])
+        # only the failing line is checked again
+        self.assertEqual(api.checked[-1], ["broken"])
+
+    async def test_recheck_sends_changed_lines_only(self) -> None:
+        api = FakeDocumentsApi()
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "inventory.json")
+            await InventoryWorkflow(api, cache_path=cache_path).check(
+                make_inventory([("a", 1), ("b", 2), ("c", 3)])
+            )
+            workflow = InventoryWorkflow(api, cache_path=cache_path)
+            check = await workflow.check(make_inventory([("a", 1), ("b", 7), ("c", 3)]))
+        self.assertEqual(api.checked, [["a", "b", "c"], ["b"]])
+        self.assertEqual((check.checked, check.cached), (1, 2))
+        self.assertTrue(check.valid)
+        self.assertEqual(check.results[0].actual_amount, 1)
+
+    async def test_document_error_stops_splitting(self) -> None:
+        api = FakeDocumentsApi()
+        workflow = InventoryWorkflow(api, chunk_size=8, retry_delay=0)
+        document = make_inventory([(str(index), 1) for index in range(8)], store="missing")
+        result = await workflow.import_document(document)
+        # the whole chunk, its halves and the header without lines
+        self.assertEqual(len(api.checked), 4)
+        self.assertEqual(api.checked[-1], [])
+        self.assertEqual(list(result.check.document_errors), ["unknown store"])
+        self.assertEqual((result.check.results, result.check.errors), ({}, {}))
+        self.assertFalse(result.check.valid)
+        self.assertIsNone(result.result)
+        self.assertEqual(api.imported, [])
+
+    async def test_bad_lines_sharing_a_message_are_not_a_document_error(self) -> None:
+        api = FakeDocumentsApi()
+        workflow = InventoryWorkflow(api, chunk_size=4, retry_delay=0)
+        pair = await workflow.check(make_inventory([("broken-1", 1), ("broken-2", 2)]))
+        self.assertEqual(pair.errors, {0: "unknown product", 1: "unknown product"})
+        self.assertEqual(list(pair.document_errors), [])
+        halves = await workflow.check(
+            make_inventory([("a", 1), ("broken-3", 2), ("b", 3), ("broken-4", 4)])
+        )
+        self.assertEqual(halves.errors, {1: "unknown product", 3: "unknown product"})
+        self.assertEqual(sorted(halves.results), [0, 2])
+        self.assertEqual(list(halves.document_errors), [])
+
+    async def test_lines_match_results_by_id_or_article(self) -> None:
+        api = FakeDocumentsApi()
+        document = make_inventory([("a", 1)])
+        document.items.item.append(
+            IncomingInventoryItemXml(productArticle="a", amountContainer=5)
+        )
+        check = await InventoryWorkflow(api).check(document)
+        self.assertEqual(check.results[0].actual_amount, 1)
+        self.assertEqual(check.results[1].actual_amount, 5)
+
+    async def test_cached_results_expire(self) -> None:
+        api = FakeDocumentsApi()
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "inventory.json")
+            await InventoryWorkflow(api, cache_path=cache_path).check(make_inventory([("a", 1)]))
+            with open(cache_path, encoding="utf-8") as stream:
+                entries = json.load(stream)
+            for entry in entries.values():
+                entry["checked_at"] -= 3600
+            with open(cache_path, "w", encoding="utf-8") as stream:
+                json.dump(entries, stream)
+            kept = await InventoryWorkflow(api, cache_path=cache_path, ttl=None).check(
+                make_inventory([("a", 1)])
+            )
+            expired = await InventoryWorkflow(api, cache_path=cache_path).check(
+                make_inventory([("a", 1)])
+            )
+        self.assertEqual((kept.cached, expired.checked), (1, 1))
+        self.assertEqual(len(api.checked), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
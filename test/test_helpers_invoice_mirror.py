@@ -0,0 +1,192 @@
+# coding: utf-8
+
+import math
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from aiohttp import web
+
+from iikoserver_client.api.invoices_management_api import InvoicesManagementApi
+from iikoserver_client.helpers.invoice_mirror import INCOMING, OUTGOING, InvoiceMirror
+from iikoserver_client.models.incoming_invoice_xml import IncomingInvoiceXml
+from test.local_server import local_api_client
+
+
+def invoice(document_id: str, amount: str) -> str:
+    return (
+        "<document><id>{0}</id><documentNumber>N-{0}</documentNumber>"
+        "<dateIncoming>2024-01-02T10:00:00</dateIncoming><items>"
+        "<item><num>1</num><product>p1</product><amount>{1}</amount><sum>10</sum></item>"
+        "<item><num>2</num><product>p2</product><amount>1</amount><sum>5</sum></item>"
+        "</items></document>"
+    ).format(document_id, amount)
+
+
+def outgoing_invoice(document_id: str, amount: str) -> str:
+    return (
+        "<document><id>{0}</id><documentNumber>O-{0}</documentNumber>"
+        "<dateIncoming>2024-01-03T12:00:00</dateIncoming><items>"
+        "<item><productId>p1</productId><price>5</price><amount>{1}</amount><sum>10</sum>"
+        "</item></items></document>"
+    ).format(document_id, amount)
+
+
+RESPONSES = [
+    '<incomingInvoiceDtoes revision="10">{0}{1}</incomingInvoiceDtoes>'.format(
+        invoice("d1", "2"), invoice("d2", "3")
+    ),
+    '<incomingInvoiceDtoes revision="12">{0}{1}</incomingInvoiceDtoes>'.format(
+        invoice("d1", "2"), invoice("d2", "4")
+    ),
+    '<incomingInvoiceDtoes revision="15"></incomingInvoiceDtoes>',
+]
+
+
+def serve(path: str, responses, queries):
+    """Route answering with `responses` in turn, repeating the last one."""
+
+    async def export(request):
+        queries.append(request.query)
+        body = responses[min(len(queries), len(responses)) - 1]
+        return web.Response(text=body, content_type="application/xml")
+
+    return web.get(path, export)
+
+
+class TestInvoiceMirror(unittest.IsolatedAsyncioTestCase):
+    """InvoiceMirror unit tests"""
+
+    async def test_sync_upserts_changed_invoices(self) -> None:
+        queries = []
+        routes = [serve("/documents/export/incomingInvoice", RESPONSES, queries)]
+        with tempfile.TemporaryDirectory() as directory:
+            async with local_api_client(routes) as api_client:
+                api = InvoicesManagementApi(api_client)
+                mirror = InvoiceMirror(directory)
+                first = await mirror.sync(
+                    api, INCOMING, date(2024, 1, 1), date(2024, 1, 31), ["s1"]
+                )
+                second = await InvoiceMirror(directory).sync(
+                    api, INCOMING, date(2024, 1, 1), date(2024, 1, 31), ["s1"]
+                )
+                empty = await InvoiceMirror(directory).sync(
+                    api, INCOMING, date(2024, 1, 1), date(2024, 1, 31), ["s1"]
+                )
+                await InvoiceMirror(directory).sync(
+                    api, INCOMING, date(2024, 2, 1), date(2024, 2, 29), ["s1"]
+                )
+            reloaded = InvoiceMirror(directory)
+            items = reloaded.items(INCOMING)
+            document = reloaded.get(INCOMING, "d2")
+            documents = list(reloaded.documents(INCOMING))
+
+        self.assertEqual((first.inserted, first.updated, first.unchanged), (2, 0, 0))
+        self.assertEqual((second.inserted, second.updated, second.unchanged), (0, 1, 1))
+        self.assertEqual(second.revision, 12)
+        self.assertNotIn("revisionFrom", queries[0])
+        self.assertEqual(queries[1]["revisionFrom"], "10")
+        self.assertEqual(queries[1]["supplierId"], "s1")
+        self.assertEqual((empty.inserted, empty.updated, empty.revision), (0, 0, 15))
+        self.assertNotIn("revisionFrom", queries[3])
+        self.assertEqual(reloaded.cursors, {
+            "incoming|2024-01-01|2024-01-31|s1": 15, "incoming|2024-02-01|2024-02-29|s1": 15,
+        })
+
+        self.assertEqual(len(documents), 2)
+        self.assertEqual(document.items.item[0].amount, 4)
+        self.assertEqual(len(items), 4)
+        rows = [row for row in zip(items["documentId"], items["num"], items["amount"])]
+        self.assertIn(("d2", 1, 4.0), rows)
+        self.assertNotIn(("d2", 1, 3.0), rows)
+        self.assertTrue(math.isnan(items["vatSum"][0]))
+
+    async def test_unchanged_invoices_are_skipped_by_hash(self) -> None:
+        queries = []
+        routes = [serve("/documents/export/incomingInvoice", RESPONSES[:1], queries)]
+        with tempfile.TemporaryDirectory() as directory:
+            async with local_api_client(routes) as api_client:
+                api = InvoicesManagementApi(api_client)
+                await InvoiceMirror(directory).sync(
+                    api, INCOMING, date(2024, 1, 1), date(2024, 1, 31)
+                )
+                mirror = InvoiceMirror(directory)
+                with mock.patch.object(
+                    IncomingInvoiceXml, "from_xml_element", side_effect=AssertionError
+                ):
+                    again = await mirror.sync(
+                        api, INCOMING, date(2024, 1, 1), date(2024, 1, 31)
+                    )
+            self.assertEqual((again.inserted, again.updated, again.unchanged), (0, 0, 2))
+            self.assertEqual(len(mirror.items(INCOMING)), 4)
+            self.assertEqual(mirror.get(INCOMING, "d2").items.item[0].amount, 3)
+
+    async def test_cursors_are_kept_per_kind_window_and_suppliers(self) -> None:
+        queries = []
+        routes = [serve("/documents/export/incomingInvoice", RESPONSES[:1], queries)]
+        january = (date(2024, 1, 1), date(2024, 1, 31))
+        with tempfile.TemporaryDirectory() as directory:
+            async with local_api_client(routes) as api_client:
+                api = InvoicesManagementApi(api_client)
+                mirror = InvoiceMirror(directory)
+                await mirror.sync(api, INCOMING, *january, ["s1", "s2"])
+                await mirror.sync(api, INCOMING, *january, ["s3"])
+                await mirror.sync(api, INCOMING, *january)
+                await mirror.sync(api, INCOMING, date(2024, 2, 1), date(2024, 2, 29), ["s3"])
+                await mirror.sync(api, INCOMING, *january, ["s2", "s1"])
+            reloaded = InvoiceMirror(directory)
+        self.assertEqual(["revisionFrom" in query for query in queries],
+                         [False, False, False, False, True])
+        self.assertEqual(queries[4]["revisionFrom"], "10")
+        self.assertEqual(sorted(reloaded.cursors), [
+            "incoming|2024-01-01|2024-01-31",
+            "incoming|2024-01-01|2024-01-31|s1|s2",
+            "incoming|2024-01-01|2024-01-31|s3",
+            "incoming|2024-02-01|2024-02-29|s3",
+        ])
+        self.assertNotEqual(InvoiceMirror.cursor_key(INCOMING, *january),
+                            InvoiceMirror.cursor_key(OUTGOING, *january))
+
+    async def test_outgoing_invoices_are_downloaded_again_and_diffed(self) -> None:
+        queries = []
+        responses = [
+            "<outgoingInvoiceDtoes>{0}{1}</outgoingInvoiceDtoes>".format(
+                outgoing_invoice("o1", "1"), outgoing_invoice("o2", "2")
+            ),
+            "<outgoingInvoiceDtoes>{0}{1}</outgoingInvoiceDtoes>".format(
+                outgoing_invoice("o1", "1"), outgoing_invoice("o2", "2")
+            ),
+            "<outgoingInvoiceDtoes>{0}{1}</outgoingInvoiceDtoes>".format(
+                outgoing_invoice("o1", "1"), outgoing_invoice("o2", "6")
+            ),
+        ]
+        routes = [serve("/documents/export/outgoingInvoice", responses, queries)]
+        with tempfile.TemporaryDirectory() as directory:
+            async with local_api_client(routes) as api_client:
+                api = InvoicesManagementApi(api_client)
+                results = [
+                    await InvoiceMirror(directory).sync(
+                        api, OUTGOING, date(2024, 1, 1), date(2024, 1, 31), ["c1"]
+                    )
+                    for _ in responses
+                ]
+            reloaded = InvoiceMirror(directory)
+            items = reloaded.items(OUTGOING)
+            document = reloaded.get(OUTGOING, "o2")
+        self.assertEqual(
+            [(result.inserted, result.updated, result.unchanged, result.revision)
+             for result in results],
+            [(2, 0, 0, None), (0, 0, 2, None), (0, 1, 1, None)],
+        )
+        self.assertTrue(all("revisionFrom" not in query for query in queries))
+        self.assertEqual(queries[0]["supplierId"], "c1")
+        self.assertEqual(reloaded.cursors, {})
+        self.assertEqual(document.items.item[0].amount, 6)
+        self.assertEqual(sorted(zip(items["documentId"], items["amount"])),
+                         [("o1", 1.0), ("o2", 6.0)])
+        self.assertEqual(list(items["price"]), [5.0, 5.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# coding: utf-8
+
+import math
+import unittest
+from array import array
+from datetime import date
+
+from aiohttp import web
+
+from iikoserver_client.api.reports_v1_api import ReportsV1Api
+from iikoserver_client.exceptions import ApiException
+from iikoserver_client.helpers.olap import (
+    fetch_olap_v1, olap_v1_request_params, olap_v2_table, parse_olap_v1
+)
+from iikoserver_client.helpers.xml_stream import iter_xml_records
+from iikoserver_client.models.olap_column_info import OlapColumnInfo
+from iikoserver_client.models.olap_report_type_enum import OlapReportTypeEnum
+from iikoserver_client.models.olap_v2_response import OlapV2Response
+from test.local_server import local_api_client
+
+
+def column_info(**types):
+    return {
+        name: OlapColumnInfo(
+            name=name, type=type, aggregationAllowed=True, groupingAllowed=True,
+            filteringAllowed=True, tags=[],
+        )
+        for name, type in types.items()
+    }
+
+
+REPORT = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n<report>'
+    b'<r><Department>Main</Department><OpenDate>2024-01-02</OpenDate>'
+    b'<DishAmountInt>3</DishAmountInt><DishSumInt>150.5</DishSumInt></r>'
+    b'<r><Department>Main</Department><OpenDate>2024-01-03</OpenDate>'
+    b'<DishSumInt>99</DishSumInt><Extra>x</Extra></r>'
+    b'</report>'
+)
+
+INFO = column_info(
+    OpenDate="DATE", DishAmountInt="INTEGER", DishSumInt="MONEY", Department="STRING"
+)
+
+
+class TestOlapHelpers(unittest.IsolatedAsyncioTestCase):
+    """OLAP parsing helpers unit tests"""
+
+    def test_iter_xml_records_across_chunks(self) -> None:
+        chunks = [REPORT[i:i + 7] for i in range(0, len(REPORT), 7)]
+        tags = [[child.tag for child in record] for record in iter_xml_records(chunks)]
+        self.assertEqual(len(tags), 2)
+        self.assertEqual(tags[1], ["Department", "OpenDate", "DishSumInt", "Extra"])
+
+    def test_parse_olap_v1_types_columns(self) -> None:
+        table = parse_olap_v1(REPORT, INFO)
+        self.assertEqual(
+            table.column_names,
+            ["Department", "OpenDate", "DishAmountInt", "DishSumInt", "Extra"],
+        )
+        self.assertEqual(table["OpenDate"], [date(2024, 1, 2), date(2024, 1, 3)])
+        self.assertIsInstance(table["DishSumInt"], array)
+        self.assertEqual(list(table["DishSumInt"]), [150.5, 99.0])
+        # Integer column with a gap falls back to a list with None
+        self.assertEqual(table["DishAmountInt"], [3, None])
+        self.assertEqual(table["Extra"], [None, "x"])
+        self.assertIs(table["Department"][0], table["Department"][1])
+
+    def test_fractional_integer_values_widen_to_float(self) -> None:
+        report = (
+            b'<report><r><DishAmountInt>2</DishAmountInt></r>'
+            b'<r><DishAmountInt>1.5</DishAmountInt></r>'
+            b'<r><DishAmountInt>3.0</DishAmountInt></r></report>'
+        )
+        table = parse_olap_v1(report, column_info(DishAmountInt="INTEGER"))
+        self.assertIsInstance(table["DishAmountInt"], array)
+        self.assertEqual(list(table["DishAmountInt"]), [2.0, 1.5, 3.0])
+
+    def test_olap_v2_table(self) -> None:
+        response = OlapV2Response(
+            data=[{"OpenDate.Typed": "2024-01-02", "DishSumInt": 10},
+                  {"OpenDate.Typed": "2024-01-03"}],
+            summary=[],
+        )
+        table = olap_v2_table(response, column_info(**{
+            "OpenDate.Typed": "DATE", "DishSumInt": "MONEY"
+        }))
+        self.assertEqual(table["OpenDate.Typed"], [date(2024, 1, 2), date(2024, 1, 3)])
+        self.assertEqual(table["DishSumInt"][0], 10.0)
+        self.assertTrue(math.isnan(table["DishSumInt"][1]))
+
+
+class TestOlapV1Streaming(unittest.IsolatedAsyncioTestCase):
+    """fetch_olap_v1 against a local HTTP server"""
+
+    async def asyncSetUp(self) -> None:
+        self.requests = []
+
+        async def olap(request):
+            self.requests.append(request.query)
+            if request.query.get("report") == "STOCK":
+                return web.Response(status=400, text="bad report")
+            return web.Response(body=REPORT, content_type="application/xml")
+
+        server = local_api_client([web.get("/reports/olap", olap)], max_concurrent_requests=1)
+        self.client = await server.__aenter__()
+        self.addAsyncCleanup(server.__aexit__, None, None, None)
+        self.api = ReportsV1Api(self.client)
+
+    async def test_fetch_streams_rows(self) -> None:
+        table = await fetch_olap_v1(
+            self.api, OlapReportTypeEnum.SALES, date(2024, 1, 1), date(2024, 1, 31),
+            group_row=["Department", "OpenDate"], agr=["DishSumInt"], column_info=INFO,
+        )
+        self.assertEqual(self.requests[0]["from"], "01.01.2024")
+        self.assertEqual(self.requests[0].getall("groupRow"), ["Department", "OpenDate"])
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(list(table["DishSumInt"]), [150.5, 99.0])
+        self.assertEqual(self.client.request_semaphore._value, 1)
+
+    async def test_report_by_name(self) -> None:
+        params = olap_v1_request_params(self.api, "SALES", "01.01.2024", "02.01.2024")
+        self.assertIn("report=SALES", params[1])
+        table = await fetch_olap_v1(self.api, "SALES", "01.01.2024", "02.01.2024")
+        self.assertEqual(self.requests[0]["report"], "SALES")
+        self.assertEqual(table.num_rows, 2)
+        with self.assertRaises(ValueError):
+            olap_v1_request_params(self.api, "UNKNOWN", "01.01.2024", "02.01.2024")
+
+    async def test_fetch_raises_on_error_status(self) -> None:
+        with self.assertRaises(ApiException) as context:
+            await fetch_olap_v1(
+                self.api, OlapReportTypeEnum.STOCK, "01.01.2024", "02.01.2024"
+            )
+        self.assertEqual(context.exception.status, 400)
+        self.assertEqual(self.client.request_semaphore._value, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
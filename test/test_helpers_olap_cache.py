@@ -0,0 +1,125 @@
+# coding: utf-8
+
+import tempfile
+import unittest
+from datetime import date
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.olap_cache import (
+    OlapCache, olap_request_days, olap_request_key
+)
+from iikoserver_client.models.olap_column_info import OlapColumnInfo
+from iikoserver_client.models.olap_v2_request import OlapV2Request
+from iikoserver_client.models.olap_v2_response import OlapV2Response
+
+INFO = {
+    name: OlapColumnInfo(
+        name=name, type=type, aggregationAllowed=True, groupingAllowed=True,
+        filteringAllowed=True, tags=[],
+    )
+    for name, type in [("OpenDate.Typed", "DATE"), ("Department", "STRING"),
+                       ("DishSumInt", "MONEY")]
+}
+
+
+def sales_request(date_from="2024-01-01", date_to="2024-01-03", **kwargs):
+    fields = dict(
+        reportType="SALES",
+        groupByRowFields=["OpenDate.Typed", "Department"],
+        aggregateFields=["DishSumInt"],
+        filters={
+            "OpenDate.Typed": {"filterType": "DateRange", "periodType": "CUSTOM",
+                               "from": date_from, "to": date_to, "includeHigh": True},
+            "Department": {"filterType": "IncludeValues", "values": ["B", "A"]},
+        },
+    )
+    fields.update(kwargs)
+    return OlapV2Request.from_dict(fields)
+
+
+class FakeReportsV2Api:
+
+    def __init__(self):
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.days = []
+
+    async def v2_reports_olap_columns_get(self, report_type):
+        return INFO
+
+    async def v2_reports_olap_post(self, olap_v2_request):
+        day = olap_v2_request.filters["OpenDate.Typed"].var_from
+        self.days.append(day)
+        return OlapV2Response(
+            data=[{"OpenDate.Typed": day, "Department": "A", "DishSumInt": 10.0}], summary=[]
+        )
+
+
+class TestOlapCache(unittest.IsolatedAsyncioTestCase):
+    """OlapCache unit tests"""
+
+    def test_request_key_is_canonical(self) -> None:
+        request = sales_request()
+        reordered = sales_request(
+            date_from="2023-05-01",
+            groupByRowFields=["Department", "OpenDate.Typed"],
+            filters={
+                "Department": {"filterType": "IncludeValues", "values": ["A", "B"]},
+                "OpenDate.Typed": {"filterType": "DateRange", "periodType": "CUSTOM",
+                                   "from": "2023-05-01", "to": "2023-05-02"},
+            },
+        )
+        self.assertEqual(
+            olap_request_key(request, "OpenDate.Typed"),
+            olap_request_key(reordered, "OpenDate.Typed"),
+        )
+        self.assertNotEqual(
+            olap_request_key(request, "OpenDate.Typed"),
+            olap_request_key(sales_request(aggregateFields=["DishAmountInt"]), "OpenDate.Typed"),
+        )
+
+    def test_request_days(self) -> None:
+        self.assertEqual(
+            olap_request_days(sales_request(), "OpenDate.Typed"),
+            [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)],
+        )
+        with self.assertRaises(ApiValueError):
+            olap_request_days(sales_request(), "Department")
+
+    async def test_fetch_reuses_closed_days(self) -> None:
+        api = FakeReportsV2Api()
+        with tempfile.TemporaryDirectory() as path:
+            cache = OlapCache(path)
+            closed_before = date(2024, 1, 3)
+            table = await cache.fetch(
+                api, sales_request(), "OpenDate.Typed", closed_before=closed_before
+            )
+            self.assertEqual(
+                table["OpenDate.Typed"],
+                [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)],
+            )
+            self.assertEqual(len(api.days), 3)
+
+            api.days.clear()
+            again = await cache.fetch(
+                api, sales_request(), "OpenDate.Typed", closed_before=closed_before
+            )
+            self.assertEqual(api.days, ["2024-01-03"])
+            self.assertEqual(again.to_pydict(), table.to_pydict())
+            self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+            self.assertEqual(cache.invalidate(sales_request(), "OpenDate.Typed"), 2)
+
+    async def test_fetch_rejects_requests_not_grouped_by_day(self) -> None:
+        api = FakeReportsV2Api()
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaises(ApiValueError):
+                await OlapCache(path).fetch(
+                    api, sales_request(groupByRowFields=["Department"]), "OpenDate.Typed",
+                )
+        self.assertEqual(api.days, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# coding: utf-8
+
+import unittest
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.olap_planner import (
+    fetch_olap_wide, olap_request_fields, plan_olap_request
+)
+from iikoserver_client.models.olap_column_info import OlapColumnInfo
+from iikoserver_client.models.olap_v2_request import OlapV2Request
+from iikoserver_client.models.olap_v2_response import OlapV2Response
+
+AGGREGATES = ["Sum{0}".format(i) for i in range(8)]
+
+INFO = {
+    name: OlapColumnInfo(
+        name=name, type=type, aggregationAllowed=type == "MONEY",
+        groupingAllowed=type != "MONEY", filteringAllowed=True, tags=[],
+    )
+    for name, type in [("Department", "STRING"), ("OpenDate", "DATE"),
+                       ("DishName", "STRING")] + [(name, "MONEY") for name in AGGREGATES]
+}
+
+
+def wide_request(**kwargs):
+    fields = dict(
+        reportType="SALES", buildSummary=True,
+        groupByRowFields=["Department", "OpenDate", "DishName"],
+        aggregateFields=AGGREGATES,
+    )
+    fields.update(kwargs)
+    return OlapV2Request.from_dict(fields)
+
+
+class FakeReportsV2Api:
+
+    def __init__(self):
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.requests = []
+
+    async def v2_reports_olap_columns_get(self, report_type):
+        return INFO
+
+    async def v2_reports_olap_post(self, olap_v2_request):
+        self.requests.append(olap_v2_request)
+        rows = []
+        for department in ("A", "B"):
+            row = {"Department": department, "OpenDate": "2024-01-02"}
+            if "DishName" in olap_v2_request.group_by_row_fields:
+                row["DishName"] = "Dish " + department
+            for field in olap_v2_request.aggregate_fields:
+                row[field] = float(AGGREGATES.index(field))
+            rows.append(row)
+        return OlapV2Response(data=rows, summary=[])
+
+
+class TestOlapPlanner(unittest.IsolatedAsyncioTestCase):
+    """OlapPlanner unit tests"""
+
+    def test_narrow_request_is_kept(self) -> None:
+        request = wide_request(aggregateFields=AGGREGATES[:4])
+        plan = plan_olap_request(request, INFO)
+        self.assertEqual(plan.parts, [request])
+
+    def test_split_shares_keys(self) -> None:
+        plan = plan_olap_request(wide_request(), INFO, attribute_fields=["DishName"])
+        self.assertEqual(plan.keys, ["Department", "OpenDate"])
+        self.assertEqual(len(plan), 2)
+        for part in plan.parts:
+            self.assertLessEqual(len(olap_request_fields(part)), 7)
+            self.assertEqual(part.group_by_row_fields[:2], ["Department", "OpenDate"])
+            self.assertFalse(part.build_summary)
+        fields = [f for part in plan.parts for f in olap_request_fields(part)[2:]]
+        self.assertEqual(sorted(fields), sorted(["DishName"] + AGGREGATES))
+
+    def test_validation(self) -> None:
+        request = wide_request(aggregateFields=["Department", "Unknown"])
+        with self.assertRaisesRegex(ApiValueError, "'Department' does not allow aggregation"):
+            plan_olap_request(request, INFO)
+        with self.assertRaisesRegex(ApiValueError, "unknown field 'Unknown'"):
+            plan_olap_request(request, INFO)
+
+    def test_keys_leave_no_room(self) -> None:
+        with self.assertRaises(ApiValueError):
+            plan_olap_request(wide_request(), INFO, max_fields=3)
+
+    async def test_fetch_olap_wide_joins_parts(self) -> None:
+        api = FakeReportsV2Api()
+        table = await fetch_olap_wide(api, wide_request(), attribute_fields=["DishName"])
+        self.assertEqual(len(api.requests), 2)
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column_names, ["Department", "OpenDate", "DishName"] + AGGREGATES)
+        self.assertEqual(table["DishName"], ["Dish A", "Dish B"])
+        self.assertEqual(list(table["Sum7"]), [7.0, 7.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
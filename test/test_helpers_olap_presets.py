@@ -0,0 +1,115 @@
+# coding: utf-8
+
+import tempfile
+import unittest
+from datetime import date
+from types import SimpleNamespace
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.olap_cache import OlapCache
+from iikoserver_client.helpers.olap_presets import OlapPresetCatalog, preset_request
+from iikoserver_client.models.olap_column_info import OlapColumnInfo
+from iikoserver_client.models.olap_preset import OlapPreset
+from iikoserver_client.models.olap_v2_response import OlapV2Response
+
+INFO = {
+    name: OlapColumnInfo(
+        name=name, type=type, aggregationAllowed=True, groupingAllowed=True,
+        filteringAllowed=True, tags=[],
+    )
+    for name, type in [("OpenDate.Typed", "DATE"), ("Department", "STRING"),
+                       ("DishSumInt", "MONEY")]
+}
+
+
+def preset(preset_id, name, report_type="SALES", group_by=("OpenDate.Typed",)):
+    return OlapPreset.from_dict({
+        "id": preset_id, "name": name, "reportType": report_type,
+        "groupByRowFields": list(group_by), "aggregateFields": ["DishSumInt"],
+        "filters": {"OpenDate.Typed": {"filterType": "DateRange", "periodType": "CURRENT_MONTH"}},
+    })
+
+
+class FakeReportsV2Api:
+
+    def __init__(self):
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.calls = []
+
+    async def v2_reports_olap_presets_get(self):
+        self.calls.append("presets")
+        return [
+            preset("p1", "Revenue"), preset("p2", "Daily"),
+            preset("p3", "daily", report_type="TRANSACTIONS"),
+            preset("p4", "Totals", group_by=["Department"]),
+        ]
+
+    async def v2_reports_olap_columns_get(self, report_type):
+        return INFO
+
+    async def v2_reports_olap_post(self, olap_v2_request):
+        day = olap_v2_request.filters["OpenDate.Typed"].var_from
+        self.calls.append(day)
+        if "Department" in olap_v2_request.group_by_row_fields:
+            return OlapV2Response(data=[{"Department": "A", "DishSumInt": 4.5}], summary=[])
+        return OlapV2Response(data=[{"OpenDate.Typed": day, "DishSumInt": 1.5}], summary=[])
+
+    async def v2_reports_olap_by_preset_id_preset_id_get(self, preset_id, summary):
+        self.calls.append(preset_id)
+        return OlapV2Response(
+            data=[{"OpenDate.Typed": "2024-01-01", "DishSumInt": 3.0}], summary=[]
+        )
+
+
+class TestOlapPresetCatalog(unittest.IsolatedAsyncioTestCase):
+    """OlapPresetCatalog unit tests"""
+
+    async def test_resolve(self) -> None:
+        catalog = await OlapPresetCatalog.create(FakeReportsV2Api())
+        self.assertEqual(catalog.resolve("revenue").id, "p1")
+        self.assertEqual(catalog.resolve("p2").name, "Daily")
+        with self.assertRaisesRegex(ApiValueError, "ambiguous"):
+            catalog.resolve("DAILY")
+        with self.assertRaises(ApiValueError):
+            catalog.resolve("missing")
+        self.assertEqual(catalog.resolve("daily", "TRANSACTIONS").id, "p3")
+        await catalog.run(FakeReportsV2Api(), "DAILY", report_type="TRANSACTIONS")
+
+    def test_preset_request_binds_period(self) -> None:
+        request = preset_request(preset("p1", "Revenue"), date(2024, 1, 1), date(2024, 1, 3))
+        date_filter = request.filters["OpenDate.Typed"]
+        self.assertEqual(date_filter.period_type, "CUSTOM")
+        self.assertEqual((date_filter.var_from, date_filter.to), ("2024-01-01", "2024-01-03"))
+        self.assertFalse(request.build_summary)
+
+    async def test_run_uses_catalog_and_cache(self) -> None:
+        api = FakeReportsV2Api()
+        catalog = OlapPresetCatalog()
+        with tempfile.TemporaryDirectory() as path:
+            cache = OlapCache(path, recent_days=0)
+            table = await catalog.run(
+                api, "Revenue", date(2024, 1, 1), date(2024, 1, 3), cache=cache
+            )
+            await catalog.run(api, "Revenue", date(2024, 1, 1), date(2024, 1, 3), cache=cache)
+        self.assertEqual(api.calls, ["presets", "2024-01-01", "2024-01-02"])
+        self.assertEqual(list(table["DishSumInt"]), [1.5, 1.5])
+
+        table = await catalog.run(api, "p1")
+        self.assertEqual(api.calls[-1], "p1")
+        self.assertEqual(table["OpenDate.Typed"], [date(2024, 1, 1)])
+
+    async def test_run_bypasses_cache_without_day_grouping(self) -> None:
+        api = FakeReportsV2Api()
+        with tempfile.TemporaryDirectory() as path:
+            cache = OlapCache(path, recent_days=0)
+            table = await OlapPresetCatalog().run(
+                api, "Totals", date(2024, 1, 1), date(2024, 1, 3), cache=cache
+            )
+        self.assertEqual(api.calls, ["presets", "2024-01-01"])
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+        self.assertEqual(table.to_pydict(), {"Department": ["A"], "DishSumInt": [4.5]})
+
+
+if __name__ == '__main__':
+    unittest.main()
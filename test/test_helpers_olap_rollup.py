@@ -0,0 +1,120 @@
+# coding: utf-8
+
+import math
+import unittest
+from array import array
+from datetime import date, datetime
+
+from iikoserver_client.exceptions import ApiValueError
+from iikoserver_client.helpers.columnar import ColumnTable
+from iikoserver_client.helpers.olap_rollup import (
+    filter_table, rollup, rollup_levels, rollup_request, with_period
+)
+from iikoserver_client.models.olap_filter import OlapFilter
+from iikoserver_client.models.olap_v2_request import OlapV2Request
+
+TABLE = ColumnTable({
+    "OpenDate.Typed": [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 8), date(2024, 1, 9)],
+    "Department": ["A", "B", "A", "A"],
+    "DishSumInt": array("d", [10.0, 20.0, math.nan, 5.0]),
+    "DishAmountInt": array("q", [1, 2, 3, 4]),
+})
+
+
+def olap_filter(**fields):
+    return OlapFilter.from_dict(fields)
+
+
+class TestOlapRollup(unittest.TestCase):
+    """OLAP roll-up helpers unit tests"""
+
+    def test_filters(self) -> None:
+        include = filter_table(TABLE, {
+            "Department": olap_filter(filterType="IncludeValues", values=["A"]),
+        })
+        self.assertEqual(include.num_rows, 3)
+        exclude = filter_table(TABLE, {
+            "Department": olap_filter(filterType="ExcludeValues", values=["A"]),
+        })
+        self.assertEqual(exclude["Department"], ["B"])
+        dates = filter_table(TABLE, {
+            "OpenDate.Typed": olap_filter(
+                filterType="DateRange", periodType="CUSTOM", **{"from": "2024-01-02"},
+                to="2024-01-09T00:00:00.000",
+            ),
+        })
+        self.assertEqual(dates["OpenDate.Typed"], [date(2024, 1, 2), date(2024, 1, 8)])
+        amounts = filter_table(TABLE, {
+            "DishAmountInt": olap_filter(
+                filterType="Range", includeLow=False, includeHigh=True, **{"from": 1}, to=3,
+            ),
+        })
+        self.assertEqual(list(amounts["DishAmountInt"]), [2, 3])
+        with self.assertRaises(ApiValueError):
+            filter_table(TABLE, {
+                "OpenDate.Typed": olap_filter(filterType="DateRange", periodType="LAST_WEEK"),
+            })
+
+    def test_rollup(self) -> None:
+        result = rollup(
+            TABLE, ["Department"],
+            {"DishSumInt": ["sum", "count", "max"], "DishAmountInt": "min"},
+        )
+        self.assertEqual(result.column_names, [
+            "Department", "DishSumInt.sum", "DishSumInt.count", "DishSumInt.max",
+            "DishAmountInt",
+        ])
+        self.assertEqual(result["Department"], ["A", "B"])
+        self.assertEqual(list(result["DishSumInt.sum"]), [15.0, 20.0])
+        self.assertEqual(list(result["DishSumInt.count"]), [2, 1])
+        self.assertEqual(list(result["DishSumInt.max"]), [10.0, 20.0])
+        self.assertEqual(list(result["DishAmountInt"]), [1.0, 2.0])
+
+    def test_missing_keys_form_one_group(self) -> None:
+        table = ColumnTable({
+            "Department": ["A", None, math.nan, None],
+            "Price": array("d", [1.0, math.nan, 2.0, math.nan]),
+            "DishAmountInt": array("q", [1, 2, 3, 4]),
+        })
+        by_department = rollup(table, ["Department"], {"DishAmountInt": "sum"})
+        self.assertEqual(by_department.to_pydict(),
+                         {"Department": ["A", None], "DishAmountInt": [1.0, 9.0]})
+        by_price = rollup(table, ["Price"], {"DishAmountInt": "count"})
+        self.assertEqual(list(by_price["DishAmountInt"]), [1, 2, 1])
+        self.assertTrue(math.isnan(by_price["Price"][1]))
+
+    def test_date_bounds_on_datetime_column(self) -> None:
+        table = ColumnTable({
+            "d": [datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 23), datetime(2024, 1, 2, 8)],
+            "v": array("d", [1.0, 2.0, 4.0]),
+        })
+        result = rollup(table, [], {"v": "sum"}, {
+            "d": olap_filter(
+                filterType="DateRange", **{"from": date(2024, 1, 1)}, to=date(2024, 1, 2),
+            ),
+        })
+        self.assertEqual(list(result["v"]), [3.0])
+
+    def test_rollup_levels_and_periods(self) -> None:
+        weekly = with_period(TABLE, "OpenDate.Typed", "week")
+        levels = rollup_levels(
+            weekly, ["OpenDate.Typed.week", "Department"], {"DishSumInt": "sum"}
+        )
+        self.assertEqual(list(levels), [("OpenDate.Typed.week", "Department"),
+                                        ("OpenDate.Typed.week",), ()])
+        self.assertEqual(levels[("OpenDate.Typed.week",)]["OpenDate.Typed.week"],
+                         [date(2024, 1, 1), date(2024, 1, 8)])
+        self.assertEqual(list(levels[()]["DishSumInt"]), [35.0])
+
+    def test_rollup_request(self) -> None:
+        request = OlapV2Request.from_dict({
+            "reportType": "SALES", "groupByRowFields": ["Department"],
+            "aggregateFields": ["DishAmountInt"],
+            "filters": {"Department": {"filterType": "IncludeValues", "values": ["A"]}},
+        })
+        result = rollup_request(TABLE, request)
+        self.assertEqual(result.to_pydict(), {"Department": ["A"], "DishAmountInt": [8.0]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+# coding: utf-8
+
+import unittest
+from datetime import date, datetime
+
+from iikoserver_client.exceptions import ApiException
+from iikoserver_client.helpers.price_book import PriceBook, PriceIntervals
+from iikoserver_client.models.product_price_item_dto import ProductPriceItemDto
+from iikoserver_client.models.product_price_list_response_dto import ProductPriceListResponseDto
+
+
+def price_response(revision, prices):
+    return ProductPriceListResponseDto.from_dict({
+        "result": "SUCCESS",
+        "revision": revision,
+        "response": [
+            {"departmentId": department, "productId": product, "prices": items}
+            for department, product, items in prices
+        ],
+    })
+
+
+def intervals(*spans):
+    return PriceIntervals([
+        ProductPriceItemDto.from_dict({"dateFrom": start, "dateTo": end, "price": price})
+        for start, end, price in spans
+    ])
+
+
+def price_on(prices: PriceIntervals, day: date):
+    item = prices.at(day.toordinal())
+    return item.price if item is not None else None
+
+
+class CountingList(list):
+    """List counting item reads, to see how far a lookup walks back."""
+
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+class FakeMenuChangeApi:
+
+    def __init__(self, responses) -> None:
+        self.responses = list(responses)
+        self.calls = []
+
+    async def v2_price_get(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.responses.pop(0)
+
+
+class TestPriceBook(unittest.IsolatedAsyncioTestCase):
+    """PriceBook unit tests"""
+
+    async def test_point_in_time_lookup_and_refresh(self) -> None:
+        api = FakeMenuChangeApi([
+            price_response(10, [
+                ("d1", "p1", [
+                    {"dateFrom": "2024-01-01", "dateTo": "2024-01-31", "price": 100},
+                    {"dateFrom": "2024-02-01", "price": 120,
+                     "pricesForCategories": [{"categoryId": "c1", "price": 90}]},
+                ]),
+                ("d1", "p2", [
+                    {"dateFrom": "2024-01-01", "price": 50},
+                    {"dateFrom": "2024-01-10", "dateTo": "2024-01-12", "price": 40},
+                    {"dateFrom": "2024-01-20", "included": False},
+                ]),
+            ]),
+            price_response(11, [
+                ("d1", "p1", [{"dateFrom": "2024-01-01", "price": 200}]),
+            ]),
+        ])
+        book = await PriceBook.load(api, date(2024, 1, 1))
+        self.assertEqual(len(book), 2)
+        self.assertEqual(book.revision, 10)
+
+        self.assertIsNone(book.price_at("d1", "p1", date(2023, 12, 31)))
+        self.assertEqual(book.price_at("d1", "p1", datetime(2024, 1, 15, 12)), 100)
+        self.assertEqual(book.price_at("d1", "p1", date(2024, 3, 1)), 120)
+        self.assertEqual(book.price_at("d1", "p1", date(2024, 3, 1), category_id="c1"), 90)
+        self.assertEqual(book.price_at("d1", "p1", date(2024, 3, 1), category_id="c2"), 120)
+        # Overlapping orders: the latest started one wins
+        self.assertEqual(book.price_at("d1", "p2", date(2024, 1, 5)), 50)
+        self.assertEqual(book.price_at("d1", "p2", date(2024, 1, 11)), 40)
+        self.assertEqual(book.price_at("d1", "p2", date(2024, 1, 15)), 50)
+        self.assertIsNone(book.price_at("d1", "p2", date(2024, 1, 25)))
+        self.assertIsNone(book.price_at("d2", "p1", date(2024, 1, 15)))
+
+        self.assertEqual(await book.refresh(api), 1)
+        self.assertEqual(api.calls[1]["revision_from"], 10)
+        self.assertEqual(book.revision, 11)
+        self.assertEqual(book.price_at("d1", "p1", date(2024, 3, 1)), 200)
+
+    def test_overlapping_intervals_and_boundaries(self) -> None:
+        prices = intervals(
+            ("2024-01-01", None, 10),
+            ("2024-01-05", "2024-01-20", 20),
+            ("2024-01-10", "2024-01-12", 30),
+            ("2024-01-15", "2024-01-15", 40),
+        )
+        expected = {
+            date(2023, 12, 31): None,
+            date(2024, 1, 1): 10,
+            date(2024, 1, 4): 10,
+            date(2024, 1, 5): 20,
+            date(2024, 1, 10): 30,
+            date(2024, 1, 12): 30,
+            date(2024, 1, 13): 20,
+            date(2024, 1, 15): 40,
+            date(2024, 1, 16): 20,
+            date(2024, 1, 20): 20,
+            date(2024, 1, 21): 10,
+            date(2030, 1, 1): 10,
+        }
+        self.assertEqual({day: price_on(prices, day) for day in expected}, expected)
+
+    def test_lookup_stops_at_max_ends(self) -> None:
+        prices = intervals(*[
+            ("2024-01-{0:02d}".format(day), "2024-01-{0:02d}".format(day), day)
+            for day in range(1, 29)
+        ])
+        self.assertEqual(prices.max_ends, sorted(prices.max_ends))
+        prices.ends = CountingList(prices.ends)
+        self.assertEqual(price_on(prices, date(2024, 1, 28)), 28)
+        self.assertIsNone(price_on(prices, date(2024, 1, 29)))
+        # closed intervals before the day are never inspected one by one
+        self.assertEqual(prices.ends.reads, 1)
+        self.assertIsNone(price_on(prices, date(2023, 12, 31)))
+
+    def test_error_response_raises(self) -> None:
+        response = ProductPriceListResponseDto.from_dict({
+            "result": "ERROR", "errors": [{"code": "E1", "value": "boom"}]
+        })
+        with self.assertRaises(ApiException):
+            PriceBook().apply(response)
+
+
+if __name__ == '__main__':
+    unittest.main()
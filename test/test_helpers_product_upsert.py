@@ -0,0 +1,151 @@
+# coding: utf-8
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from pydantic import ValidationError
+
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.exceptions import ApiException
+from iikoserver_client.helpers.product_upsert import (
+    ProductCatalog, ProductUpserter, plan_product_upsert, product_changes
+)
+from iikoserver_client.models.error_dto import ErrorDto
+from iikoserver_client.models.product_dto import ProductDto
+from iikoserver_client.models.product_save_dto import ProductSaveDto
+from iikoserver_client.models.product_unit_operation_response_scheme import (
+    ProductUnitOperationResponseScheme
+)
+from iikoserver_client.models.product_update_dto import ProductUpdateDto
+
+
+def product(product_id: str, num: str, price: float = 100.0, deleted: bool = False) -> ProductDto:
+    return ProductDto(
+        id=product_id, num=num, name="Product " + num, mainUnit="unit-1", type="GOODS",
+        defaultSalePrice=price, description="kept", deleted=deleted,
+    )
+
+
+class FakeProductsApi:
+
+    def __init__(self, update_failures: int = 0) -> None:
+        self.api_client = SimpleNamespace(configuration=Configuration())
+        self.saved = []
+        self.updated = []
+        self.update_failures = update_failures
+
+    async def v2_entities_products_save_post(
+        self, generate_nomenclature_code=None, generate_fast_code=None, product_save_dto=None
+    ):
+        await asyncio.sleep(0)
+        self.saved.append(product_save_dto)
+        if product_save_dto.num == "bad":
+            return ProductUnitOperationResponseScheme(
+                result="ERROR", errors=[ErrorDto(code="DUPLICATE_NUM", value="num is taken")]
+            )
+        return ProductUnitOperationResponseScheme(
+            result="SUCCESS",
+            response=ProductDto.from_dict(
+                dict(product_save_dto.to_dict(), id="new-" + product_save_dto.num, deleted=False)
+            ),
+        )
+
+    async def v2_entities_products_update_post(
+        self, override_fast_code=None, override_nomenclature_code=None, product_update_dto=None
+    ):
+        await asyncio.sleep(0)
+        if self.update_failures:
+            self.update_failures -= 1
+            raise ApiException(status=503, reason="Service Unavailable")
+        self.updated.append(product_update_dto)
+        return ProductUnitOperationResponseScheme(
+            result="SUCCESS",
+            response=ProductDto.from_dict(dict(product_update_dto.to_dict(), deleted=False)),
+        )
+
+
+class TestProductUpsert(unittest.IsolatedAsyncioTestCase):
+    """Product upsert unit tests"""
+
+    def setUp(self) -> None:
+        self.catalog = ProductCatalog([
+            product("p1", "A1"), product("p2", "A2"), product("p3", "A3", deleted=True),
+        ])
+
+    def test_catalog_skips_deleted_articles(self) -> None:
+        self.assertIsNone(self.catalog.match(ProductSaveDto(name="x", mainUnit="u", type="GOODS",
+                                                            num="A3")))
+        self.assertEqual(len(self.catalog), 3)
+
+    def test_changes_compare_set_fields_only(self) -> None:
+        desired = ProductSaveDto(name="Product A1", mainUnit="unit-1", type="GOODS", num="A1",
+                                 defaultSalePrice=120)
+        self.assertEqual(product_changes(self.catalog.by_id["p1"], desired),
+                         {"default_sale_price": 120})
+
+    def test_plan(self) -> None:
+        plan = plan_product_upsert(self.catalog, [
+            ProductSaveDto(name="Product A1", mainUnit="unit-1", type="GOODS", num="A1"),
+            ProductSaveDto(name="Renamed", mainUnit="unit-1", type="GOODS", num="A2"),
+            ProductSaveDto(name="New", mainUnit="unit-1", type="GOODS", num="N1"),
+            ProductUpdateDto(id="missing", name="x", mainUnit="unit-1", type="GOODS"),
+        ])
+        self.assertEqual(len(plan.unchanged), 1)
+        self.assertEqual([saved.num for saved in plan.saves], ["N1"])
+        self.assertEqual([item.id for item in plan.unknown], ["missing"])
+        update, fields = plan.updates[0]
+        self.assertEqual(fields, ["name"])
+        self.assertEqual((update.id, update.name, update.description), ("p2", "Renamed", "kept"))
+        self.assertEqual(plan.conflicts, [])
+
+    def test_plan_collapses_repeated_products(self) -> None:
+        plan = plan_product_upsert(self.catalog, [
+            ProductSaveDto(name="Soup", mainUnit="unit-1", type="DISH"),
+            ProductSaveDto(name="Soup", mainUnit="unit-1", type="DISH"),
+            ProductSaveDto(name="Tea", mainUnit="unit-1", type="DISH"),
+            ProductSaveDto(name="Tea", mainUnit="unit-1", type="GOODS"),
+            ProductSaveDto(name="Product A1", mainUnit="unit-1", type="GOODS", num="A1",
+                           defaultSalePrice=120),
+            ProductUpdateDto(id="p1", name="Product A1", mainUnit="unit-1", type="GOODS",
+                             defaultSalePrice=130),
+        ])
+        self.assertEqual([saved.name for saved in plan.saves], ["Soup"])
+        self.assertEqual(len(plan.unchanged), 1)
+        self.assertEqual(plan.updates, [])
+        self.assertEqual(plan.conflicts, ["Tea", "p1"])
+
+    def test_plan_validates_updates(self) -> None:
+        desired = ProductSaveDto.model_construct(name=None, num="A1")
+        with self.assertRaises(ValidationError):
+            plan_product_upsert(self.catalog, [desired])
+
+    async def test_run_aggregates_results(self) -> None:
+        api = FakeProductsApi(update_failures=1)
+        report = await ProductUpserter(api, self.catalog, retry_delay=0).run([
+            ProductSaveDto(name="Product A1", mainUnit="unit-1", type="GOODS", num="A1",
+                           defaultSalePrice=150),
+            ProductSaveDto(name="Product A2", mainUnit="unit-1", type="GOODS", num="A2"),
+            ProductSaveDto(name="New", mainUnit="unit-1", type="GOODS", num="N1"),
+            ProductSaveDto(name="Bad", mainUnit="unit-1", type="GOODS", num="bad"),
+        ])
+        self.assertFalse(report.ok)
+        self.assertEqual(report.unchanged, 1)
+        self.assertEqual([item.id for item in report.created], ["new-N1"])
+        self.assertEqual([item.default_sale_price for item in report.updated], [150])
+        self.assertEqual(report.errors["bad"][0].code, "DUPLICATE_NUM")
+        self.assertNotIn("Product A2", report.errors)
+        self.assertEqual(self.catalog.by_num["N1"].id, "new-N1")
+        self.assertEqual(self.catalog.by_id["p1"].default_sale_price, 150)
+        self.assertEqual(len(api.saved), 2)
+
+        again = await ProductUpserter(api, self.catalog).run([
+            ProductSaveDto(name="Product A1", mainUnit="unit-1", type="GOODS", num="A1",
+                           defaultSalePrice=150),
+        ])
+        self.assertTrue(again.ok)
+        self.assertEqual((again.unchanged, len(api.updated)), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# coding: utf-8
+
+import unittest
+from datetime import date
+
+from aiohttp import web
+
+from iikoserver_client.api.reports_v1_api import ReportsV1Api
+from iikoserver_client.helpers.sales_report import date_windows, fetch_sales, parse_sales_report
+from test.local_server import local_api_client
+
+
+def sales_xml(*records):
+    body = "".join(
+        "<dayDishValue><date>{0}</date><productId>{1}</productId>"
+        "<productName>Dish {1}</productName><value>{2}</value></dayDishValue>".format(*record)
+        for record in records
+    )
+    return ("<dayDishValues>" + body + "</dayDishValues>").encode("utf-8")
+
+
+class TestSalesReport(unittest.IsolatedAsyncioTestCase):
+    """Sales report fan-out unit tests"""
+
+    def test_parse_sums_by_key(self) -> None:
+        table = parse_sales_report(sales_xml(
+            ("02.01.2024", "p2", 5), ("01.01.2024", "p1", 10), ("01.01.2024", "p1", 2.5),
+        ), "D1")
+        self.assertEqual(list(table.rows()), [
+            ("D1", date(2024, 1, 1), "p1", "Dish p1", 12.5),
+            ("D1", date(2024, 1, 2), "p2", "Dish p2", 5.0),
+        ])
+
+    def test_date_windows(self) -> None:
+        self.assertEqual(date_windows(date(2024, 1, 1), date(2024, 1, 5), 2), [
+            (date(2024, 1, 1), date(2024, 1, 2)),
+            (date(2024, 1, 3), date(2024, 1, 4)),
+            (date(2024, 1, 5), date(2024, 1, 5)),
+        ])
+        self.assertEqual(len(date_windows(date(2024, 1, 1), date(2024, 1, 5))), 1)
+
+    async def test_fetch_sales_fans_out(self) -> None:
+        queries = []
+
+        async def sales(request):
+            queries.append(request.query)
+            day = request.query["dateFrom"]
+            return web.Response(
+                body=sales_xml((day, "p1", 1), (day, "p2", 2)), content_type="application/xml"
+            )
+
+        async with local_api_client([web.get("/reports/sales", sales)]) as client:
+            table = await fetch_sales(
+                ReportsV1Api(client), ["D1", "D2"], date(2024, 1, 1), date(2024, 1, 3),
+                days_per_request=1,
+            )
+        self.assertEqual(len(queries), 6)
+        self.assertEqual(queries[0]["dishDetails"], "true")
+        self.assertEqual(table.num_rows, 12)
+        self.assertEqual(table["department"][:6], ["D1"] * 6)
+        self.assertEqual(table["date"][:2], [date(2024, 1, 1)] * 2)
+        self.assertEqual(sum(table["value"]), 18.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# coding: utf-8
+
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+
+from aiohttp import web
+
+from iikoserver_client.api.reports_v1_api import ReportsV1Api
+from iikoserver_client.helpers.export import CsvTableWriter, open_table_writer
+from iikoserver_client.helpers.store_operations import (
+    STORE_OPERATIONS_SCHEMA, export_store_operations, write_store_operations
+)
+from test.local_server import local_api_client
+
+REPORT = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n<storeReportItemDtoes>'
+    b'<storeReportItemDto><date>2024-01-02T10:00:00</date><documentType>INCOMING_INVOICE'
+    b'</documentType><type>INVOICE</type><incoming>true</incoming><product>p1</product>'
+    b'<amount>2.5</amount><sum>100</sum><unknownField>x</unknownField></storeReportItemDto>'
+    b'<storeReportItemDto><documentType>NEW_TYPE</documentType><sum>-1</sum>'
+    b'</storeReportItemDto>'
+    b'</storeReportItemDtoes>'
+)
+
+
+class TestStoreOperationsExport(unittest.IsolatedAsyncioTestCase):
+    """Store operations export unit tests"""
+
+    def test_write_store_operations_csv(self) -> None:
+        stream = io.StringIO()
+        with CsvTableWriter(stream, STORE_OPERATIONS_SCHEMA, buffer_rows=1) as writer:
+            self.assertEqual(write_store_operations(REPORT, writer), 2)
+        self.assertEqual(writer.rows_written, 2)
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+        self.assertEqual(rows[0]["documentType"], "INCOMING_INVOICE")
+        self.assertEqual(rows[0]["incoming"], "True")
+        self.assertEqual(rows[0]["amount"], "2.5")
+        self.assertEqual(rows[1]["documentType"], "NEW_TYPE")
+        self.assertEqual(rows[1]["product"], "")
+
+    def test_failed_export_leaves_no_file(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "operations.csv")
+            with self.assertRaises(RuntimeError):
+                with open_table_writer(path, STORE_OPERATIONS_SCHEMA, buffer_rows=1) as writer:
+                    write_store_operations(REPORT, writer)
+                    raise RuntimeError("connection lost")
+            self.assertEqual(os.listdir(directory), [])
+
+            with open_table_writer(path, STORE_OPERATIONS_SCHEMA) as writer:
+                write_store_operations(REPORT, writer)
+                self.assertFalse(os.path.exists(path))
+            self.assertEqual(os.listdir(directory), ["operations.csv"])
+
+    def test_open_table_writer_rejects_unknown_format(self) -> None:
+        with self.assertRaises(ValueError):
+            open_table_writer("report.xlsx", STORE_OPERATIONS_SCHEMA)
+
+    async def test_export_streams_to_file(self) -> None:
+        queries = []
+
+        async def store_operations(request):
+            queries.append(request.query)
+            return web.Response(body=REPORT, content_type="application/xml")
+
+        routes = [web.get("/reports/storeOperations", store_operations)]
+        async with local_api_client(routes) as client:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "operations.csv")
+                count = await export_store_operations(
+                    ReportsV1Api(client), path, "01.01.2024", "31.01.2024", stores=["s1"]
+                )
+                with open(path, encoding="utf-8", newline="") as stream:
+                    rows = list(csv.reader(stream))
+        self.assertEqual(count, 2)
+        self.assertEqual(queries[0]["stores"], "s1")
+        self.assertEqual(rows[0], list(STORE_OPERATIONS_SCHEMA))
+        self.assertEqual(len(rows), 3)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_write_store_operations_parquet(self) -> None:
+        import pyarrow.parquet
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "operations.parquet")
+            with open_table_writer(path, STORE_OPERATIONS_SCHEMA, buffer_rows=1) as writer:
+                write_store_operations(REPORT, writer)
+            table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column("sum").to_pylist(), [100.0, -1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
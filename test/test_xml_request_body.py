@@ -0,0 +1,89 @@
+# coding: utf-8
+
+import unittest
+from datetime import datetime
+
+from aiohttp import web
+from lxml import etree
+
+from iikoserver_client import ApiClient
+from iikoserver_client.api.documents_management_api import DocumentsManagementApi
+from iikoserver_client.configuration import Configuration
+from iikoserver_client.models.incoming_inventory_item_xml import IncomingInventoryItemXml
+from iikoserver_client.models.incoming_inventory_xml import IncomingInventoryXml
+from iikoserver_client.models.incoming_inventory_xml_items import IncomingInventoryXmlItems
+from iikoserver_client.rest import XmlModelPayload, iter_xml_chunks
+from test.local_server import local_api_client
+
+RESULT = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<incomingInventoryValidationResult><valid>true</valid>'
+    b'<documentNumber>inv-1</documentNumber>'
+    b'</incomingInventoryValidationResult>'
+)
+
+
+def make_inventory(lines: int) -> IncomingInventoryXml:
+    return IncomingInventoryXml(
+        documentNumber="inv-1",
+        dateIncoming=datetime(2024, 1, 2, 10, 0),
+        storeId="store-1",
+        items=IncomingInventoryXmlItems(item=[
+            IncomingInventoryItemXml(productId="p%d" % line, amountContainer=line + 0.5)
+            for line in range(lines)
+        ]),
+        comment="<checked>",
+    )
+
+
+class TestXmlRequestBody(unittest.IsolatedAsyncioTestCase):
+    """Streamed XML request body unit tests"""
+
+    def test_chunks_match_to_xml_without_pretty_print(self) -> None:
+        inventory = make_inventory(200)
+        chunks = list(iter_xml_chunks(inventory, chunk_size=1024))
+        self.assertGreater(len(chunks), 1)
+        body = b"".join(chunks)
+        self.assertEqual(body.count(b"\n"), 1)
+        parser = etree.XMLParser(remove_blank_text=True)
+        expected = etree.fromstring(inventory.to_xml().encode("utf-8"), parser)
+        self.assertEqual(
+            etree.tostring(etree.fromstring(body)), etree.tostring(expected)
+        )
+
+    def test_model_without_items(self) -> None:
+        inventory = IncomingInventoryXml(documentNumber="inv-2")
+        document = etree.fromstring(XmlModelPayload(inventory).decode().encode("utf-8"))
+        self.assertEqual(document.findtext("documentNumber"), "inv-2")
+        self.assertIsNone(document.find("items"))
+
+    def test_streamed_body_is_not_logged(self) -> None:
+        api_client = ApiClient(Configuration())
+        with self.assertLogs("iikoserver_client.http_logger", level="INFO") as logs:
+            api_client._log_request("POST", "/import", {}, XmlModelPayload(make_inventory(5)))
+        self.assertIn("<streamed IncomingInventoryXml>", logs.output[0])
+        self.assertNotIn("productId", logs.output[0])
+
+    async def test_import_streams_body(self) -> None:
+        received = []
+
+        async def import_inventory(request):
+            received.append((request.headers, await request.read()))
+            return web.Response(body=RESULT, content_type="application/xml")
+
+        routes = [web.post("/documents/import/incomingInventory", import_inventory)]
+        async with local_api_client(routes, stream_xml_body=True) as api_client:
+            api = DocumentsManagementApi(api_client)
+            result = await api.documents_import_incoming_inventory_post(make_inventory(500))
+
+        self.assertTrue(result.valid)
+        headers, body = received[0]
+        self.assertEqual(headers.get("Transfer-Encoding"), "chunked")
+        self.assertTrue(headers["Content-Type"].startswith("application/xml"))
+        items = etree.fromstring(body).find("items")
+        self.assertEqual(len(items), 500)
+        self.assertEqual(items[499].findtext("productId"), "p499")
+
+
+if __name__ == '__main__':
+    unittest.main()